@@ -1,6 +1,7 @@
-import pandas as pd
 import os
 
+from storage import REQUIRED_COLUMNS, read_dataset, write_dataset
+
 def select_and_save_columns(input_file_path, output_file_path):
     """
     Memuat dataset, hanya memilih kolom yang diperlukan, dan menyimpannya ke file baru.
@@ -10,16 +11,13 @@ def select_and_save_columns(input_file_path, output_file_path):
         output_file_path (str): Jalur lengkap untuk menyimpan file CSV output yang baru.
     """
     
-    # 1. Tentukan Kolom yang Diperlukan
-    REQUIRED_COLUMNS = [
-        'Date','HomeTeam','AwayTeam','FTHG','FTAG','FTR','AvgH','AvgD','AvgA','Avg>2.5','Avg<2.5','HomeTeamElo','AwayTeamElo','EloDifference','Home_AvgGoalsScored','Home_AvgGoalsConceded','Home_Wins','Home_Draws','Home_Losses','Away_AvgGoalsScored','Away_AvgGoalsConceded','Away_Wins','Away_Draws','Away_Losses','HTH_HomeWins','HTH_AwayWins','HTH_Draws','HTH_AvgHomeGoals','HTH_AvgAwayGoals'
-    ]
+    # 1. Kolom yang diperlukan: REQUIRED_COLUMNS dari storage.py
     
     # 2. Muat Dataset
     print(f"Mencoba memuat file: {input_file_path}...")
     try:
-        # Baca file CSV
-        df = pd.read_csv(input_file_path)
+        # Baca dataset (store kolumnar jika sudah dimigrasi, selain itu CSV)
+        df = read_dataset(input_file_path)
     except FileNotFoundError:
         print(f"🚨 ERROR: File tidak ditemukan di jalur: {input_file_path}")
         return
@@ -52,7 +50,7 @@ def select_and_save_columns(input_file_path, output_file_path):
         os.makedirs(output_dir)
 
     try:
-        df_selected.to_csv(output_file_path, index=False)
+        write_dataset(output_file_path, df_selected)
         print(f"✅ Berhasil! Dataset baru telah disimpan ke: {output_file_path}")
     except Exception as e:
         print(f"🚨 ERROR saat menyimpan file: {e}")
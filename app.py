@@ -1,17 +1,42 @@
 # ... (Semua import dan konfigurasi awal SAMA) ...
 import os
-import glob
-import joblib
-import pandas as pd
-import numpy as np
+import io
+import atexit
+import base64
+import hashlib
+import threading
+import json
+import time
+_APP_IMPORT_START = time.perf_counter()
+import logging
 from datetime import datetime, timezone
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, g
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, g, Response, stream_with_context
 from werkzeug.utils import secure_filename
-from authlib.integrations.flask_client import OAuth
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, or_, and_
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
 from flask_login import LoginManager, UserMixin, login_user, logout_user, current_user, login_required
 import secrets
 from functools import wraps
+from lazy_imports import lazy_module, timed_import, import_timings
+from league_cache import LeagueDatasetCache
+from storage import read_dataset, append_dataset, dataset_lock, dataset_version
+from model_registry import ModelRegistry, league_folder_name
+from league_catalog import LeagueCatalog, league_metadata, pretty_league_name
+from prediction_cache import PredictionCache, canonical_features
+from league_index import (TeamIndex, PairIndex, MatchKeyIndex, MATCH_NEW, parse_match_dates,
+                          summarize_results, summarize_h2h, summarize_match_status)
+from feature_engine import FeatureEngine, ODDS_COLUMNS, run_engine
+from league_snapshot import SnapshotStore
+from season_sim import current_season, season_table, remaining_fixtures, tiebreak_scores, simulate_positions
+from job_queue import JobQueue, JOB_DONE, JOB_ERROR
+from metrics import Registry, StageMetrics, LabelAllowlist
+from history_buffer import WriteBehindBuffer
+
+# Stack data/ML dimuat saat pertama dipakai (thread warmup atau request pertama), bukan saat import app
+pd = lazy_module('pandas')
+np = lazy_module('numpy')
+joblib = lazy_module('joblib')
 
 # -------------------------
 # KONFIGURASI APLIKASI
@@ -33,7 +58,6 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
-oauth = OAuth(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
@@ -48,9 +72,81 @@ class User(db.Model, UserMixin):
     name = db.Column(db.String(150), nullable=True)
     role = db.Column(db.String(20), nullable=False, default='user')
 
+# Cache per proses untuk user_loader: kolom User disimpan USER_CACHE_TTL detik agar request
+# terautentikasi tidak selalu menjalankan SELECT; dibuang saat logout dan saat baris User berubah.
+# Perubahan User (misal role) di satu worker diumumkan ke worker lain lewat file versi bersama
+# (USER_CACHE_VERSION_FILE, diganti setelah commit); setiap worker mengosongkan cache-nya saat versinya berubah.
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+_user_cache_seen = {'version': None}
+USER_COLUMNS = ('id', 'google_id', 'email', 'name', 'role')
+
+def invalidate_user_cache(user_id=None):
+    with _user_cache_lock:
+        if user_id is None: _user_cache.clear()
+        else: _user_cache.pop(int(user_id), None)
+
+def _user_cache_version():
+    try:
+        st=os.stat(USER_CACHE_VERSION_FILE)
+        return (st.st_ino, st.st_mtime_ns)
+    except OSError:
+        return None
+
+def bump_user_cache_version():
+    # File baru (inode baru) per perubahan: tetap terdeteksi walaupun resolusi mtime kasar
+    os.makedirs(os.path.dirname(USER_CACHE_VERSION_FILE) or '.', exist_ok=True)
+    tmp_path=f'{USER_CACHE_VERSION_FILE}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f: f.write(secrets.token_hex(8))
+    os.replace(tmp_path, USER_CACHE_VERSION_FILE)
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    # Misal role diubah: dicatat di session, cache dibuang setelah commit (lihat _user_changes_committed)
+    invalidate_user_cache(target.id)
+    session=object_session(target)
+    if session is not None: session.info.setdefault('changed_user_ids', set()).add(target.id)
+
+@event.listens_for(Session, 'after_commit')
+def _user_changes_committed(session):
+    # Setelah commit, bukan saat flush: worker lain tidak boleh memuat ulang nilai lama yang belum di-commit
+    changed=session.info.pop('changed_user_ids', None)
+    if not changed: return
+    for user_id in changed: invalidate_user_cache(user_id)
+    try:
+        bump_user_cache_version()
+    except OSError as e:
+        print(f"Gagal memperbarui versi cache user: {e}")
+
+@event.listens_for(Session, 'after_rollback')
+def _user_changes_rolled_back(session):
+    session.info.pop('changed_user_ids', None)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id=int(user_id)
+    now=time.monotonic()
+    version=_user_cache_version() if USER_CACHE_TTL else None
+    with _user_cache_lock:
+        if version != _user_cache_seen['version']:
+            # User diubah di worker lain sejak cache ini diisi
+            _user_cache.clear()
+            _user_cache_seen['version']=version
+        cached=_user_cache.get(user_id)
+    if cached is None or cached[0] <= now:
+        user=db.session.get(User, user_id)
+        if user is None or not USER_CACHE_TTL: return user
+        with _user_cache_lock:
+            # Versi berubah selama SELECT: baris yang dibaca mungkin sudah usang, jangan disimpan
+            if _user_cache_seen['version'] != version: return user
+            if len(_user_cache) >= USER_CACHE_SIZE: _user_cache.clear()
+            _user_cache[user_id]=(now+USER_CACHE_TTL, {col: getattr(user, col) for col in USER_COLUMNS})
+        return user
+    # Objek baru per request, dipasang ke session tanpa SELECT (merge load=False)
+    user=User(**cached[1])
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
 
 class PredictionHistory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -61,6 +157,8 @@ class PredictionHistory(db.Model):
     away_team = db.Column(db.String(100), nullable=False)
     prediction_data = db.Column(db.JSON, nullable=False)
     user = db.relationship('User', backref=db.backref('histories', lazy=True, cascade="all, delete-orphan"))
+    # /api/history: filter user_id lalu urut (timestamp, id) menurun; DB lama dimigrasi lewat init_db.py
+    __table_args__ = (db.Index('ix_prediction_history_user_timestamp', 'user_id', 'timestamp', 'id'),)
 
 # ... (Konfigurasi Sistem Lama, Authlib, Login/Logout, Utilitas SAMA) ...
 # -------------------------
@@ -69,6 +167,60 @@ class PredictionHistory(db.Model):
 DATASET_DIR = 'dataset'
 MODEL_DIR = 'models'
 INITIAL_ELO = 1500
+DATASET_CACHE_SIZE = int(os.environ.get('DATASET_CACHE_SIZE', 8))
+# Registry model: MODEL_PRELOAD=1 memuat semua liga saat start, selain itu dimuat saat pertama dipakai
+MODEL_PRELOAD = os.environ.get('MODEL_PRELOAD', '0') == '1'
+MODEL_CACHE_MAX_ENTRIES = int(os.environ.get('MODEL_CACHE_MAX_ENTRIES', 0)) or None
+MODEL_CACHE_MAX_MB = float(os.environ.get('MODEL_CACHE_MAX_MB', 0)) or None
+# Pakai bentuk ringkas RF/scaler (models/<liga>/compact/, mmap) jika tersedia
+MODEL_COMPACT = os.environ.get('MODEL_COMPACT', '1') == '1'
+PREDICT_BATCH_MAX = int(os.environ.get('PREDICT_BATCH_MAX', 500))
+# Cache hasil prediksi: PREDICTION_CACHE_SIZE=0 mematikan cache
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 2048))
+PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', 3600))
+# Jumlah fixture per potongan di /api/predict_fixtures (tiap potongan = satu predict_proba per model)
+PREDICT_STREAM_CHUNK = int(os.environ.get('PREDICT_STREAM_CHUNK', 20))
+# Proyeksi musim (/api/project_season): jumlah simulasi default/maksimum, simulasi per potongan (satu seed
+# turunan per potongan) dan thread yang menjalankan potongan; musim dimulai tiap bulan SEASON_START_MONTH
+SIM_DEFAULT = int(os.environ.get('SIM_DEFAULT', 10000))
+SIM_MAX = int(os.environ.get('SIM_MAX', 100000))
+SIM_CHUNK = int(os.environ.get('SIM_CHUNK', 2000))
+SIM_WORKERS = int(os.environ.get('SIM_WORKERS', min(4, os.cpu_count() or 1)))
+SEASON_START_MONTH = int(os.environ.get('SEASON_START_MONTH', 7))
+# Job latar belakang (unggahan CSV): tabel status SQLite dibagi semua worker, job dijalankan di thread pool
+JOB_DB_PATH = os.environ.get('JOB_DB_PATH', os.path.join(app.instance_path, 'jobs.sqlite3'))
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 1))
+JOB_TTL = float(os.environ.get('JOB_TTL', 24 * 3600))
+# Metrik Prometheus di /metrics: dengan METRICS_TOKEN wajib header "Authorization: Bearer <token>",
+# tanpa METRICS_TOKEN hanya bisa dibuka admin yang sudah login
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+# Request/job yang lebih lama dari ini (ms) dilog sebagai JSON lengkap dengan rincian tahap; 0 = mati
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 1000))
+# WARMUP=1: thread latar belakang memuat stack data/ML, dataset dan model semua liga saat start;
+# WARMUP=0: warmup dijalankan oleh probe /healthz/ready pertama. WARMUP_OAUTH=1 ikut mengambil metadata OpenID Google
+WARMUP = os.environ.get('WARMUP', '1') == '1'
+# Cache-Control max-age (detik) untuk GET publik ber-ETag (/api/leagues, /api/teams); sesudahnya browser/CDN revalidasi (304)
+API_CACHE_MAX_AGE = int(os.environ.get('API_CACHE_MAX_AGE', 60))
+WARMUP_OAUTH = os.environ.get('WARMUP_OAUTH', '1') == '1'
+# Riwayat prediksi ditulis di belakang (bulk insert per HISTORY_BATCH_SIZE baris / HISTORY_FLUSH_SECONDS);
+# antrian penuh (HISTORY_BUFFER_MAX) -> tunggu HISTORY_BLOCK_SECONDS lalu baris baru dibuang. 0 = commit langsung.
+# Antrian per worker: worker lain baru melihat riwayat baru setelah di-flush (<= ~HISTORY_FLUSH_SECONDS)
+HISTORY_WRITE_BEHIND = os.environ.get('HISTORY_WRITE_BEHIND', '1') == '1'
+HISTORY_BATCH_SIZE = int(os.environ.get('HISTORY_BATCH_SIZE', 200))
+HISTORY_FLUSH_SECONDS = float(os.environ.get('HISTORY_FLUSH_SECONDS', 1.0))
+HISTORY_BUFFER_MAX = int(os.environ.get('HISTORY_BUFFER_MAX', 10000))
+HISTORY_BLOCK_SECONDS = float(os.environ.get('HISTORY_BLOCK_SECONDS', 0.05))
+# Ukuran halaman /api/history (?limit=, maksimal HISTORY_PAGE_MAX)
+HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', 20))
+HISTORY_PAGE_MAX = int(os.environ.get('HISTORY_PAGE_MAX', 100))
+# Cache user_loader per proses; USER_CACHE_TTL=0 mematikan cache
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 30))
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 4096))
+# File versi yang diganti setiap ada perubahan User; dicek (satu stat) oleh user_loader di setiap worker
+USER_CACHE_VERSION_FILE = os.environ.get('USER_CACHE_VERSION_FILE', os.path.join(app.instance_path, 'user_cache.version'))
+# Preview hasil unggahan per halaman: /api/jobs/<id>/result?offset=&limit= (limit maksimal UPLOAD_PREVIEW_PAGE_MAX)
+UPLOAD_PREVIEW_PAGE_MAX = int(os.environ.get('UPLOAD_PREVIEW_PAGE_MAX', 500))
 FEATURE_COLUMNS = [
     'AvgH', 'AvgD', 'AvgA', 'Avg>2.5', 'Avg<2.5',
     'HomeTeamElo', 'AwayTeamElo', 'EloDifference',
@@ -81,13 +233,26 @@ FEATURE_COLUMNS = [
 # -------------------------
 # KONFIGURASI AUTHLIB (BARU)
 # -------------------------
-oauth.register(
-    name='google',
-    client_id=app.config['GOOGLE_CLIENT_ID'],
-    client_secret=app.config['GOOGLE_CLIENT_SECRET'],
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-    client_kwargs={'scope': 'openid email profile'}
-)
+# Authlib diimpor dan client Google didaftarkan saat pertama dibutuhkan (login atau warmup);
+# metadata OpenID-nya juga baru diambil saat itu
+_oauth = None
+_oauth_lock = threading.Lock()
+
+def get_oauth():
+    global _oauth
+    with _oauth_lock:
+        if _oauth is None:
+            OAuth = timed_import('authlib.integrations.flask_client').OAuth
+            oauth = OAuth(app)
+            oauth.register(
+                name='google',
+                client_id=app.config['GOOGLE_CLIENT_ID'],
+                client_secret=app.config['GOOGLE_CLIENT_SECRET'],
+                server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
+                client_kwargs={'scope': 'openid email profile'}
+            )
+            _oauth = oauth
+        return _oauth
 
 # ==========================================================
 # --- LOGIN / LOGOUT (BARU) ---
@@ -104,18 +269,18 @@ def auth_google():
     redirect_uri = url_for('auth_callback', _external=True)
     nonce = secrets.token_urlsafe(16)
     session['nonce'] = nonce
-    return oauth.google.authorize_redirect(redirect_uri, nonce=nonce)
+    return get_oauth().google.authorize_redirect(redirect_uri, nonce=nonce)
 
 
 @app.route('/auth/callback')
 def auth_callback():
     try:
-        token = oauth.google.authorize_access_token()
+        token = get_oauth().google.authorize_access_token()
         nonce = session.pop('nonce', None)
         if not nonce:
             raise Exception("Nonce tidak ditemukan di session. Coba login lagi.")
 
-        user_info = oauth.google.parse_id_token(token, nonce=nonce)
+        user_info = get_oauth().google.parse_id_token(token, nonce=nonce)
 
     except Exception as e:
         flash(f"Login via Google gagal: {str(e)}", "danger")
@@ -147,6 +312,7 @@ def auth_callback():
 @app.route('/logout')
 @login_required
 def logout():
+    invalidate_user_cache(current_user.id)
     logout_user()
     session.pop('new_login', None)
     session.clear()
@@ -157,91 +323,317 @@ def logout():
 # ==========================================================
 # UTILITAS (tidak diubah)
 # ==========================================================
-def pretty_league_name(file_name):
-    name = file_name.replace('dataset_', '').replace('.csv', '')
-    name = name.replace('_1', '')
-    special_cases = {
-        'seriea': 'Serie A',
-        'laliga': 'La Liga',
-        'premierleague': 'Premier League',
-        'bundesliga': 'Bundesliga',
-        'ligue1': 'Ligue 1'
-    }
-    key = name.lower().replace('_', '')
-    return special_cases.get(key, name.replace('_', ' ').title())
+# Katalog liga dipindai sekali dan hanya dipindai ulang jika folder dataset berubah atau setelah disimpan
+league_catalog = LeagueCatalog(
+    DATASET_DIR, MODEL_DIR,
+    metadata_loader=lambda path: dataset_cache.derived(path, 'league_metadata', league_metadata))
 
 def file_name_from_pretty(league_display):
-    league_lower = league_display.lower().replace(' ', '')
-    files = glob.glob(os.path.join(DATASET_DIR, '*.csv'))
-    for f in files:
-        fname = os.path.splitext(os.path.basename(f))[0].lower().replace('_', '')
-        if league_lower in fname:
-            return os.path.splitext(os.path.basename(f))[0]
-    return league_lower
+    entry = league_catalog.get(league_display)
+    return entry.file_base if entry else league_display.lower().replace(' ', '')
 
 def list_leagues():
-    files = glob.glob(os.path.join(DATASET_DIR, '*.csv'))
-    return [pretty_league_name(os.path.splitext(os.path.basename(p))[0]) for p in files]
+    return league_catalog.names()
 
-def load_league_dataset_by_name(league_display):
-    league_lower = league_display.lower().replace(' ', '')
-    files = glob.glob(os.path.join(DATASET_DIR, '*.csv'))
-    matched_file = None
-    for f in files:
-        fname = os.path.splitext(os.path.basename(f))[0].lower().replace('_', '')
-        if league_lower in fname:
-            matched_file = f
-            break
-    if not matched_file:
-        print("Available dataset files:", [os.path.basename(f) for f in files])
+def find_league_dataset_path(league_display):
+    entry = league_catalog.get(league_display)
+    if entry is None:
+        print("Available leagues:", list_leagues())
         raise FileNotFoundError(f"Dataset '{league_display}' tidak ditemukan di server.")
-    df = pd.read_csv(matched_file)
-    if 'Date' in df.columns:
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-    return df
+    return entry.dataset_path
+
+# ==========================================================
+# METRIK (Prometheus) DAN TIMER PER TAHAP
+# ==========================================================
+metrics_registry = Registry()
+stage_metrics = StageMetrics(metrics_registry, league_label=LabelAllowlist(lambda: list_leagues()),
+                             enabled=METRICS_ENABLED)
+request_counter = metrics_registry.counter('app_requests_total', 'Jumlah request per route, method dan status HTTP.',
+                                           ('route', 'method', 'status'))
+request_duration = metrics_registry.histogram('app_request_duration_seconds', 'Durasi request per route dan method.',
+                                              ('route', 'method'))
+slow_counter = metrics_registry.counter('app_slow_requests_total', 'Jumlah request/job di atas SLOW_REQUEST_MS.', ('route',))
+slow_logger = logging.getLogger('prediksi.slow')
+
+def finish_trace(trace, method, status):
+    """Mencatat durasi total trace dan menulis log JSON jika melewati SLOW_REQUEST_MS."""
+    elapsed=trace.elapsed()
+    request_counter.inc(trace.route, method, str(status))
+    request_duration.observe(elapsed, trace.route, method)
+    if SLOW_REQUEST_MS and elapsed*1000 >= SLOW_REQUEST_MS:
+        slow_counter.inc(trace.route)
+        slow_logger.warning(json.dumps({
+            'event':'slow_request','route':trace.route,'method':method,'status':status,
+            'duration_ms':round(elapsed*1000, 1),'league':trace.league,
+            'stages':[{'stage':name,'league':league,'ms':round(seconds*1000, 2)} for name, league, seconds in trace.stages],
+        }))
+
+@app.before_request
+def metrics_begin_request():
+    stage_metrics.begin(request.url_rule.rule if request.url_rule else 'unmatched')
+
+@app.after_request
+def metrics_end_request(response):
+    trace=stage_metrics.end()
+    if trace is not None: finish_trace(trace, request.method, response.status_code)
+    return response
+
+def traced_job(route, func):
+    """Membungkus fungsi job latar belakang agar tahapnya tercatat dengan route `route`."""
+    def run(progress, **kwargs):
+        with stage_metrics.trace(route) as trace:
+            status='done'
+            try:
+                return func(progress, **kwargs)
+            except Exception:
+                status='error'
+                raise
+            finally:
+                if trace is not None: finish_trace(trace, 'JOB', status)
+    return run
+
+def read_dataset_timed(path):
+    entry=league_catalog.by_path(path)
+    with stage_metrics.stage('read_dataset', entry.name if entry else pretty_league_name(os.path.basename(path))):
+        return read_dataset(path)
+
+def joblib_load_timed(path):
+    with stage_metrics.stage('joblib_load'):
+        return joblib.load(path)
+
+# Cache dataset per proses: dataset hanya dibaca ulang jika versinya (mtime/ukuran CSV atau manifest store) berubah
+dataset_cache = LeagueDatasetCache(read_dataset_timed, max_entries=DATASET_CACHE_SIZE, version_func=dataset_version)
+
+# Snapshot keadaan terkini per liga (dataset/<nama>.snapshot.json) untuk /api/features dan /api/team_stats
+league_snapshots = SnapshotStore(dataset_cache.get, version_func=dataset_version)
+
+def resolve_model_league(league_display):
+    # Folder model mengikuti entri katalog (sama seperti dataset); liga tanpa dataset memakai nama tampilannya
+    entry = league_catalog.get(league_display)
+    if entry is None:
+        key = league_folder_name(league_display)
+        return key, os.path.join(MODEL_DIR, key)
+    return entry.key, entry.model_dir
+
+model_registry = ModelRegistry(
+    MODEL_DIR,
+    max_entries=MODEL_CACHE_MAX_ENTRIES,
+    max_bytes=int(MODEL_CACHE_MAX_MB * 1024 * 1024) if MODEL_CACHE_MAX_MB else None,
+    loader=joblib_load_timed,
+    compact=MODEL_COMPACT,
+    resolver=resolve_model_league,
+)
+
+# Hasil prediksi per (liga, versi bundle, vektor fitur); artefak baru dari train.py = versi baru
+prediction_cache = PredictionCache(max_entries=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+
+job_queue = JobQueue(JOB_DB_PATH, workers=JOB_WORKERS, ttl=JOB_TTL)
+
+def predict_with_cache(league, bundle, df_features):
+    """
+    `bundle.predict` untuk setiap baris `df_features` (kolom FEATURE_COLUMNS),
+    lewat prediction_cache: hanya baris yang belum ada di cache yang dikirim
+    ke model, sekaligus dalam satu panggilan.
+    """
+    league_key=resolve_model_league(league)[0]
+    keys=[canonical_features(row) for row in df_features.itertuples(index=False, name=None)]
+    results=[prediction_cache.get(league_key, bundle.version, key) for key in keys]
+    missing=[i for i, result in enumerate(results) if result is None]
+    if missing:
+        start=time.perf_counter()
+        with stage_metrics.stage('predict_proba', league):
+            predictions=bundle.predict(df_features.iloc[missing])
+        per_row=(time.perf_counter()-start)/len(missing)
+        for i, prediction in zip(missing, predictions):
+            results[i]=prediction
+            prediction_cache.put(league_key, bundle.version, keys[i], prediction, per_row)
+    return results
+
+def load_league_dataset_by_name(league_display):
+    # DataFrame dari cache bersifat read-only; salin dulu jika ingin mengubah isinya
+    return dataset_cache.get(find_league_dataset_path(league_display))
+
+def load_derived_by_name(league_display, name, builder):
+    # Waktu membangun struktur turunan dicatat sebagai tahap 'build_<name>'
+    def build(df):
+        with stage_metrics.stage('build_'+name, league_display):
+            return builder(df)
+    return dataset_cache.derived(find_league_dataset_path(league_display), name, build)
+
+def load_team_index_by_name(league_display):
+    # Indeks per tim dibangun sekali per versi dataset
+    return load_derived_by_name(league_display, 'team_index', TeamIndex.from_frame)
+
+def load_pair_index_by_name(league_display):
+    # Indeks head-to-head per pasangan tim, juga sekali per versi dataset
+    return load_derived_by_name(league_display, 'pair_index', PairIndex.from_frame)
+
+def load_match_keys_by_name(league_display):
+    # Indeks kunci laga (tanggal, tuan rumah, tamu) untuk deteksi duplikat saat upload
+    return load_derived_by_name(league_display, 'match_keys', MatchKeyIndex.from_frame)
+
+def load_feature_engine_by_name(league_display):
+    # State FeatureEngine setelah seluruh dataset liga (Elo, form, H2H), sekali per versi dataset
+    return load_derived_by_name(
+        league_display, 'feature_engine',
+        lambda df: FeatureEngine.from_history(df, team_index=load_team_index_by_name(league_display)))
+
+def load_snapshot_by_name(league_display):
+    # Snapshot Elo/form/H2H terkini: dari memori atau dataset/<nama>.snapshot.json, dibangun ulang hanya jika usang
+    with stage_metrics.stage('snapshot', league_display):
+        return league_snapshots.get(find_league_dataset_path(league_display))
+
+def team_roster(df):
+    # Daftar tim terurut + ETag dari isinya: hanya berubah jika ada tim baru, bukan setiap ada laga baru
+    teams=sorted(set(df['HomeTeam']).union(set(df['AwayTeam'])))
+    return teams, json_etag(teams)
+
+def load_team_roster_by_name(league_display):
+    # Roster tim dihitung sekali per versi dataset
+    return load_derived_by_name(league_display, 'team_roster', team_roster)
+
+def get_model_bundle(league_display):
+    # Termasuk memuat artefak (joblib/mmap) jika bundle belum ada atau sudah berubah
+    with stage_metrics.stage('model_lookup', league_display):
+        return model_registry.get(league_display)
 
 # ==========================================================
 # RIWAYAT PREDIKSI PER USER (Tetap menggunakan DB)
 # ==========================================================
+def write_history_rows(rows):
+    # Satu bulk insert + satu commit untuk seluruh baris (dipanggil dari thread flusher atau langsung)
+    with app.app_context():
+        try:
+            with stage_metrics.stage('history_commit'):
+                db.session.execute(PredictionHistory.__table__.insert(), rows)
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+history_buffer = WriteBehindBuffer(
+    write_history_rows, key_func=lambda row: row['user_id'],
+    max_rows=HISTORY_BUFFER_MAX, batch_size=HISTORY_BATCH_SIZE,
+    flush_interval=HISTORY_FLUSH_SECONDS, block_seconds=HISTORY_BLOCK_SECONDS,
+)
+if HISTORY_WRITE_BEHIND:
+    history_buffer.start()
+    # Sisa antrian ditulis saat proses berhenti normal (termasuk worker gunicorn yang di-restart)
+    atexit.register(history_buffer.close)
+
 def add_prediction_to_history(prediction_dict):
-    if not current_user.is_authenticated: # Hanya simpan jika login
+    add_predictions_to_history([prediction_dict])
+
+def add_predictions_to_history(prediction_dicts):
+    # Banyak prediksi (misal dari /api/predict_batch) disimpan dengan satu insert dan satu commit
+    if not current_user.is_authenticated or not prediction_dicts: # Hanya simpan jika login
         return
+    # Waktu dicatat saat prediksi (UTC tanpa tzinfo, sama seperti yang dibaca kembali dari DB)
+    timestamp = datetime.now(timezone.utc).replace(tzinfo=None)
+    rows = [{
+        'user_id': current_user.id,
+        'timestamp': timestamp,
+        'league': prediction_dict.get('league'),
+        'home_team': prediction_dict.get('home_team'),
+        'away_team': prediction_dict.get('away_team'),
+        'prediction_data': prediction_dict.get('prediction'),
+    } for prediction_dict in prediction_dicts]
     try:
-        new_history = PredictionHistory(
-            user_id = current_user.id,
-            league = prediction_dict.get('league'),
-            home_team = prediction_dict.get('home_team'),
-            away_team = prediction_dict.get('away_team'),
-            prediction_data = prediction_dict.get('prediction')
-        )
-        db.session.add(new_history)
-        db.session.commit()
+        if HISTORY_WRITE_BEHIND:
+            history_buffer.add(rows)
+        else:
+            write_history_rows(rows)
     except Exception as e:
-        db.session.rollback()
         print(f"Gagal menyimpan riwayat ke DB: {e}")
 
+def history_item(row):
+    return {
+        'league': row['league'],
+        'home_team': row['home_team'],
+        'away_team': row['away_team'],
+        'prediction': row['prediction_data'],
+        'timestamp': row['timestamp'],
+    }
+
+def encode_history_cursor(timestamp, row_id):
+    raw=json.dumps([timestamp.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_history_cursor(cursor):
+    raw=base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    timestamp, row_id = json.loads(raw)
+    return datetime.fromisoformat(timestamp), int(row_id)
+
 @app.route('/api/history', methods=['GET'])
 @login_required # <-- API ini tetap butuh login
 def api_history():
-    histories_query = PredictionHistory.query.filter_by(user_id=current_user.id)\
-                                           .order_by(PredictionHistory.timestamp.desc())\
-                                           .limit(20).all()
-    histories_query.reverse()
-    history_list = []
-    for item in histories_query:
-        history_list.append({
-            'league': item.league,
-            'home_team': item.home_team,
-            'away_team': item.away_team,
-            'prediction': item.prediction_data,
-            'timestamp': item.timestamp.isoformat()
-        })
-    return jsonify({'status':'ok','history': history_list})
+    """
+    Riwayat per halaman, terbaru lebih dulu (di dalam halaman tetap urut lama -> baru).
+    ?limit= ukuran halaman, ?cursor= nilai `next_cursor` dari halaman sebelumnya.
+    Keyset pagination pada indeks (user_id, timestamp, id): biaya per halaman tetap.
+    """
+    try:
+        limit=min(max(int(request.args.get('limit', HISTORY_PAGE_SIZE)), 1), HISTORY_PAGE_MAX)
+        cursor=request.args.get('cursor')
+        after=decode_history_cursor(cursor) if cursor else None
+    except (TypeError, ValueError):
+        return jsonify({'status':'error','message':'Parameter limit/cursor tidak valid'}),400
+
+    # Antrian dibaca sebelum query: baris yang tersimpan di antaranya muncul di keduanya lalu dihapus duplikatnya.
+    # Jika antrian tidak muat di halaman pertama atau user sudah menggulir, antrian ditulis dulu agar
+    # cursor (timestamp, id) tetap konsisten. Jika penulisan gagal, baris tetap di antrian dan tetap
+    # digabung: halaman berikutnya hanya memuat baris antrian yang lebih lama dari cursor
+    pending = history_buffer.pending(current_user.id)
+    if pending and (after is not None or len(pending) >= limit):
+        if history_buffer.flush():
+            pending = []
+        else:
+            pending = history_buffer.pending(current_user.id)
+    if after is not None:
+        # Baris antrian dengan timestamp sama dengan cursor sudah tampil di halaman sebelumnya
+        pending = [row for row in pending if row['timestamp'] < after[0]]
+
+    query = PredictionHistory.query.filter_by(user_id=current_user.id)
+    if after is not None:
+        query = query.filter(or_(PredictionHistory.timestamp < after[0],
+                                 and_(PredictionHistory.timestamp == after[0], PredictionHistory.id < after[1])))
+    rows = query.order_by(PredictionHistory.timestamp.desc(), PredictionHistory.id.desc()).limit(limit + 1).all()
+
+    items = [(history_item({
+        'league': item.league, 'home_team': item.home_team, 'away_team': item.away_team,
+        'prediction_data': item.prediction_data, 'timestamp': item.timestamp.replace(tzinfo=None),
+    }), item.id) for item in rows]
+    seen = {(item['timestamp'], item['league'], item['home_team'], item['away_team']) for item, _ in items}
+    for row in pending:
+        item = history_item(row)
+        if (item['timestamp'], item['league'], item['home_team'], item['away_team']) not in seen:
+            items.append((item, None))
+    # Terbaru lebih dulu; baris antrian (id None) lebih baru dari baris DB dengan timestamp sama
+    items.sort(key=lambda pair: (pair[0]['timestamp'], float('inf') if pair[1] is None else pair[1]), reverse=True)
+    page = items[:limit]
+    next_cursor = None
+    if len(items) > limit:
+        # Cursor hanya bisa menunjuk baris DB: halaman dipotong setelah baris DB terakhirnya (baris antrian
+        # sesudahnya lebih lama dari cursor, jadi tampil di halaman berikutnya), atau diperpanjang sampai
+        # baris DB pertama jika halaman hanya berisi baris antrian
+        db_positions = [i for i, (_, row_id) in enumerate(items) if row_id is not None]
+        in_page = [i for i in db_positions if i < limit]
+        cut = in_page[-1] if in_page else (db_positions[0] if db_positions else None)
+        if cut is None:
+            page = items
+        else:
+            page = items[:cut + 1]
+            if len(items) > cut + 1:
+                next_cursor = encode_history_cursor(items[cut][0]['timestamp'], items[cut][1])
+    history_list = [{**item, 'timestamp': item['timestamp'].isoformat()} for item, _ in reversed(page)]
+    return jsonify({'status':'ok','history': history_list,'next_cursor': next_cursor})
 
 @app.route('/api/clear_history', methods=['POST'])
 @login_required # <-- API ini tetap butuh login
 def api_clear_history():
     try:
+        # Baris yang masih di antrian ikut dibuang agar tidak muncul lagi setelah di-flush
+        history_buffer.discard(current_user.id)
         PredictionHistory.query.filter_by(user_id=current_user.id).delete()
         db.session.commit()
         return jsonify({'status':'ok','message':'Riwayat dibersihkan'})
@@ -255,56 +647,35 @@ def api_clear_history():
 def expected_score(rating_a, rating_b):
     return 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
 def recent_stats_for_team(df, team, window=5):
-    mask = (df['HomeTeam'] == team) | (df['AwayTeam'] == team)
+    mask = ((df['HomeTeam'] == team) | (df['AwayTeam'] == team)).to_numpy()
     team_games = df[mask].sort_values('Date', ascending=False) if 'Date' in df.columns else df[mask]
     if team_games.empty:
         return {'AvgGoalsScored': 0, 'AvgGoalsConceded': 0, 'Wins': 0, 'Draws': 0, 'Losses': 0}
     recent = team_games.head(window)
-    def gs(row): return row['FTHG'] if row['HomeTeam']==team else row['FTAG']
-    def gc(row): return row['FTAG'] if row['HomeTeam']==team else row['FTHG']
-    scored = recent.apply(gs, axis=1)
-    conceded = recent.apply(gc, axis=1)
-    def result(row):
-        h,a = (row['FTHG'],row['FTAG']) if row['HomeTeam']==team else (row['FTAG'],row['FTHG'])
-        return 'W' if h>a else 'D' if h==a else 'L'
-    res = recent.apply(result, axis=1)
-    return {
-        'AvgGoalsScored': float(scored.mean()),
-        'AvgGoalsConceded': float(conceded.mean()),
-        'Wins': int((res=='W').sum()),
-        'Draws': int((res=='D').sum()),
-        'Losses': int((res=='L').sum())
-    }
+    is_home = (recent['HomeTeam'] == team).to_numpy()
+    fthg = recent['FTHG'].to_numpy(dtype=float)
+    ftag = recent['FTAG'].to_numpy(dtype=float)
+    return summarize_results(np.where(is_home, fthg, ftag), np.where(is_home, ftag, fthg))
 def h2h_stats(df, home_team, away_team, window=5):
     mask = ((df['HomeTeam']==home_team)&(df['AwayTeam']==away_team)) | ((df['HomeTeam']==away_team)&(df['AwayTeam']==home_team))
-    hth = df[mask].sort_values('Date', ascending=False).head(window)
-    hth_home_wins=hth_away_wins=hth_draws=0
-    home_goals=[]; away_goals=[]
-    for _, row in hth.iterrows():
-        if row['HomeTeam']==home_team: h_goals,a_goals=row['FTHG'],row['FTAG']
-        else: h_goals,a_goals=row['FTAG'],row['FTHG']
-        home_goals.append(h_goals); away_goals.append(a_goals)
-        if h_goals>a_goals: hth_home_wins+=1
-        elif h_goals<a_goals: hth_away_wins+=1
-        else: hth_draws+=1
-    avg_home_goals = float(np.mean(home_goals)) if home_goals else 0
-    avg_away_goals = float(np.mean(away_goals)) if away_goals else 0
-    return {'HTH_HomeWins':hth_home_wins,'HTH_AwayWins':hth_away_wins,'HTH_Draws':hth_draws,
-            'HTH_AvgHomeGoals':avg_home_goals,'HTH_AvgAwayGoals':avg_away_goals}
-def compute_features_from_dataset(df, home_team, away_team, window=5):
+    hth = df[mask.to_numpy()].sort_values('Date', ascending=False).head(window)
+    is_home = (hth['HomeTeam']==home_team).to_numpy()
+    fthg = hth['FTHG'].to_numpy(dtype=float)
+    ftag = hth['FTAG'].to_numpy(dtype=float)
+    return summarize_h2h(np.where(is_home, fthg, ftag), np.where(is_home, ftag, fthg))
+def compute_features_from_dataset(df, home_team, away_team, window=5, team_index=None, pair_index=None):
+    # team_index/pair_index opsional: kirim indeks yang sudah di-cache agar tidak dibangun ulang
+    if team_index is None:
+        team_index=TeamIndex.from_frame(df)
+    if pair_index is None:
+        pair_index=PairIndex.from_frame(df)
     last_home_elo=last_away_elo=INITIAL_ELO
-    if 'HomeTeamElo' in df.columns and 'AwayTeamElo' in df.columns:
-        tmp_h=df[(df['HomeTeam']==home_team)|(df['AwayTeam']==home_team)]
-        if not tmp_h.empty:
-            row=tmp_h.sort_values('Date', ascending=False).iloc[0]
-            last_home_elo=row['HomeTeamElo'] if row['HomeTeam']==home_team else row['AwayTeamElo']
-        tmp_a=df[(df['HomeTeam']==away_team)|(df['AwayTeam']==away_team)]
-        if not tmp_a.empty:
-            row=tmp_a.sort_values('Date', ascending=False).iloc[0]
-            last_away_elo=row['HomeTeamElo'] if row['HomeTeam']==away_team else row['AwayTeamElo']
-    home_stats=recent_stats_for_team(df, home_team)
-    away_stats=recent_stats_for_team(df, away_team)
-    hth=h2h_stats(df, home_team, away_team, window)
+    if team_index.has_elo:
+        if team_index.last_elo(home_team) is not None: last_home_elo=team_index.last_elo(home_team)
+        if team_index.last_elo(away_team) is not None: last_away_elo=team_index.last_elo(away_team)
+    home_stats=team_index.recent_stats(home_team)
+    away_stats=team_index.recent_stats(away_team)
+    hth=pair_index.h2h(home_team, away_team, window)
     return {
         'AvgH':'','AvgD':'','AvgA':'','Avg>2.5':'','Avg<2.5':'',
         'HomeTeamElo':last_home_elo,'AwayTeamElo':last_away_elo,
@@ -335,8 +706,37 @@ def format_float_clean(number):
         return f"{rounded_num:g}" 
     except (ValueError, TypeError):
         return str(number) # Kembalikan sebagai string jika bukan angka
+
+# Akhiran desimal untuk 0..99 per seratus: 0 -> '', 5 -> '.05', 10 -> '.1', 25 -> '.25'
+_DECIMAL_SUFFIX = None
+
+def format_float_series(values):
+    """
+    Versi vektor format_float_clean untuk satu kolom numerik; hasilnya sama
+    persis per sel (array object berisi string, NaN -> "").
+    Nilai yang dibulatkan ke n/100 lalu ditulis sebagai tanda + n//100 +
+    akhiran n%100. Nilai yang hampir tepat di tengah (x*100 ~ k+0.5, di mana
+    pembulatan float bisa berbeda), |x| >= 1e4 (notasi :g bisa eksponensial)
+    dan inf tetap lewat format_float_clean.
+    """
+    global _DECIMAL_SUFFIX
+    if _DECIMAL_SUFFIX is None:
+        _DECIMAL_SUFFIX=np.array(['']+['.'+f'{i:02d}'.rstrip('0') for i in range(1,100)], dtype=object)
+    x=pd.Series(values).to_numpy(dtype=np.float64, na_value=np.nan)
+    out=np.full(len(x), '', dtype=object)
+    with np.errstate(invalid='ignore'):
+        scaled=x*100
+        fast=(np.abs(x)<1e4) & (np.abs(np.abs(scaled-np.trunc(scaled))-0.5)>1e-6)
+    n=np.rint(scaled[fast])
+    hundredths=np.abs(n).astype(np.int64)
+    sign=np.where(np.signbit(n), '-', '').astype(object)  # round(-0.001, 2) -> -0.0 -> '-0'
+    out[fast]=sign+(hundredths//100).astype(str).astype(object)+_DECIMAL_SUFFIX[hundredths%100]
+    slow=~fast & ~np.isnan(x)
+    if slow.any():
+        out[slow]=[format_float_clean(v) for v in x[slow]]
+    return out
         
-def update_elo_and_features(df_existing, df_new, window=5, K=30, initial_elo=1500):
+def update_elo_and_features(df_existing, df_new, window=5, K=30, initial_elo=1500, team_index=None, engine=None, progress=None):
     # -----------------------------------------------------------------
     # 🟢 PERBAIKAN 1 (MENGATASI TypeError): Pastikan 'Date' bertipe datetime
     # -----------------------------------------------------------------
@@ -346,110 +746,30 @@ def update_elo_and_features(df_existing, df_new, window=5, K=30, initial_elo=150
         df_new['Date'] = pd.to_datetime(df_new['Date'], errors='coerce')
     # -----------------------------------------------------------------
 
-    # Penggabungan dan pengurutan
-    df_combined = pd.concat([df_existing, df_new], ignore_index=True).sort_values('Date').reset_index(drop=True)
-    
-    elo = {}
-    new_rows = []
-    
-    # -----------------------------------------------------------------
-    # 🟢 PERBAIKAN PERFORMA: Inisialisasi ELO dari data terakhir yang ada
-    # -----------------------------------------------------------------
-    if not df_existing.empty:
-        df_existing_last = df_existing.sort_values('Date', ascending=False)
-        all_teams = set(df_existing_last['HomeTeam']).union(set(df_existing_last['AwayTeam']))
-        
-        for team in all_teams:
-            # Cari baris terakhir tim bermain
-            last_game = df_existing_last[(df_existing_last['HomeTeam'] == team) | (df_existing_last['AwayTeam'] == team)]
-            if not last_game.empty:
-                row = last_game.iloc[0]
-                # Gunakan ELO terakhir yang dihitung di dataset lama
-                last_elo = row['HomeTeamElo'] if row['HomeTeam']==team else row['AwayTeamElo']
-                elo[team] = last_elo
-    
-    start_idx = len(df_existing)
-    
-    # Loop dimulai dari indeks yang mungkin mengandung data yang sudah ada
-    # Tetapi logika perhitungan fitur hanya akan digunakan untuk baris BARU (idx >= start_idx)
-    for idx, row in df_combined.iterrows():
-        home, away = row['HomeTeam'], row['AwayTeam']
-        
-        # Ambil ELO SEBELUM pertandingan ini
-        h_elo_pre = elo.get(home, initial_elo)
-        a_elo_pre = elo.get(away, initial_elo)
-        
-        # Perhitungan Expected Score ELO
-        E_h = 1/(1+10**((a_elo_pre-h_elo_pre)/400))
-        E_a = 1-E_h
-        
-        # Hasil Akhir Pertandingan
-        if row['FTHG']>row['FTAG']: S_h,S_a=1,0
-        elif row['FTHG']<row['FTAG']: S_h,S_a=0,1
-        else: S_h,S_a=0.5,0.5
-        
-        # Pembaruan ELO (untuk digunakan pada pertandingan berikutnya)
-        h_elo_new=h_elo_pre+K*(S_h-E_h)
-        a_elo_new=a_elo_pre+K*(S_a-E_a)
-        # Simpan ELO yang sudah diperbarui ke dictionary
-        elo[home],elo[away]=h_elo_new,a_elo_new
-        
-        # HANYA hitung FITUR RUMIT (recent stats & HTH) untuk baris BARU (idx >= start_idx)
-        if idx >= start_idx:
-            # df_past hanya berisi data sebelum pertandingan saat ini
-            df_past=df_combined.iloc[:idx]
-            home_stats=recent_stats_for_team(df_past, home, window)
-            away_stats=recent_stats_for_team(df_past, away, window)
-            
-            # Statistik Head-to-Head
-            hth_mask=((df_past['HomeTeam']==home)&(df_past['AwayTeam']==away))|((df_past['HomeTeam']==away)&(df_past['AwayTeam']==home))
-            hth=df_past[hth_mask].sort_values('Date', ascending=False).head(window)
-            hth_home_wins=hth_away_wins=hth_draws=0
-            home_goals=[]; away_goals=[]
-            
-            if not hth.empty:
-                for _, r in hth.iterrows():
-                    # Tentukan skor relatif terhadap HomeTeam pada pertandingan saat ini
-                    if r['HomeTeam']==home: h_g,a_g=r['FTHG'],r['FTAG']
-                    else: h_g,a_g=r['FTAG'],r['FTHG']
-                    home_goals.append(h_g); away_goals.append(a_g)
-
-                    if h_g>a_g: hth_home_wins+=1
-                    elif h_g<a_g: hth_away_wins+=1
-                    else: hth_draws+=1
-                
-                # Perhitungan rata-rata gol (relatif terhadap tim saat ini)
-                hth_avg_home_goals=float(np.mean(home_goals))
-                hth_avg_away_goals=float(np.mean(away_goals))
-            else: hth_avg_home_goals=hth_avg_away_goals=0
-
-            row_full = row.copy()
-
-            # -----------------------------------------------------------------
-            # 🟢 PERBAIKAN 2: Menyalin nilai Odds dari data CSV baru
-            # -----------------------------------------------------------------
-            odds_values = {}
-            odds_cols = ['AvgH', 'AvgD', 'AvgA', 'Avg>2.5', 'Avg<2.5']
-            for col in odds_cols:
-                if col in row and pd.notna(row[col]): odds_values[col] = row[col]
-                else: odds_values[col] = ''
-            
-            row_full.update({
-                'HomeTeamElo':h_elo_new,'AwayTeamElo':a_elo_new,'EloDifference':h_elo_new-a_elo_new,
-                'Home_AvgGoalsScored':home_stats['AvgGoalsScored'],'Home_AvgGoalsConceded':home_stats['AvgGoalsConceded'],
-                'Home_Wins':home_stats['Wins'],'Home_Draws':home_stats['Draws'],'Home_Losses':home_stats['Losses'],
-                'Away_AvgGoalsScored':away_stats['AvgGoalsScored'],'Away_AvgGoalsConceded':away_stats['AvgGoalsConceded'],
-                'Away_Wins':away_stats['Wins'],'Away_Draws':away_stats['Draws'],'Away_Losses':away_stats['Losses'],
-                'HTH_HomeWins':hth_home_wins,'HTH_AwayWins':hth_away_wins,'HTH_Draws':hth_draws,
-                'HTH_AvgHomeGoals':hth_avg_home_goals,'HTH_AvgAwayGoals':hth_avg_away_goals,
-                # Tambahkan Odds ke row_full
-                **odds_values 
-            })
-
-            # Hanya kembalikan baris yang BARU diunggah
-            new_rows.append(row_full)
-            
-    return pd.DataFrame(new_rows)
+    # Elo, form 5 laga dan H2H dihitung sekali jalan oleh FeatureEngine.
+    # `engine` (opsional) adalah state setelah df_existing, sehingga hanya baris baru yang diproses.
+    df_combined, new_positions, features = run_engine(
+        df_existing, df_new, window, K, initial_elo, engine=engine, team_index=team_index, progress=progress)
+    if len(new_positions) == 0:
+        return pd.DataFrame()
+
+    # Baris hasil = baris gabungan + fitur baru; nilai NaN tidak menimpa nilai yang ada
+    columns = list(df_combined.columns)
+    col_pos = {col: i for i, col in enumerate(columns)}
+    rows = df_combined.iloc[new_positions].to_numpy(dtype=object)
+    for row, feats in zip(rows, features):
+        # -----------------------------------------------------------------
+        # 🟢 PERBAIKAN 2: Menyalin nilai Odds dari data CSV baru
+        # -----------------------------------------------------------------
+        for col in ODDS_COLUMNS:
+            value = row[col_pos[col]] if col in col_pos else np.nan
+            feats[col] = value if pd.notna(value) else ''
+        for col, value in feats.items():
+            if col in col_pos and pd.notna(value):
+                row[col_pos[col]] = value
+
+    # Hanya kembalikan baris yang BARU diunggah
+    return pd.DataFrame(rows.tolist(), columns=columns, index=new_positions)
 
 
 # ==========================================================
@@ -465,12 +785,36 @@ def index():
     leagues=list_leagues()
     return render_template('index.html', leagues=leagues)
 
+def json_etag(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()).hexdigest()[:32]
+
+def conditional_json(payload, etag=None):
+    """
+    Respons JSON dengan ETag kuat (dari isi payload) dan Cache-Control publik.
+    If-None-Match yang cocok (termasuk W/ dari CDN yang mengompres) dijawab 304 tanpa body.
+    """
+    etag=etag or json_etag(payload)
+    if request.if_none_match.contains_weak(etag):
+        response=app.response_class(status=304)
+    else:
+        response=jsonify(payload)
+    response.set_etag(etag)
+    response.cache_control.public=True
+    response.cache_control.max_age=API_CACHE_MAX_AGE
+    return response
+
 @app.route('/api/leagues')
 # Rute ini boleh publik
 def api_leagues():
-    files = glob.glob(os.path.join(DATASET_DIR, '*.csv'))
-    leagues=[pretty_league_name(os.path.splitext(os.path.basename(f))[0]) for f in files]
-    return jsonify({'status':'ok','leagues':leagues})
+    leagues=list_leagues()
+    if request.args.get('details') != '1':
+        return conditional_json({'status':'ok','leagues':leagues})
+    # ?details=1: jumlah laga, tanggal terakhir dan jumlah tim per liga (membaca dataset lewat cache)
+    details=[]
+    for league in leagues:
+        info=league_catalog.metadata(league)
+        details.append({k: info[k] for k in ('name', 'key', 'rows', 'last_date', 'teams')})
+    return conditional_json({'status':'ok','leagues':leagues,'details':details})
 
 @app.route('/stats')
 # Rute ini boleh publik
@@ -484,15 +828,10 @@ def api_team_stats():
     league=body.get('league')
     team=body.get('team')
     if not all([league,team]): return jsonify({'status':'error','message':'league and team required'}),400
-    try: df=load_league_dataset_by_name(league)
+    try: snapshot=load_snapshot_by_name(league)
     except FileNotFoundError as e: return jsonify({'status':'error','message':str(e)}),404
-    stats=recent_stats_for_team(df, team)
-    last_elo=None
-    if 'HomeTeamElo' in df.columns and 'AwayTeamElo' in df.columns:
-        tmp=df[(df['HomeTeam']==team)|(df['AwayTeam']==team)]
-        if not tmp.empty:
-            row=tmp.sort_values('Date', ascending=False).iloc[0]
-            last_elo=row['HomeTeamElo'] if row['HomeTeam']==team else row['AwayTeamElo']
+    stats=snapshot.recent_stats(team)
+    last_elo=snapshot.last_elo(team)
     return jsonify({'status':'ok','stats':{'recent':stats,'last_elo':last_elo}})
 
 @app.route('/api/teams')
@@ -501,9 +840,8 @@ def api_teams():
     league=request.args.get('league')
     if not league: return jsonify({'status':'error','message':'parameter league diperlukan'}),400
     try:
-        df=load_league_dataset_by_name(league)
-        teams=sorted(set(df['HomeTeam']).union(set(df['AwayTeam'])))
-        return jsonify({'status':'ok','teams':teams})
+        teams, etag=load_team_roster_by_name(league)
+        return conditional_json({'status':'ok','teams':teams}, etag=etag)
     except FileNotFoundError as e:
         return jsonify({'status':'error','message':str(e)}),404
 
@@ -513,8 +851,10 @@ def api_features():
     body=request.json or {}
     league=body.get('league'); home=body.get('home'); away=body.get('away')
     if not all([league,home,away]): return jsonify({'status':'error','message':'league, home, away dibutuhkan'}),400
-    df=load_league_dataset_by_name(league)
-    feats=compute_features_from_dataset(df, home, away)
+    # Snapshot berperan sebagai team_index dan pair_index: dataset lengkap tidak perlu dibaca
+    snapshot=load_snapshot_by_name(league)
+    with stage_metrics.stage('features', league):
+        feats=compute_features_from_dataset(None, home, away, team_index=snapshot, pair_index=snapshot)
     return jsonify({'status':'ok','features':feats})
 
 @app.route('/api/predict', methods=['POST'])
@@ -530,30 +870,9 @@ def api_predict():
         if not all([league, features, home_team, away_team]):
             return jsonify({'status':'error','message':'Data liga, fitur, dan tim diperlukan'}),400
 
-        league_dir=os.path.join(MODEL_DIR, league.lower().replace(' ','_'))
-        model_hda=joblib.load(os.path.join(league_dir,'model_hda.pkl'))
-        model_ou25=joblib.load(os.path.join(league_dir,'model_ou25.pkl'))
-        model_btts=joblib.load(os.path.join(league_dir,'model_btts.pkl'))
-        scaler=joblib.load(os.path.join(league_dir,'scaler.pkl'))
-        le_ftr=joblib.load(os.path.join(league_dir,'le_ftr.pkl'))
-        le_ou=joblib.load(os.path.join(league_dir,'le_ou.pkl'))
-        le_btts=joblib.load(os.path.join(league_dir,'le_btts.pkl'))
+        bundle=get_model_bundle(league)
         df_features=pd.DataFrame([features])[FEATURE_COLUMNS]
-        X_scaled=scaler.transform(df_features)
-        probs_hda=model_hda.predict_proba(X_scaled)[0]
-        probs_ou=model_ou25.predict_proba(X_scaled)[0]
-        probs_btts=model_btts.predict_proba(X_scaled)[0]
-        probs_hda_dict={le_ftr.classes_[i]:float(probs_hda[i]) for i in range(len(probs_hda))}
-        probs_ou_dict={le_ou.classes_[i]:float(probs_ou[i]) for i in range(len(probs_ou))}
-        probs_btts_dict={le_btts.classes_[i]:float(probs_btts[i]) for i in range(len(probs_btts))}
-        pred_hda=le_ftr.classes_[np.argmax(probs_hda)]
-        pred_ou=le_ou.classes_[np.argmax(probs_ou)]
-        pred_btts=le_btts.classes_[np.argmax(probs_btts)]
-        result = {
-            'HDA':{'label':pred_hda,'probs':probs_hda_dict},
-            'OU25':{'label':pred_ou,'probs':probs_ou_dict},
-            'BTTS':{'label':pred_btts,'probs':probs_btts_dict}
-        }
+        result=predict_with_cache(league, bundle, df_features)[0]
 
         # Tetap panggil fungsi ini, tapi fungsi ini akan mengecek login
         add_prediction_to_history({
@@ -566,6 +885,267 @@ def api_predict():
         return jsonify({'status':'ok','prediction':result})
     except Exception as e: return jsonify({'status':'error','message':str(e)}),400
 
+def fixture_feature_row(league, fixture):
+    """
+    Vektor fitur (urutan FEATURE_COLUMNS) untuk satu fixture di /api/predict_batch.
+    Fitur yang tidak dikirim dihitung dari dataset liga (Elo, form, H2H);
+    odds (AvgH, dst.) wajib dikirim di `features`.
+    """
+    home_team=fixture.get('home_team'); away_team=fixture.get('away_team')
+    if not all([home_team, away_team]): raise ValueError('home_team dan away_team diperlukan')
+    features=fixture.get('features') or {}
+    if any(col not in features for col in FEATURE_COLUMNS):
+        team_index=load_team_index_by_name(league); pair_index=load_pair_index_by_name(league)
+        with stage_metrics.stage('features', league):
+            features={**compute_features_from_dataset(None, home_team, away_team,
+                                                      team_index=team_index, pair_index=pair_index),
+                      **features}
+    try:
+        return [float(features[col]) for col in FEATURE_COLUMNS]
+    except (TypeError, ValueError):
+        missing=[col for col in FEATURE_COLUMNS if features.get(col) in (None, '')]
+        raise ValueError(f"Fitur tidak valid/kosong: {', '.join(missing) or 'nilai non-numerik'}")
+
+@app.route('/api/predict_batch', methods=['POST'])
+def api_predict_batch():
+    """
+    Body: {"league": "...", "fixtures": [{"home_team", "away_team", "features"?, "league"?}, ...]}.
+    Fixture dikelompokkan per liga; setiap liga menjalankan scaler dan ketiga
+    model satu kali untuk seluruh fixture-nya. Hasil per fixture mengikuti
+    urutan input, dengan bentuk `prediction` yang sama seperti /api/predict.
+    """
+    body=request.json or {}
+    fixtures=body.get('fixtures')
+    if not isinstance(fixtures, list) or not fixtures:
+        return jsonify({'status':'error','message':'Daftar fixtures diperlukan'}),400
+    if len(fixtures) > PREDICT_BATCH_MAX:
+        return jsonify({'status':'error','message':f'Maksimal {PREDICT_BATCH_MAX} fixture per request'}),400
+
+    results=[None]*len(fixtures)
+    by_league={}
+    for i, fixture in enumerate(fixtures):
+        fixture=fixture if isinstance(fixture, dict) else {}
+        league=fixture.get('league') or body.get('league')
+        results[i]={'league':league,'home_team':fixture.get('home_team'),'away_team':fixture.get('away_team')}
+        if not league:
+            results[i].update({'status':'error','message':'Liga diperlukan'})
+            continue
+        try:
+            row=fixture_feature_row(league, fixture)
+        except Exception as e:
+            results[i].update({'status':'error','message':str(e)})
+            continue
+        by_league.setdefault(league, ([], []))
+        by_league[league][0].append(i)
+        by_league[league][1].append(row)
+
+    history=[]
+    for league, (positions, rows) in by_league.items():
+        try:
+            bundle=get_model_bundle(league)
+            predictions=predict_with_cache(league, bundle, pd.DataFrame(rows, columns=FEATURE_COLUMNS))
+        except Exception as e:
+            for i in positions: results[i].update({'status':'error','message':str(e)})
+            continue
+        for i, prediction in zip(positions, predictions):
+            results[i].update({'status':'ok','prediction':prediction})
+            history.append({**results[i]})
+
+    add_predictions_to_history(history)
+    return jsonify({'status':'ok','predictions':results})
+
+@app.route('/api/predict_fixtures', methods=['POST'])
+def api_predict_fixtures():
+    """
+    Form: league + file CSV fixture (Date, HomeTeam, AwayTeam, odds opsional;
+    format sama dengan file di add_dataset/). Fitur dihitung seperti
+    /api/features, lalu fixture diprediksi per potongan PREDICT_STREAM_CHUNK
+    dan hasilnya dikirim sebagai NDJSON (satu objek JSON per baris) begitu
+    potongan itu selesai. Baris terakhir berisi ringkasan ("type": "summary").
+    """
+    league=request.form.get('league'); file=request.files.get('file')
+    if not all([league,file]): return jsonify({'status':'error','message':'Liga dan file CSV diperlukan'}),400
+    try:
+        df_fixtures=pd.read_csv(file)
+    except Exception as e:
+        return jsonify({'status':'error','message':f'CSV tidak bisa dibaca: {e}'}),400
+    missing=[c for c in ['HomeTeam','AwayTeam'] if c not in df_fixtures.columns]
+    if missing: return jsonify({'status':'error','message':f"Kolom wajib tidak ditemukan: {', '.join(missing)}"}),400
+    try:
+        # Model dan indeks dataset dimuat sekarang supaya liga yang tidak valid gagal sebelum streaming dimulai
+        bundle=get_model_bundle(league)
+        load_team_index_by_name(league)
+    except Exception as e:
+        return jsonify({'status':'error','message':str(e)}),400
+
+    dates=parse_match_dates(df_fixtures['Date']) if 'Date' in df_fixtures.columns else pd.Series(pd.NaT, index=df_fixtures.index)
+    odds_cols=[c for c in ODDS_COLUMNS if c in df_fixtures.columns]
+    odds=df_fixtures[odds_cols].apply(pd.to_numeric, errors='coerce') if odds_cols else None
+
+    route=request.url_rule.rule
+
+    def generate():
+        # Generator berjalan setelah after_request: tahapnya dicatat di trace tersendiri
+        with stage_metrics.trace(route+' (stream)') as trace:
+            yield from generate_lines()
+            if trace is not None: finish_trace(trace, 'POST', 200)
+
+    def generate_lines():
+        ok=errors=0
+        for start in range(0, len(df_fixtures), PREDICT_STREAM_CHUNK):
+            lines=[]; rows=[]; history=[]
+            for i in range(start, min(start+PREDICT_STREAM_CHUNK, len(df_fixtures))):
+                date=dates.iloc[i]
+                item={'type':'fixture','index':i,'league':league,
+                      'date':date.strftime('%Y-%m-%d') if pd.notna(date) else None,
+                      'home_team':str(df_fixtures['HomeTeam'].iloc[i]),'away_team':str(df_fixtures['AwayTeam'].iloc[i])}
+                fixture={'home_team':item['home_team'],'away_team':item['away_team'],
+                         'features':{c: odds[c].iloc[i] for c in odds_cols if pd.notna(odds[c].iloc[i])}}
+                try:
+                    rows.append(fixture_feature_row(league, fixture))
+                except Exception as e:
+                    item.update({'status':'error','message':str(e)})
+                lines.append(item)
+            scored=[item for item in lines if 'status' not in item]
+            if scored:
+                try:
+                    predictions=predict_with_cache(league, bundle, pd.DataFrame(rows, columns=FEATURE_COLUMNS))
+                except Exception as e:
+                    predictions=None
+                    for item in scored: item.update({'status':'error','message':str(e)})
+                for item, prediction in zip(scored, predictions or []):
+                    item.update({'status':'ok','prediction':prediction})
+                    history.append(item)
+            add_predictions_to_history(history)
+            ok+=len(history); errors+=len(lines)-len(history)
+            yield ''.join(json.dumps(item)+'\n' for item in lines)
+        yield json.dumps({'type':'summary','status':'ok','league':league,'total':len(df_fixtures),'ok':ok,'errors':errors})+'\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def mean_odds(df):
+    # Odds rata-rata liga, dipakai untuk fixture yang odds-nya belum ada (misal sisa musim)
+    odds={col: float(pd.to_numeric(df[col], errors='coerce').mean()) if col in df.columns else float('nan')
+          for col in ODDS_COLUMNS}
+    missing=[col for col, value in odds.items() if np.isnan(value)]
+    if missing: raise ValueError(f"Odds rata-rata tidak tersedia: {', '.join(missing)}")
+    return odds
+
+@app.route('/api/project_season', methods=['POST'])
+@login_required
+def api_project_season():
+    """
+    Body: {"league", "simulations"?, "seed"?, "relegation_spots"?, "fixtures"?: [{"home_team","away_team","features"?}]}.
+    Klasemen sementara dihitung dari musim berjalan, semua fixture tersisa
+    (default: setiap pasangan kandang-tandang yang belum dimainkan) diprediksi
+    model_hda dalam satu batch, lalu musim disimulasikan sebanyak
+    `simulations` kali. Hasil: distribusi posisi akhir per tim, peluang
+    juara/4 besar/degradasi dan kecepatan simulasi.
+
+    Odds per fixture dikirim lewat `fixtures[].features` (AvgH, AvgD, AvgA,
+    Avg>2.5, Avg<2.5). Odds yang tidak dikirim diisi odds rata-rata liga, yang
+    sama untuk semua pasangan: untuk fixture itu prediksi praktis hanya
+    bertumpu pada Elo dan form. Jumlahnya dilaporkan di `odds`.
+    """
+    body=request.json or {}
+    league=body.get('league')
+    if not league: return jsonify({'status':'error','message':'Liga diperlukan'}),400
+    try:
+        simulations=int(body.get('simulations', SIM_DEFAULT))
+        seed=None if body.get('seed') is None else int(body['seed'])
+        relegation_spots=int(body.get('relegation_spots', 3))
+    except (TypeError, ValueError):
+        return jsonify({'status':'error','message':'simulations, seed dan relegation_spots harus bilangan bulat'}),400
+    if not 1 <= simulations <= SIM_MAX:
+        return jsonify({'status':'error','message':f'simulations harus antara 1 dan {SIM_MAX}'}),400
+    if seed is not None and seed < 0:
+        return jsonify({'status':'error','message':'seed tidak boleh negatif'}),400
+    if seed is None:
+        # Seed acak tetap dilaporkan (32 bit agar aman di JavaScript) supaya hasilnya bisa diulang
+        seed=secrets.randbits(32)
+    try:
+        df=load_league_dataset_by_name(league)
+        bundle=get_model_bundle(league)
+    except FileNotFoundError as e:
+        return jsonify({'status':'error','message':str(e)}),404
+
+    with stage_metrics.stage('season_table', league):
+        start, df_season=current_season(df, SEASON_START_MONTH)
+        table=season_table(df_season)
+    teams=sorted(table)
+    if len(teams) < 2: return jsonify({'status':'error','message':'Belum ada laga musim berjalan di dataset'}),400
+    if not 0 <= relegation_spots < len(teams):
+        return jsonify({'status':'error','message':f'relegation_spots harus antara 0 dan {len(teams)-1}'}),400
+
+    fixtures=body.get('fixtures')
+    if fixtures is None:
+        fixtures=[{'home_team':home,'away_team':away} for home, away in remaining_fixtures(df_season, teams)]
+    if not isinstance(fixtures, list) or not all(isinstance(f, dict) for f in fixtures):
+        return jsonify({'status':'error','message':'fixtures harus berupa list objek'}),400
+    if not all(isinstance(f.get(side), str) for f in fixtures for side in ('home_team','away_team')):
+        return jsonify({'status':'error','message':'home_team dan away_team setiap fixture harus berupa string'}),400
+    if not all(isinstance(f.get('features') or {}, dict) for f in fixtures):
+        return jsonify({'status':'error','message':'features setiap fixture harus berupa objek'}),400
+    team_pos={team: i for i, team in enumerate(teams)}
+    unknown=sorted({str(f.get(side)) for f in fixtures for side in ('home_team','away_team') if f.get(side) not in team_pos})
+    if unknown: return jsonify({'status':'error','message':f"Tim bukan peserta musim ini: {', '.join(unknown)}"}),400
+
+    # Satu batch model_hda untuk semua fixture tersisa; fitur tim dari snapshot, odds yang tidak dikirim diisi rata-rata
+    probs=np.empty((0, 3))
+    imputed=sum(1 for f in fixtures if any(col not in (f.get('features') or {}) for col in ODDS_COLUMNS))
+    if fixtures:
+        try:
+            odds=load_derived_by_name(league, 'mean_odds', mean_odds)
+            snapshot=load_snapshot_by_name(league)
+            rows=[]
+            with stage_metrics.stage('features', league):
+                for fixture in fixtures:
+                    features={**compute_features_from_dataset(None, fixture['home_team'], fixture['away_team'],
+                                                              team_index=snapshot, pair_index=snapshot),
+                              **odds, **(fixture.get('features') or {})}
+                    rows.append([float(features[col]) for col in FEATURE_COLUMNS])
+            with stage_metrics.stage('predict_proba', league):
+                classes, class_probs=bundle.predict_proba(pd.DataFrame(rows, columns=FEATURE_COLUMNS), 'HDA')
+            probs=class_probs[:, [classes.index(label) for label in ('H', 'D', 'A')]]
+        except (TypeError, ValueError) as e:
+            return jsonify({'status':'error','message':str(e)}),400
+
+    with stage_metrics.stage('simulate', league):
+        result=simulate_positions(
+            probs, [team_pos[f['home_team']] for f in fixtures], [team_pos[f['away_team']] for f in fixtures],
+            [table[team]['points'] for team in teams], tiebreak_scores(table, teams), simulations,
+            seed=seed, chunk_size=SIM_CHUNK, workers=SIM_WORKERS)
+
+    position_probs=result.position_probs
+    positions=np.arange(1, len(teams)+1)
+    projection=[]
+    for i, team in enumerate(teams):
+        dist=position_probs[i]
+        projection.append({
+            'team':team, **table[team],
+            'expected_points':round(float(result.expected_points[i]), 2),
+            'mean_position':round(float(dist @ positions), 2),
+            'title':round(float(dist[0]), 4),
+            'top4':round(float(dist[:4].sum()), 4),
+            'relegation':round(float(dist[len(teams)-relegation_spots:].sum()), 4) if relegation_spots else 0.0,
+            'positions':[round(float(p), 4) for p in dist],
+        })
+    projection.sort(key=lambda row: (row['mean_position'], -row['expected_points']))
+    return jsonify({
+        'status':'ok','league':league,
+        'season_start':start.strftime('%Y-%m-%d'),
+        'played':int(len(df_season)),'remaining':len(fixtures),
+        'simulations':simulations,'seed':result.seed,
+        'seconds':round(result.seconds, 4),
+        'sims_per_second':round(result.sims_per_second, 1) if result.sims_per_second else None,
+        'chunks':result.chunks,'workers':result.workers,
+        'odds':{'provided':len(fixtures)-imputed,'imputed':imputed,
+                'note':'Odds yang tidak dikirim di fixtures[].features diisi odds rata-rata liga '
+                       '(sama untuk semua pasangan); prediksi fixture itu hanya bertumpu pada Elo dan form.'
+                       if imputed else None},
+        'table':projection,
+    })
+
 # ==========================================================
 # ROUTES HALAMAN ADD DATA (TETAP DIPROTEKSI)
 # ==========================================================
@@ -587,15 +1167,12 @@ def add_data_page():
 
 # ... (Baris di atas Halaman ADD DATA SAMA) ...
 
-@app.route('/api/upload_csv', methods=['POST'])
-@login_required
-@admin_required
-def api_upload_csv():
-    league=request.form.get('league'); file=request.files.get('file')
-    if not all([league,file]): return jsonify({'status':'error','message':'Liga dan file CSV diperlukan'}),400
-    
+def process_uploaded_csv(progress, league, csv_bytes):
+    """Job latar belakang /api/upload_csv: parse, dedup, hitung fitur dan format preview."""
     # Baca CSV
-    df_new=pd.read_csv(file)
+    progress(0, None, 'Membaca CSV')
+    with stage_metrics.stage('csv_read', league):
+        df_new=pd.read_csv(io.BytesIO(csv_bytes))
     
     # -----------------------------------------------------------------
     # ✅ PERBAIKAN: Konversi kolom skor FTHG dan FTAG ke integer
@@ -610,17 +1187,27 @@ def api_upload_csv():
             df_new[col] = df_new[col].fillna(0).astype(int)
     # -----------------------------------------------------------------
 
+    # Tanggal diparse sekali di sini (dd/mm/yyyy dibaca hari-dulu), lalu dipakai untuk dedup dan fitur
+    df_new['Date']=parse_match_dates(df_new['Date'])
+
     # Muat data lama
+    progress(0, len(df_new), 'Mencari pertandingan baru')
     df_existing=load_league_dataset_by_name(league)
     
-    # Filter pertandingan baru
-    mask_new=~df_new.apply(lambda r: ((df_existing['Date']==r['Date']) & (df_existing['HomeTeam']==r['HomeTeam']) & (df_existing['AwayTeam']==r['AwayTeam'])).any(), axis=1)
-    df_new_only=df_new[mask_new].copy()
+    # Filter pertandingan baru: satu hash join terhadap indeks kunci laga (tanggal, tuan rumah, tamu)
+    match_keys=load_match_keys_by_name(league)
+    with stage_metrics.stage('dedup', league):
+        status=match_keys.classify(df_new)
+    summary=summarize_match_status(status)
+    df_new_only=df_new[status==MATCH_NEW].copy()
     
-    if df_new_only.empty: return jsonify({'status':'ok','message':'Tidak ada pertandingan baru'}),200
+    if df_new_only.empty: return {'status':'ok','message':'Tidak ada pertandingan baru','summary':summary}
     
     # 1. Hitung fitur ELO dan lainnya (Data FTHG/FTAG sekarang sudah int)
-    df_new_full=update_elo_and_features(df_existing, df_new_only)
+    team_index=load_team_index_by_name(league); engine=load_feature_engine_by_name(league)
+    with stage_metrics.stage('features', league):
+        df_new_full=update_elo_and_features(df_existing, df_new_only, team_index=team_index, engine=engine,
+                                            progress=lambda done, total: progress(done, total, 'Menghitung fitur'))
 
     # 2. Buat salinan DataFrame untuk pemformatan output JSON
     df_output = df_new_full.copy()
@@ -638,26 +1225,221 @@ def api_upload_csv():
     cols_to_format = list(df_output.columns)
     cols_skip = ['HomeTeam', 'AwayTeam', 'FTR', 'HTR', 'Div', 'Date'] # Tambahkan 'Date' ke skip
     
-    for col in cols_to_format:
-        # Cek tipe data: harus numerik DAN BUKAN kolom yang dilewati
-        if col not in cols_skip and pd.api.types.is_numeric_dtype(df_output[col]):
-            df_output[col] = df_output[col].apply(format_float_clean)
+    with stage_metrics.stage('format', league):
+        for col in cols_to_format:
+            # Cek tipe data: harus numerik DAN BUKAN kolom yang dilewati
+            if col not in cols_skip and pd.api.types.is_numeric_dtype(df_output[col]):
+                df_output[col] = format_float_series(df_output[col])
+        # Encoder JSON pandas (C) langsung ke teks; NaN di kolom teks menjadi null
+        records_json=df_output.to_json(orient='records', force_ascii=False)
             
-    # 4. Mengembalikan data yang sudah diformat ke string
-    return jsonify({'status':'ok','matches':df_output.to_dict(orient='records')})
+    # 4. Mengembalikan data yang sudah diformat ke string (sudah berupa JSON, disimpan job apa adanya)
+    return '{"status":"ok","summary":%s,"matches":%s}' % (json.dumps(summary), records_json)
+
+@app.route('/api/upload_csv', methods=['POST'])
+@login_required
+@admin_required
+def api_upload_csv():
+    league=request.form.get('league'); file=request.files.get('file')
+    if not all([league,file]): return jsonify({'status':'error','message':'Liga dan file CSV diperlukan'}),400
+    csv_bytes=file.read()
+
+    # Di dalam request hanya header yang dicek; parse, dedup dan fitur dikerjakan job latar belakang
+    try:
+        columns=pd.read_csv(io.BytesIO(csv_bytes), nrows=0).columns
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'status':'error','message':f'File CSV tidak bisa dibaca: {e}'}),400
+    missing=[c for c in ['Date','HomeTeam','AwayTeam','FTHG','FTAG'] if c not in columns]
+    if missing: return jsonify({'status':'error','message':f"Kolom wajib tidak ditemukan: {', '.join(missing)}"}),400
+
+    job_id=job_queue.submit('upload_csv', traced_job('job:upload_csv', process_uploaded_csv),
+                            owner=current_user.id, league=league, csv_bytes=csv_bytes)
+    return jsonify({'status':'ok','job_id':job_id,
+                    'status_url':url_for('api_job_status', job_id=job_id),
+                    'result_url':url_for('api_job_result', job_id=job_id)}),202
+
+@app.route('/api/jobs/<job_id>')
+@login_required
+@admin_required
+def api_job_status(job_id):
+    job=job_queue.get(job_id)
+    if job is None: return jsonify({'status':'error','message':'Job tidak ditemukan'}),404
+    return jsonify({'status':'ok','job':job})
+
+@app.route('/api/jobs/<job_id>/result')
+@login_required
+@admin_required
+def api_job_result(job_id):
+    job=job_queue.get(job_id)
+    if job is None: return jsonify({'status':'error','message':'Job tidak ditemukan'}),404
+    if job['state']==JOB_ERROR: return jsonify({'status':'error','message':job['message'],'job':job}),500
+    if job['state']!=JOB_DONE: return jsonify({'status':'pending','job':job}),202
+    if 'offset' not in request.args and 'limit' not in request.args:
+        # Hasil lengkap dikirim persis seperti tersimpan, tanpa parse dan encode ulang
+        return app.response_class(job_queue.result_json(job_id), mimetype='application/json')
+
+    # Preview per halaman: ?offset=&limit= memotong daftar matches
+    try:
+        offset=max(int(request.args.get('offset', 0)), 0)
+        limit=min(max(int(request.args.get('limit', UPLOAD_PREVIEW_PAGE_MAX)), 1), UPLOAD_PREVIEW_PAGE_MAX)
+    except ValueError:
+        return jsonify({'status':'error','message':'Parameter offset/limit tidak valid'}),400
+    result=job_queue.result(job_id)
+    matches=result.get('matches') or []
+    end=min(offset+limit, len(matches))
+    result.update(matches=matches[offset:end], offset=offset, total=len(matches),
+                  next_offset=end if end<len(matches) else None)
+    return jsonify(result)
 
 @app.route('/api/save_new_matches', methods=['POST'])
 @login_required
 @admin_required
 def api_save_new_matches():
     league=request.json.get('league'); matches=request.json.get('matches')
-    df_existing=load_league_dataset_by_name(league)
+    if not all([league,matches]): return jsonify({'status':'error','message':'Liga dan data pertandingan diperlukan'}),400
+    path=find_league_dataset_path(league)
     df_new=pd.DataFrame(matches)
-    df_combined=pd.concat([df_existing, df_new], ignore_index=True)
-    league_file=file_name_from_pretty(league)
-    path=os.path.join(DATASET_DIR, f"{league_file}.csv")
-    df_combined.to_csv(path, index=False)
-    return jsonify({'status':'ok','message':'Pertandingan baru berhasil disimpan'})
+    # Append-only di bawah file lock: hanya baris baru yang ditulis, data lama tidak ditulis ulang.
+    # Duplikat dicek ulang di dalam lock karena admin/worker lain mungkin baru saja menyimpan laga yang sama.
+    with dataset_lock(path):
+        status=load_match_keys_by_name(league).classify(df_new)
+        df_saved=df_new[status==MATCH_NEW]
+        snapshot=league_snapshots.get(path)
+        with stage_metrics.stage('append_dataset', league):
+            saved=append_dataset(path, df_saved)
+        # Snapshot diperbarui dengan laga yang baru disimpan saja (atau dibangun ulang nanti jika laga lebih lama)
+        with stage_metrics.stage('snapshot_apply', league):
+            league_snapshots.apply(path, snapshot, df_saved)
+    dataset_cache.invalidate(path)
+    league_catalog.invalidate()
+    # Roster versi baru langsung dihitung; ETag /api/teams ikut berubah jika ada tim baru
+    load_team_roster_by_name(league)
+    return jsonify({'status':'ok','message':'Pertandingan baru berhasil disimpan',
+                    'saved':saved,'skipped':int(len(df_new)-saved)})
+
+@app.route('/api/cache_stats')
+@login_required
+@admin_required
+def api_cache_stats():
+    return jsonify({'status':'ok',
+                    'dataset_cache': dataset_cache.stats(),
+                    'model_registry': model_registry.stats(),
+                    'prediction_cache': prediction_cache.stats(),
+                    'league_snapshots': league_snapshots.stats()})
+
+def _stats_metrics(name, stats_func, gauges, counters):
+    # Statistik cache dibaca dari stats() hanya saat /metrics di-scrape
+    for key in gauges:
+        metrics_registry.gauge(f'app_{name}_{key}', f'{name}.stats()["{key}"]',
+                               lambda key=key: [({}, stats_func().get(key))])
+    for key in counters:
+        metrics_registry.gauge(f'app_{name}_{key}_total', f'{name}.stats()["{key}"] (kumulatif)',
+                               lambda key=key: [({}, stats_func().get(key))], kind='counter')
+
+_stats_metrics('dataset_cache', dataset_cache.stats, ['entries', 'hit_ratio'],
+               ['hits', 'misses', 'evictions', 'invalidations'])
+_stats_metrics('prediction_cache', prediction_cache.stats, ['entries', 'hit_ratio'],
+               ['hits', 'misses', 'evictions', 'expirations', 'invalidations', 'saved_seconds'])
+_stats_metrics('league_snapshots', league_snapshots.stats, ['entries'], ['hits', 'loads', 'builds', 'applies'])
+_stats_metrics('history_buffer', history_buffer.stats, ['pending'], ['added', 'flushed', 'dropped', 'failures', 'batches'])
+_stats_metrics('model_registry', model_registry.stats, ['entries', 'total_bytes'],
+               ['hits', 'loads', 'reloads', 'evictions'])
+
+def _model_bundle_gauge(key):
+    return lambda: [({'league': league, 'compact': str(bool(info['compact'])).lower()}, info[key])
+                    for league, info in model_registry.stats()['bundles'].items()]
+
+metrics_registry.gauge('app_model_load_seconds', 'Waktu memuat bundle model per liga (detik).', _model_bundle_gauge('load_seconds'))
+metrics_registry.gauge('app_model_bytes', 'Ukuran artefak bundle model per liga yang dihitung ke budget memori.', _model_bundle_gauge('size_bytes'))
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if METRICS_TOKEN:
+        if not secrets.compare_digest(request.headers.get('Authorization', ''), f'Bearer {METRICS_TOKEN}'):
+            return Response('unauthorized\n', status=401, mimetype='text/plain')
+    elif not current_user.is_authenticated:
+        return Response('unauthorized\n', status=401, mimetype='text/plain')
+    elif current_user.role != 'admin':
+        return Response('forbidden\n', status=403, mimetype='text/plain')
+    return Response(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# ==========================================================
+# WARMUP & HEALTH CHECK
+# ==========================================================
+# Modul yang diimpor warmup lebih dulu (waktunya dilaporkan per modul); scikit-learn ikut dimuat saat unpickle model
+WARMUP_MODULES = ['numpy', 'pandas', 'joblib', 'sklearn.ensemble', 'sklearn.svm', 'sklearn.preprocessing']
+_warmup = {'state': 'pending', 'stages': {}, 'errors': {}, 'seconds': None}
+_warmup_lock = threading.Lock()
+_warmup_done = threading.Event()
+
+def _warmup_stage(name, func):
+    start=time.perf_counter()
+    try:
+        func()
+    except Exception as e:
+        _warmup['errors'][name]=str(e)
+    _warmup['stages'][name]=round(time.perf_counter()-start, 4)
+
+def run_warmup():
+    """Memuat modul berat, dataset dan bundle model semua liga; hanya sekali per proses."""
+    with _warmup_lock:
+        if _warmup['state'] != 'pending': return
+        _warmup['state']='running'
+    start=time.perf_counter()
+    for name in WARMUP_MODULES:
+        _warmup_stage('import:'+name, lambda name=name: timed_import(name))
+    for league in list_leagues():
+        _warmup_stage('dataset:'+league, lambda league=league: load_team_roster_by_name(league))
+        _warmup_stage('snapshot:'+league, lambda league=league: load_snapshot_by_name(league))
+        _warmup_stage('model:'+league, lambda league=league: model_registry.get(league))
+    _warmup['seconds']=round(time.perf_counter()-start, 4)
+    _warmup['state']='ready'
+    _warmup_done.set()
+    print("Warmup selesai:", json.dumps({'app_import': APP_IMPORT_SECONDS, **_warmup['stages']}))
+    if WARMUP_OAUTH:
+        # Tidak menahan status ready: hanya agar login pertama tidak menunggu metadata OpenID
+        try:
+            get_oauth().google.load_server_metadata()
+        except Exception as e:
+            print(f"Gagal mengambil metadata OAuth: {e}")
+
+@app.route('/healthz')
+def healthz():
+    # Liveness: tidak menyentuh stack data/ML
+    return jsonify({'status':'ok'})
+
+@app.route('/healthz/ready')
+def healthz_ready():
+    """
+    Readiness: 200 setelah warmup selesai, 503 selama masih berjalan.
+    Tanpa thread warmup (WARMUP=0), probe pertama menjalankan warmup sendiri.
+    """
+    if not WARMUP:
+        run_warmup()
+    ready=_warmup_done.is_set()
+    return jsonify({
+        'status':'ok' if ready else 'warming_up',
+        'state':_warmup['state'],
+        'app_import_seconds':APP_IMPORT_SECONDS,
+        'warmup_seconds':_warmup['seconds'],
+        'stages':dict(_warmup['stages']),
+        'imports':{name: round(seconds, 4) for name, seconds in import_timings().items()},
+        'errors':dict(_warmup['errors']),
+    }), 200 if ready else 503
+
+metrics_registry.gauge('app_import_seconds', 'Lama import modul berat per proses (detik).',
+                       lambda: [({'module': name}, seconds) for name, seconds in import_timings().items()])
+metrics_registry.gauge('app_warmup_stage_seconds', 'Lama tiap tahap warmup (detik).',
+                       lambda: [({'stage': name}, seconds) for name, seconds in list(_warmup['stages'].items())])
+
+if MODEL_PRELOAD:
+    _preload_errors = model_registry.preload(list_leagues())
+    for _league, _err in _preload_errors.items():
+        print(f"Gagal preload model {_league}: {_err}")
+
+APP_IMPORT_SECONDS = round(time.perf_counter() - _APP_IMPORT_START, 4)
+if WARMUP:
+    threading.Thread(target=run_warmup, name='warmup', daemon=True).start()
 
 # ==========================================================
 # MAIN
@@ -0,0 +1,291 @@
+"""
+Benchmark jalur panas fitur, ingest dan prediksi (offline).
+
+Memakai dataset/*.csv dan models/ yang ada di repo. Setiap skala (1x, 10x,
+100x history) dibuat di folder sementara: history liga digandakan mundur
+dalam waktu (salinan musim sebelumnya dengan tanggal digeser), models/
+ditautkan ke folder asli. Hasil disimpan sebagai JSON agar bisa dibandingkan
+dengan baseline:
+
+    python bench.py --output bench_baseline.json
+    python bench.py --baseline bench_baseline.json --output bench_results.json
+    python bench.py --scales 1 --skip-train --fail-on-regression --baseline bench_baseline.json
+
+Yang diukur per liga dan skala: load_league_dataset_by_name (cold/warm),
+recent_stats_for_team, h2h_stats, compute_features_from_dataset (tanpa dan
+dengan indeks cache), update_elo_and_features untuk unggahan satu musim
+penuh (replay penuh dan dengan FeatureEngine cache), /api/predict lewat
+Flask test client dengan user login tiruan, dan train_and_evaluate_all_leagues
+dengan konfigurasi kecil.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+RESULT_FORMAT_VERSION = 1
+UPLOAD_COLUMNS = ['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR']
+DEFAULT_ODDS = {'AvgH': 2.1, 'AvgD': 3.4, 'AvgA': 3.3, 'Avg>2.5': 1.9, 'Avg<2.5': 1.9}
+# Konfigurasi training kecil untuk benchmark (bukan konfigurasi produksi)
+BENCH_RF_TREES = 50
+BENCH_SVM_GRID = {'C': [1], 'gamma': ['scale']}
+
+
+def _prepare_env(workdir):
+    # app.py mewajibkan env ini; database dan tabel job diarahkan ke folder sementara
+    for key in ('FLASK_SECRET_KEY', 'GOOGLE_CLIENT_ID', 'GOOGLE_CLIENT_SECRET', 'ADMIN_EMAIL'):
+        os.environ.setdefault(key, 'bench')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['JOB_DB_PATH'] = os.path.join(workdir, 'jobs.sqlite3')
+    os.environ['MODEL_PRELOAD'] = '0'
+
+
+def scale_history(df, factor):
+    """History `factor` kali lipat: salinan dataset digeser mundur sepanjang rentang tanggalnya."""
+    if factor <= 1:
+        return df.copy()
+    dates = pd.to_datetime(df['Date'], errors='coerce')
+    span = (dates.max() - dates.min()) + pd.Timedelta(days=1)
+    copies = []
+    for i in range(factor - 1, -1, -1):
+        part = df.copy()
+        part['Date'] = dates - span * i
+        copies.append(part)
+    return pd.concat(copies, ignore_index=True)
+
+
+def split_last_season(df):
+    """(history, unggahan): unggahan = laga terakhir sebanyak satu musim penuh (n tim x (n-1)), kolom mentah saja."""
+    teams = pd.unique(pd.concat([df['HomeTeam'], df['AwayTeam']]))
+    n_season = min(len(teams) * (len(teams) - 1), len(df) // 2)
+    ordered = df.sort_values('Date', kind='mergesort').reset_index(drop=True)
+    columns = [c for c in UPLOAD_COLUMNS + list(DEFAULT_ODDS) if c in ordered.columns]
+    return ordered.iloc[:-n_season].reset_index(drop=True), ordered.iloc[-n_season:][columns].reset_index(drop=True)
+
+
+def build_workdir(base, scale, dataset_paths):
+    workdir = os.path.join(base, f'x{scale}')
+    os.makedirs(os.path.join(workdir, 'dataset'), exist_ok=True)
+    os.symlink(os.path.join(ROOT, 'models'), os.path.join(workdir, 'models'))
+    for path in dataset_paths:
+        df = pd.read_csv(path)
+        scale_history(df, scale).to_csv(os.path.join(workdir, 'dataset', os.path.basename(path)), index=False)
+    return workdir
+
+
+class Recorder:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def measure(self, name, func, league=None, scale=None, rows=None, setup=None, repeat=None):
+        """
+        Menjalankan `func` sebanyak `repeat` kali. `setup` (tidak ikut diukur)
+        dipanggil sebelum setiap putaran; jika mengembalikan tuple, isinya jadi argumen `func`.
+        """
+        times = []
+        for _ in range(repeat or self.repeat):
+            args = (setup() if setup else None) or ()
+            start = time.perf_counter()
+            func(*args)
+            times.append(time.perf_counter() - start)
+        record = {'name': name, 'league': league, 'scale': scale, 'rows': rows, 'repeat': len(times),
+                  'min': min(times), 'median': float(np.median(times)), 'mean': float(np.mean(times))}
+        self.results.append(record)
+        print(f"   {name:<48} x{scale:<4} {record['median'] * 1000:>10.2f} ms (min {record['min'] * 1000:.2f})")
+        return record
+
+
+def bench_league(rec, A, client, league, scale):
+    rows = len(A.load_league_dataset_by_name(league))
+    common = {'league': league, 'scale': scale, 'rows': rows}
+    rec.measure('load_league_dataset_by_name (cold)', lambda: A.load_league_dataset_by_name(league),
+                setup=A.dataset_cache.invalidate, **common)
+    rec.measure('load_league_dataset_by_name (warm)', lambda: A.load_league_dataset_by_name(league), **common)
+
+    df = A.load_league_dataset_by_name(league)
+    last = df.sort_values('Date', kind='mergesort').iloc[-1]
+    home, away = last['HomeTeam'], last['AwayTeam']
+    rec.measure('recent_stats_for_team', lambda: A.recent_stats_for_team(df, home), **common)
+    rec.measure('h2h_stats', lambda: A.h2h_stats(df, home, away), **common)
+    rec.measure('compute_features_from_dataset (tanpa indeks)',
+                lambda: A.compute_features_from_dataset(df, home, away), **common)
+    team_index, pair_index = A.load_team_index_by_name(league), A.load_pair_index_by_name(league)
+    rec.measure('compute_features_from_dataset (indeks cache)',
+                lambda: A.compute_features_from_dataset(df, home, away, team_index=team_index, pair_index=pair_index),
+                **common)
+
+    history, season = split_last_season(df)
+    copies = lambda: (history.copy(), season.copy())
+    rec.measure('update_elo_and_features (replay penuh)', A.update_elo_and_features, setup=copies, **common)
+    rec.measure('FeatureEngine.from_history', lambda: A.FeatureEngine.from_history(history), **common)
+    engine, history_index = A.FeatureEngine.from_history(history), A.TeamIndex.from_frame(history)
+    rec.measure('update_elo_and_features (engine cache)',
+                lambda h, s: A.update_elo_and_features(h, s, team_index=history_index, engine=engine),
+                setup=copies, **common)
+
+    try:
+        A.model_registry.get(league)
+    except FileNotFoundError:
+        print(f"   (model {league} tidak lengkap, api_predict dilewati)")
+        return
+    features = {**A.compute_features_from_dataset(df, home, away, team_index=team_index, pair_index=pair_index),
+                **DEFAULT_ODDS}
+    body = {'league': league, 'features': features, 'home_team': home, 'away_team': away}
+
+    def predict():
+        response = client.post('/api/predict', json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/predict gagal: {response.get_data(as_text=True)}")
+
+    rec.measure('api_predict (cache prediksi)', predict, **common)
+    rec.measure('api_predict (tanpa cache prediksi)', predict,
+                setup=A.prediction_cache.invalidate, **common)
+
+
+def bench_train(rec, workdir, dataset_paths, scale, repeat):
+    import train
+    train_dir = os.path.join(workdir, 'train')
+    os.makedirs(os.path.join(train_dir, 'dataset'), exist_ok=True)
+    for path in dataset_paths:
+        src = os.path.join(workdir, 'dataset', os.path.basename(path))
+        os.symlink(src, os.path.join(train_dir, 'dataset', os.path.basename(path)))
+    rows = sum(len(pd.read_csv(os.path.join(train_dir, 'dataset', os.path.basename(p)))) for p in dataset_paths)
+    original = {name: getattr(train, name) for name in ('DATASET_DIR', 'MODEL_DIR', 'RF_PARAMS', 'SVM_PARAM_GRID')}
+    train.DATASET_DIR = os.path.join(train_dir, 'dataset')
+    train.MODEL_DIR = os.path.join(train_dir, 'models')
+    train.RF_PARAMS = {**original['RF_PARAMS'], 'n_estimators': BENCH_RF_TREES}
+    train.SVM_PARAM_GRID = BENCH_SVM_GRID
+    try:
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):
+                train.train_and_evaluate_all_leagues(force=True)
+        rec.measure('train_and_evaluate_all_leagues (kecil)', run, league='*', scale=scale, rows=rows, repeat=repeat)
+    finally:
+        for name, value in original.items():
+            setattr(train, name, value)
+
+
+def run_metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    import sklearn
+    return {
+        'format': RESULT_FORMAT_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Membandingkan median dengan baseline. Mengembalikan jumlah benchmark yang lebih lambat dari toleransi."""
+    base = {(r['name'], r['league'], r['scale']): r for r in baseline['results']}
+    rows, regressions = [], 0
+    for r in results:
+        b = base.get((r['name'], r['league'], r['scale']))
+        if b is None:
+            continue
+        ratio = r['median'] / b['median'] if b['median'] else float('inf')
+        verdict = 'lebih lambat' if ratio > 1 + tolerance else 'lebih cepat' if ratio < 1 - tolerance else 'sama'
+        regressions += verdict == 'lebih lambat'
+        rows.append({'Benchmark': r['name'], 'Liga': r['league'], 'Skala': f"x{r['scale']}",
+                     'Baseline (ms)': b['median'] * 1000, 'Sekarang (ms)': r['median'] * 1000,
+                     'Rasio': ratio, 'Hasil': verdict})
+    if rows:
+        print(f"\n{'='*25} PERBANDINGAN DENGAN BASELINE {'='*25}")
+        print(pd.DataFrame(rows).to_string(index=False, float_format='{:.2f}'.format))
+    else:
+        print("\nTidak ada benchmark yang cocok dengan baseline.")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark fitur, ingest, prediksi dan training.')
+    parser.add_argument('--scales', default='1,10,100', help='kelipatan history, dipisah koma (default 1,10,100)')
+    parser.add_argument('--leagues', default='Bundesliga', help="liga dipisah koma, atau 'all'")
+    parser.add_argument('--repeat', type=int, default=5, help='jumlah pengulangan per benchmark')
+    parser.add_argument('--train-max-scale', type=int, default=1, help='skala terbesar untuk benchmark training')
+    parser.add_argument('--train-repeat', type=int, default=1, help='jumlah pengulangan benchmark training')
+    parser.add_argument('--skip-train', action='store_true', help='lewati benchmark training')
+    parser.add_argument('--output', default='bench_results.json', help='file JSON hasil')
+    parser.add_argument('--baseline', help='file JSON hasil sebelumnya untuk dibandingkan')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='selisih median relatif yang dianggap sama (default 0.2)')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit code 1 jika ada yang lebih lambat dari baseline')
+    args = parser.parse_args()
+
+    scales = [int(s) for s in args.scales.split(',') if s.strip()]
+    output = os.path.abspath(args.output)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    rec = Recorder(args.repeat)
+
+    with tempfile.TemporaryDirectory(prefix='bench_') as base:
+        _prepare_env(base)
+        sys.path.insert(0, ROOT)
+        os.chdir(ROOT)
+        import app as A
+        with A.app.app_context():
+            A.db.create_all()
+            user = A.User(google_id='bench', email='bench@example.com', name='Bench', role='admin')
+            A.db.session.add(user)
+            A.db.session.commit()
+            user_id = user.id
+        client = A.app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+
+        leagues = A.list_leagues() if args.leagues == 'all' else [l.strip() for l in args.leagues.split(',')]
+        dataset_paths = [os.path.join(ROOT, A.find_league_dataset_path(league)) for league in leagues]
+
+        for scale in scales:
+            print(f"\n{'='*25} SKALA x{scale} {'='*25}")
+            workdir = build_workdir(base, scale, dataset_paths)
+            # app.py memakai path relatif (dataset/, models/): pindah ke folder skala dan kosongkan cache
+            os.chdir(workdir)
+            A.dataset_cache.invalidate()
+            A.model_registry.invalidate()
+            A.prediction_cache.invalidate()
+            for league in leagues:
+                print(f"-- {league}")
+                bench_league(rec, A, client, league, scale)
+            if not args.skip_train and scale <= args.train_max_scale:
+                bench_train(rec, workdir, dataset_paths, scale, args.train_repeat)
+        os.chdir(ROOT)
+
+    result = {'meta': run_metadata(), 'config': vars(args), 'results': rec.results}
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"\nHasil disimpan di {output}")
+
+    if baseline is not None:
+        regressions = compare(rec.results, baseline, args.tolerance)
+        if regressions and args.fail_on_regression:
+            print(f"\n⚠️  {regressions} benchmark lebih lambat dari baseline.")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,333 @@
+"""
+Bentuk ringkas (flat array) RandomForest dan StandardScaler untuk inferensi.
+
+`train.py` mengekspor model_hda/model_ou25 dan scaler ke `models/<liga>/compact/`:
+
+    compact.json                daftar model, ukuran, kelas dan sumber .pkl-nya
+    g<gen>_<nama>.<array>.npy    satu array per atribut node, untuk semua pohon
+                                 (feature, threshold, children, missing_left, values)
+    g<gen>_scaler.params.npy     mean dan scale StandardScaler
+
+File .npy dibaca dengan mmap (read-only), sehingga semua worker gunicorn
+berbagi halaman memori yang sama dan memuat model hampir tanpa biaya.
+`CompactForest.predict_proba` menelusuri semua pohon sekaligus secara
+vektor dan menghasilkan angka yang persis sama dengan `predict_proba`
+scikit-learn (X dibandingkan sebagai float32, pohon dijumlahkan berurutan).
+
+Setiap entri mencatat ukuran, mtime dan sha256 file .pkl sumbernya; entri
+yang tidak cocok lagi dengan .pkl (misal model dilatih ulang tanpa ekspor)
+diabaikan dan registry kembali memuat .pkl.
+
+Folder compact/ tidak disimpan di git: selain oleh train.py, bentuk ringkas
+dibuat oleh registry (`ensure_compact`) saat model pertama kali dimuat dari
+.pkl, sehingga worker berikutnya cukup membuka file .npy-nya.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: hanya lock antar-thread
+    fcntl = None
+
+from lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+
+COMPACT_DIR = 'compact'
+COMPACT_MANIFEST = 'compact.json'
+COMPACT_FORMAT_VERSION = 1
+# Artefak yang punya bentuk ringkas: nama di bundle -> file .pkl sumber
+COMPACT_SOURCES = {'model_hda': 'model_hda.pkl', 'model_ou25': 'model_ou25.pkl', 'scaler': 'scaler.pkl'}
+# Jumlah laga per blok saat prediksi (membatasi memori array sementara laga x pohon)
+PREDICT_CHUNK = 256
+EXPORT_LOCK = '.export.lock'
+
+_export_guard = threading.Lock()
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_info(path):
+    st = os.stat(path)
+    return {'file': os.path.basename(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': _sha256(path)}
+
+
+def _source_matches(league_dir, source):
+    # mtime sama -> cocok tanpa membaca file; mtime beda (misal setelah git checkout) -> bandingkan isi
+    try:
+        st = os.stat(os.path.join(league_dir, source['file']))
+    except OSError:
+        return False
+    if st.st_size != source['size']:
+        return False
+    return st.st_mtime_ns == source['mtime_ns'] or _sha256(os.path.join(league_dir, source['file'])) == source['sha256']
+
+
+FOREST_ARRAYS = ('feature', 'threshold', 'children', 'missing_left', 'values')
+
+
+def flatten_forest(forest):
+    """
+    (arrays, meta) untuk satu RandomForestClassifier. Indeks anak dibuat
+    global; daun menunjuk ke dirinya sendiri sehingga penelusuran cukup
+    diulang sebanyak kedalaman maksimum tanpa cek daun.
+    """
+    from sklearn import __version__ as sklearn_version
+    if getattr(forest, 'n_outputs_', 1) != 1:
+        raise ValueError('Hanya RandomForest satu output yang didukung.')
+    # scikit-learn >= 1.4 menyimpan value sebagai proporsi dan predict_proba memakainya apa adanya;
+    # versi lama menyimpan jumlah sampel dan menormalisasi per node saat prediksi
+    normalize = tuple(int(v) for v in sklearn_version.split('.')[:2]) < (1, 4)
+    n_classes = int(forest.n_classes_)
+    parts = {name: [] for name in FOREST_ARRAYS}
+    roots, offset, max_depth = [], 0, 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        ids = np.arange(offset, offset + n, dtype=np.int32)
+        is_leaf = tree.children_left == -1
+        parts['feature'].append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        parts['threshold'].append(np.where(is_leaf, 0.0, tree.threshold).astype(np.float64))
+        parts['children'].append(np.stack([np.where(is_leaf, ids, tree.children_left + offset),
+                                           np.where(is_leaf, ids, tree.children_right + offset)], axis=1).astype(np.int32))
+        missing = getattr(tree, 'missing_go_to_left', None)
+        parts['missing_left'].append(np.zeros(n, dtype=bool) if missing is None else np.asarray(missing, dtype=bool))
+        proba = np.array(tree.value[:, 0, :n_classes], dtype=np.float64)
+        if normalize:
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+        parts['values'].append(proba)
+        roots.append(offset)
+        offset += n
+        max_depth = max(max_depth, int(tree.max_depth))
+    arrays = {name: np.concatenate(chunks) for name, chunks in parts.items()}
+    meta = {
+        'kind': 'forest',
+        'n_trees': len(roots),
+        'n_nodes': offset,
+        'max_depth': max_depth,
+        'n_classes': n_classes,
+        'n_features': int(forest.n_features_in_),
+        'classes': np.asarray(forest.classes_).tolist(),
+        'roots': roots,
+    }
+    return arrays, meta
+
+
+def flatten_scaler(scaler):
+    """(arrays, meta): params baris 0 = mean, baris 1 = scale (0 dan 1 jika tidak dipakai)."""
+    n_features = int(scaler.n_features_in_)
+    mean = scaler.mean_ if scaler.with_mean and scaler.mean_ is not None else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.with_std and scaler.scale_ is not None else np.ones(n_features)
+    params = np.vstack([np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64)])
+    return {'params': params}, {'kind': 'scaler', 'n_features': n_features}
+
+
+class CompactForest:
+    """Pengganti RandomForestClassifier untuk `predict_proba`, di atas array mmap."""
+
+    def __init__(self, arrays, meta):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.children = arrays['children'].reshape(-1)
+        self.missing_left = arrays['missing_left']
+        self.values = arrays['values']
+        self.meta = meta
+        self.classes_ = np.asarray(meta['classes'])
+        self.n_estimators = meta['n_trees']
+        self.n_features_in_ = meta['n_features']
+        self.roots = np.asarray(meta['roots'], dtype=np.int32)
+
+    def apply(self, X):
+        """Indeks node daun (global) untuk setiap laga x pohon."""
+        n_samples, n_features = X.shape
+        X_flat = np.ascontiguousarray(X).reshape(-1)
+        row_offset = (np.arange(n_samples) * n_features)[:, np.newaxis]
+        node = np.broadcast_to(self.roots, (n_samples, len(self.roots))).copy()
+        has_nan = bool(np.isnan(X_flat).any())
+        for _ in range(self.meta['max_depth']):
+            x = X_flat[row_offset + self.feature[node]]
+            # Kanan jika tidak x <= threshold; NaN mengikuti missing_go_to_left seperti scikit-learn
+            go_right = x > self.threshold[node]
+            if has_nan:
+                go_right |= np.isnan(x) & ~self.missing_left[node]
+            node = self.children[node * 2 + go_right]
+        return node
+
+    def predict_proba(self, X):
+        # scikit-learn memvalidasi X sebagai float32 sebelum menelusuri pohon
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f'X punya {X.shape[-1]} fitur, model butuh {self.n_features_in_}.')
+        out = np.empty((X.shape[0], self.meta['n_classes']), dtype=np.float64)
+        for start in range(0, X.shape[0], PREDICT_CHUNK):
+            leaves = self.apply(X[start:start + PREDICT_CHUNK])
+            # cumsum = penjumlahan berurutan pohon 0..n-1, sama seperti akumulasi di scikit-learn
+            out[start:start + PREDICT_CHUNK] = np.cumsum(self.values[leaves], axis=1)[:, -1]
+        out /= self.n_estimators
+        return out
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+class CompactScaler:
+    """Pengganti StandardScaler untuk `transform`."""
+
+    def __init__(self, arrays, meta):
+        self.mean_ = arrays['params'][0]
+        self.scale_ = arrays['params'][1]
+        self.n_features_in_ = meta['n_features']
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f'X punya {X.shape[-1]} fitur, scaler butuh {self.n_features_in_}.')
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+
+def _load_manifest(directory):
+    try:
+        with open(os.path.join(directory, COMPACT_MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('format') == COMPACT_FORMAT_VERSION else None
+
+
+@contextmanager
+def _export_lock(directory):
+    # train.py dan worker app bisa mengekspor folder yang sama bersamaan
+    with _export_guard:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(directory, EXPORT_LOCK), 'a+') as handle:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def export_compact(league_dir, artifacts):
+    """
+    Menulis bentuk ringkas `artifacts` ({'model_hda': rf, 'scaler': ...})
+    setelah file .pkl-nya tersimpan. File generasi baru ditulis dulu, lalu
+    compact.json diganti secara atomik dan file generasi lama dihapus.
+    Entri lama yang tidak diekspor ulang tetap dipakai selama .pkl
+    sumbernya tidak berubah.
+    """
+    directory = os.path.join(league_dir, COMPACT_DIR)
+    os.makedirs(directory, exist_ok=True)
+    with _export_lock(directory):
+        return _export(league_dir, directory, artifacts)
+
+
+def ensure_compact(league_dir, artifacts, expected=None):
+    """
+    Mengekspor `artifacts` yang belum punya entri valid di compact/, misal
+    setelah deploy tanpa folder compact/. `expected` ({file .pkl: (mtime_ns,
+    ukuran)}) melewati artefak yang .pkl-nya sudah berganti sejak objeknya
+    dimuat. Mengembalikan nama artefak yang diekspor ([] jika worker lain
+    sudah mengekspornya).
+    """
+    directory = os.path.join(league_dir, COMPACT_DIR)
+    os.makedirs(directory, exist_ok=True)
+    with _export_lock(directory):
+        manifest = _load_manifest(directory)
+        current = manifest['models'] if manifest else {}
+        todo = {}
+        for name, obj in artifacts.items():
+            if obj is None or name not in COMPACT_SOURCES:
+                continue
+            if name in current and _source_matches(league_dir, current[name]['source']):
+                continue
+            if expected is not None:
+                st = os.stat(os.path.join(league_dir, COMPACT_SOURCES[name]))
+                if expected.get(COMPACT_SOURCES[name]) != (st.st_mtime_ns, st.st_size):
+                    continue
+            todo[name] = obj
+        if todo:
+            _export(league_dir, directory, todo)
+        return sorted(todo)
+
+
+def _export(league_dir, directory, artifacts):
+    old = _load_manifest(directory)
+    generation = (old['generation'] + 1) if old else 1
+    models = {}
+    if old:
+        models.update({name: meta for name, meta in old['models'].items()
+                       if artifacts.get(name) is None and _source_matches(league_dir, meta['source'])})
+    for name, obj in artifacts.items():
+        if obj is None or name not in COMPACT_SOURCES:
+            continue
+        arrays, meta = flatten_scaler(obj) if name == 'scaler' else flatten_forest(obj)
+        meta['arrays'] = {}
+        for key, values in arrays.items():
+            meta['arrays'][key] = f'g{generation}_{name}.{key}.npy'
+            np.save(os.path.join(directory, meta['arrays'][key]), np.ascontiguousarray(values), allow_pickle=False)
+        meta['source'] = _source_info(os.path.join(league_dir, COMPACT_SOURCES[name]))
+        models[name] = meta
+    manifest = {'format': COMPACT_FORMAT_VERSION, 'generation': generation, 'models': models}
+    tmp_path = os.path.join(directory, COMPACT_MANIFEST + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(directory, COMPACT_MANIFEST))
+    current = set(_files(manifest))
+    for fname in os.listdir(directory):
+        if fname.endswith('.npy') and fname not in current:
+            try:
+                os.remove(os.path.join(directory, fname))
+            except OSError:
+                pass
+    return manifest
+
+
+def _files(manifest):
+    return [fname for meta in manifest['models'].values() for fname in meta['arrays'].values()]
+
+
+def _open(directory, fname):
+    # view(np.ndarray): tetap mmap, tanpa subclass np.memmap di hasil operasi
+    return np.load(os.path.join(directory, fname), mmap_mode='r', allow_pickle=False).view(np.ndarray)
+
+
+def load_compact(league_dir, attempts=3):
+    """
+    {nama: CompactForest/CompactScaler} untuk entri yang sumbernya masih
+    cocok dengan file .pkl di `league_dir`; {} jika belum pernah diekspor.
+    """
+    directory = os.path.join(league_dir, COMPACT_DIR)
+    for attempt in range(attempts):
+        manifest = _load_manifest(directory)
+        if manifest is None:
+            return {}
+        try:
+            loaded = {}
+            for name, meta in manifest['models'].items():
+                if not _source_matches(league_dir, meta['source']):
+                    continue
+                arrays = {key: _open(directory, fname) for key, fname in meta['arrays'].items()}
+                loaded[name] = (CompactScaler if meta['kind'] == 'scaler' else CompactForest)(arrays, meta)
+            return loaded
+        except FileNotFoundError:
+            # Ekspor baru bisa menghapus file generasi lama tepat setelah manifest dibaca
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.05)
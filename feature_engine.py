@@ -0,0 +1,198 @@
+"""
+Mesin Elo dan fitur yang berjalan satu kali lewat (streaming).
+
+State per tim (Elo saat ini, ring buffer N hasil terakhir) dan per pasangan
+tim (ring buffer N pertemuan terakhir) dibawa dari laga ke laga, sehingga
+fitur setiap laga baru dihitung dalam O(N) tanpa memotong ulang tabel
+history. State setelah seluruh dataset lama bisa disimpan (misal lewat
+`LeagueDatasetCache.derived`) dan dipakai ulang untuk setiap unggahan.
+
+Hasilnya identik dengan logika lama `update_elo_and_features`, termasuk
+cara Elo awal diambil dari kolom Elo terakhir di dataset lalu seluruh
+history diputar ulang di atasnya.
+"""
+from collections import deque
+
+from lazy_imports import lazy_module
+from league_index import TeamIndex, chronological_order, pair_key, summarize_h2h, summarize_results
+
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+ODDS_COLUMNS = ['AvgH', 'AvgD', 'AvgA', 'Avg>2.5', 'Avg<2.5']
+# run_engine melapor kemajuan (jika diminta) setiap sekian laga
+PROGRESS_EVERY = 500
+
+
+def _push(buffer, item, oldest):
+    # Laga bertanggal NaT dianggap paling lama: hanya mengisi slot yang masih kosong
+    if not oldest:
+        buffer.append(item)
+    elif len(buffer) < buffer.maxlen:
+        buffer.appendleft(item)
+
+
+class FeatureEngine:
+    """State Elo/form/H2H yang diperbarui satu laga per satu laga lewat `process`."""
+
+    def __init__(self, window=5, K=30, initial_elo=1500):
+        self.window = window
+        self.K = K
+        self.initial_elo = initial_elo
+        self.elo = {}
+        self.form = {}
+        self.meetings = {}
+
+    @classmethod
+    def from_history(cls, df_existing, window=5, K=30, initial_elo=1500, team_index=None):
+        """
+        State setelah memutar seluruh dataset lama: Elo disemai dari Elo
+        terakhir tiap tim, lalu semua laga diproses berurutan menurut tanggal.
+        """
+        engine = cls(window, K, initial_elo)
+        if df_existing.empty:
+            return engine
+        engine.seed_elo(team_index if team_index is not None else TeamIndex.from_frame(df_existing))
+        order = sorted_order(df_existing)
+        home = df_existing['HomeTeam'].to_numpy(dtype=object)[order]
+        away = df_existing['AwayTeam'].to_numpy(dtype=object)[order]
+        fthg = df_existing['FTHG'].to_numpy(dtype=object)[order]
+        ftag = df_existing['FTAG'].to_numpy(dtype=object)[order]
+        is_nat = _nat_mask(df_existing)[order]
+        for i in range(len(order)):
+            engine.process(home[i], away[i], fthg[i], ftag[i], oldest=is_nat[i], features=False)
+        return engine
+
+    def seed_elo(self, team_index):
+        for team in team_index.teams():
+            last_elo = team_index.last_elo(team)
+            if last_elo is not None:
+                self.elo[team] = last_elo
+
+    def copy(self):
+        clone = FeatureEngine(self.window, self.K, self.initial_elo)
+        clone.elo = dict(self.elo)
+        clone.form = {team: deque(buf, maxlen=self.window) for team, buf in self.form.items()}
+        clone.meetings = {key: deque(buf, maxlen=self.window) for key, buf in self.meetings.items()}
+        return clone
+
+    def team_form(self, team):
+        buffer = self.form.get(team)
+        if not buffer:
+            return summarize_results(np.empty(0), np.empty(0))
+        results = np.array(buffer, dtype=float)
+        return summarize_results(results[:, 0], results[:, 1])
+
+    def head_to_head(self, home, away):
+        key = pair_key(home, away)
+        buffer = self.meetings.get(key)
+        if not buffer:
+            return summarize_h2h(np.empty(0), np.empty(0))
+        goals = np.array(buffer, dtype=float)
+        if key[0] == home:
+            return summarize_h2h(goals[:, 0], goals[:, 1])
+        return summarize_h2h(goals[:, 1], goals[:, 0])
+
+    def process(self, home, away, fthg, ftag, oldest=False, features=True):
+        """
+        Memproses satu laga. Jika `features=True`, mengembalikan fitur laga
+        tersebut: Elo setelah laga, form kedua tim dan H2H sebelum laga.
+        """
+        if features:
+            home_stats = self.team_form(home)
+            away_stats = self.team_form(away)
+            hth = self.head_to_head(home, away)
+
+        # Ambil ELO SEBELUM pertandingan ini
+        h_elo_pre = self.elo.get(home, self.initial_elo)
+        a_elo_pre = self.elo.get(away, self.initial_elo)
+        E_h = 1/(1+10**((a_elo_pre-h_elo_pre)/400))
+        E_a = 1-E_h
+        if fthg>ftag: S_h,S_a=1,0
+        elif fthg<ftag: S_h,S_a=0,1
+        else: S_h,S_a=0.5,0.5
+        h_elo_new=h_elo_pre+self.K*(S_h-E_h)
+        a_elo_new=a_elo_pre+self.K*(S_a-E_a)
+        self.elo[home],self.elo[away]=h_elo_new,a_elo_new
+
+        window = self.window
+        _push(self.form.setdefault(home, deque(maxlen=window)), (fthg, ftag), oldest)
+        _push(self.form.setdefault(away, deque(maxlen=window)), (ftag, fthg), oldest)
+        key = pair_key(home, away)
+        goals = (fthg, ftag) if key[0] == home else (ftag, fthg)
+        _push(self.meetings.setdefault(key, deque(maxlen=window)), goals, oldest)
+
+        if not features:
+            return None
+        return {
+            'HomeTeamElo':h_elo_new,'AwayTeamElo':a_elo_new,'EloDifference':h_elo_new-a_elo_new,
+            'Home_AvgGoalsScored':home_stats['AvgGoalsScored'],'Home_AvgGoalsConceded':home_stats['AvgGoalsConceded'],
+            'Home_Wins':home_stats['Wins'],'Home_Draws':home_stats['Draws'],'Home_Losses':home_stats['Losses'],
+            'Away_AvgGoalsScored':away_stats['AvgGoalsScored'],'Away_AvgGoalsConceded':away_stats['AvgGoalsConceded'],
+            'Away_Wins':away_stats['Wins'],'Away_Draws':away_stats['Draws'],'Away_Losses':away_stats['Losses'],
+            **hth,
+        }
+
+
+def _nat_mask(df):
+    return np.isnat(df['Date'].to_numpy(dtype='datetime64[ns]'))
+
+
+def sorted_order(df):
+    """Urutan proses: tanggal naik (stabil), baris NaT paling akhir dengan urutan asli."""
+    order = chronological_order(df)
+    n_nat = int(_nat_mask(df).sum())
+    return np.concatenate([order[n_nat:], order[:n_nat][::-1]])
+
+
+def run_engine(df_existing, df_new, window=5, K=30, initial_elo=1500, engine=None, team_index=None, progress=None):
+    """
+    Menghitung fitur untuk baris `df_new`. `engine` (opsional) adalah state
+    setelah `df_existing` (hasil `FeatureEngine.from_history`).
+
+    Jika semua laga baru bertanggal setelah laga terakhir di dataset lama,
+    hanya baris baru yang diproses di atas salinan `engine`. Selain itu
+    (misal mengunggah laga lama) seluruh history diputar ulang sekali jalan.
+    `progress(diproses, total)` (opsional) dipanggil setiap PROGRESS_EVERY laga.
+    Mengembalikan (DataFrame gabungan terurut, posisi baris baru, list fitur).
+    """
+    df_combined = pd.concat([df_existing, df_new], ignore_index=True)
+    order = sorted_order(df_combined)
+    n_existing = len(df_existing)
+    new_positions = np.flatnonzero(order >= n_existing)
+    is_nat = _nat_mask(df_combined)[order]
+
+    append_only = (
+        engine is not None
+        and (engine.window, engine.K, engine.initial_elo) == (window, K, initial_elo)
+        and not is_nat.any()
+        and (n_existing == 0 or len(df_new) == 0
+             or df_new['Date'].min() > df_existing['Date'].max())
+    )
+    if append_only:
+        state = engine.copy()
+        positions = new_positions
+    else:
+        state = FeatureEngine(window, K, initial_elo)
+        if n_existing:
+            state.seed_elo(team_index if team_index is not None else TeamIndex.from_frame(df_existing))
+        positions = np.arange(len(order))
+
+    rows = order[positions]
+    home = df_combined['HomeTeam'].to_numpy(dtype=object)[rows]
+    away = df_combined['AwayTeam'].to_numpy(dtype=object)[rows]
+    fthg = df_combined['FTHG'].to_numpy(dtype=object)[rows]
+    ftag = df_combined['FTAG'].to_numpy(dtype=object)[rows]
+    nat = is_nat[positions]
+    is_new = rows >= n_existing
+
+    features = []
+    for i in range(len(rows)):
+        if progress is not None and i % PROGRESS_EVERY == 0:
+            progress(i, len(rows))
+        result = state.process(home[i], away[i], fthg[i], ftag[i], oldest=nat[i], features=is_new[i])
+        if result is not None:
+            features.append(result)
+    if progress is not None:
+        progress(len(rows), len(rows))
+    return df_combined.take(order).reset_index(drop=True), new_positions, features
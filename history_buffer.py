@@ -0,0 +1,192 @@
+"""
+Buffer write-behind untuk riwayat prediksi.
+
+Request prediksi hanya memasukkan baris (dict) ke antrian di memori;
+thread latar belakang menulisnya ke database dalam satu bulk insert per
+`batch_size` baris atau paling lambat tiap `flush_interval` detik. Dengan
+begitu latensi prediksi tidak ikut menanggung round trip dan fsync database.
+
+Antrian dibatasi `max_rows`. Jika penuh (misal database sedang lambat atau
+mati), pemanggil menunggu paling lama `block_seconds` agar flusher sempat
+mengosongkan antrian; setelah itu baris baru DIBUANG dan dihitung di
+`dropped`. Batch yang gagal ditulis dikembalikan ke depan antrian dan dicoba
+lagi dengan jeda yang makin panjang, sehingga tidak ada baris yang hilang
+selama antrian belum penuh.
+
+`pending(key)` mengembalikan baris yang belum tersimpan (termasuk batch yang
+sedang ditulis) untuk digabung ke hasil query (read-your-writes dalam satu
+proses). `close()` menghentikan thread dan menulis sisa antrian; dipanggil
+saat proses berhenti.
+
+Antrian ada di memori setiap proses. Dengan beberapa worker gunicorn,
+request yang masuk ke worker lain baru melihat baris tersebut setelah
+worker asalnya menulis batch, yaitu paling lambat sekitar `flush_interval`
+detik (lebih lama jika database sedang gagal). Jika riwayat harus langsung
+terlihat di semua worker, matikan write-behind (HISTORY_WRITE_BEHIND=0 di
+app.py) atau jalankan satu worker.
+"""
+import threading
+import time
+import traceback
+from collections import deque
+
+
+class WriteBehindBuffer:
+    """
+    `flush_func(rows)` menulis list baris ke database (dan commit); pengecualian
+    dianggap gagal. `key_func(row)` menentukan kelompok baris untuk `pending`
+    dan `discard` (misal user_id).
+    """
+
+    def __init__(self, flush_func, key_func, max_rows=10000, batch_size=200, flush_interval=1.0,
+                 block_seconds=0.05, max_backoff=30.0):
+        self.flush_func = flush_func
+        self.key_func = key_func
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_seconds = block_seconds
+        self.max_backoff = max_backoff
+        self._queue = deque()
+        self._inflight = []
+        self._cond = threading.Condition()
+        # Hanya satu flush pada satu waktu (thread latar belakang atau flush() manual)
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._thread = None
+        self.added = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failures = 0
+        self.batches = 0
+
+    def start(self):
+        with self._cond:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name='history-flush', daemon=True)
+                self._thread.start()
+        return self
+
+    def add(self, rows):
+        """Memasukkan baris ke antrian; mengembalikan jumlah baris yang dibuang karena antrian penuh."""
+        rows = list(rows)
+        if not rows:
+            return 0
+        deadline = time.monotonic() + self.block_seconds
+        with self._cond:
+            closed = self._closed
+            if not closed:
+                while len(self._queue) + len(rows) > self.max_rows:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.notify_all()
+                    self._cond.wait(remaining)
+                room = max(0, self.max_rows - len(self._queue))
+                accepted, rejected = rows[:room], len(rows) - min(room, len(rows))
+                self._queue.extend(accepted)
+                self.added += len(accepted)
+                self.dropped += rejected
+                if len(self._queue) >= self.batch_size:
+                    self._cond.notify_all()
+        if closed:
+            # Setelah close() tidak ada flusher lagi: tulis langsung
+            self._write(rows)
+            return 0
+        if rejected:
+            print(f"Antrian riwayat penuh ({self.max_rows} baris): {rejected} baris dibuang")
+        return rejected
+
+    def pending(self, key):
+        """Baris milik `key` yang belum tersimpan di database, urut sesuai waktu masuk."""
+        with self._cond:
+            return [row for row in (*self._inflight, *self._queue) if self.key_func(row) == key]
+
+    def discard(self, key):
+        """
+        Membuang baris antrian milik `key` (misal saat riwayat user dihapus).
+        Batch yang sedang ditulis ditunggu dulu agar tidak muncul lagi setelah penghapusan.
+        """
+        with self._flush_lock:
+            with self._cond:
+                kept = [row for row in self._queue if self.key_func(row) != key]
+                removed = len(self._queue) - len(kept)
+                self._queue = deque(kept)
+                self._cond.notify_all()
+        return removed
+
+    def _take_batch(self):
+        with self._cond:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            self._inflight = batch
+            self._cond.notify_all()
+        return batch
+
+    def _write(self, rows):
+        self.flush_func(rows)
+        self.flushed += len(rows)
+        self.batches += 1
+
+    def flush(self):
+        """Menulis seluruh antrian sekarang; True jika antrian kosong setelahnya."""
+        with self._flush_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    return True
+                try:
+                    self._write(batch)
+                except Exception:
+                    self.failures += 1
+                    traceback.print_exc()
+                    with self._cond:
+                        self._queue.extendleft(reversed(batch))
+                        self._inflight = []
+                    return False
+                with self._cond:
+                    self._inflight = []
+
+    def _run(self):
+        backoff = 0.0
+        while True:
+            with self._cond:
+                if backoff:
+                    # Setelah gagal, tunggu penuh walaupun antrian sudah sebesar batch_size
+                    deadline = time.monotonic() + backoff
+                    while not self._closed and deadline > time.monotonic():
+                        self._cond.wait(deadline - time.monotonic())
+                elif not self._closed and len(self._queue) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._closed:
+                    return
+            if self.flush():
+                backoff = 0.0
+            else:
+                backoff = min(self.max_backoff, max(backoff * 2, self.flush_interval, 0.1))
+
+    def close(self, timeout=10.0):
+        """Menghentikan thread flusher lalu menulis sisa antrian (dicoba sampai `timeout`)."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        deadline = time.monotonic() + timeout
+        while not self.flush() and time.monotonic() < deadline:
+            time.sleep(0.2)
+        if self._queue:
+            print(f"Riwayat gagal disimpan saat berhenti: {len(self._queue)} baris")
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pending': len(self._queue) + len(self._inflight),
+                'max_rows': self.max_rows,
+                'added': self.added,
+                'flushed': self.flushed,
+                'dropped': self.dropped,
+                'failures': self.failures,
+                'batches': self.batches,
+            }
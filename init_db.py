@@ -7,4 +7,8 @@ from app import app, db
 with app.app_context():
     # db.create_all() akan membuat tabel jika belum ada
     db.create_all()
+    # Migrasi: create_all tidak menambahkan indeks baru ke tabel yang sudah ada (SQLite/Postgres)
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
     print("Database tables created/checked successfully.")
\ No newline at end of file
@@ -0,0 +1,178 @@
+"""
+Antrian job latar belakang untuk pekerjaan berat (misal proses unggahan CSV).
+
+Job dijalankan di thread pool proses yang menerimanya, sedangkan statusnya
+disimpan di tabel SQLite (`jobs`). Karena tabelnya satu file, worker gunicorn
+mana pun bisa menjawab polling status/hasil, tidak harus worker yang
+menjalankan job. Fungsi job menerima `progress(processed, total, message)`
+untuk melaporkan kemajuan; hasilnya (dict yang bisa di-JSON-kan, atau string
+yang sudah berupa JSON) disimpan di tabel sampai job kedaluwarsa (`ttl`).
+`result_json` mengembalikan teks JSON itu apa adanya sehingga hasil besar
+bisa dikirim tanpa di-parse lalu di-encode ulang.
+
+Status job: queued -> running -> done | error. Job milik proses yang sudah
+mati (misal worker di-restart) ditandai error saat statusnya dibaca.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_ERROR = 'error'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    state TEXT NOT NULL,
+    owner TEXT,
+    pid INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    stage_started_at REAL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    message TEXT,
+    result TEXT
+)
+"""
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    `workers` = jumlah job yang berjalan bersamaan di proses ini.
+    `progress_interval` (detik) membatasi seberapa sering kemajuan ditulis ke SQLite.
+    """
+
+    def __init__(self, db_path, workers=1, ttl=24 * 3600, progress_interval=0.5):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.progress_interval = progress_interval
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='job')
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    conn.execute(_SCHEMA)
+                    conn.commit()
+                    self._initialized = True
+        return conn
+
+    def _update(self, job_id, **fields):
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(f'UPDATE jobs SET {columns} WHERE id = ?', (*fields.values(), job_id))
+        finally:
+            conn.close()
+
+    def submit(self, kind, func, owner=None, **kwargs):
+        """Mendaftarkan job lalu langsung kembali dengan id job; `func(progress, **kwargs)` jalan di thread pool."""
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            with conn:
+                if self.ttl:
+                    conn.execute('DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?',
+                                 (time.time() - self.ttl,))
+                conn.execute('INSERT INTO jobs (id, kind, state, owner, pid, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                             (job_id, kind, JOB_QUEUED, None if owner is None else str(owner), os.getpid(), time.time()))
+        finally:
+            conn.close()
+        self._executor.submit(self._run, job_id, func, kwargs)
+        return job_id
+
+    def _run(self, job_id, func, kwargs):
+        now = time.time()
+        self._update(job_id, state=JOB_RUNNING, started_at=now, stage_started_at=now)
+        last = {'time': 0.0, 'message': None}
+
+        def progress(processed, total=None, message=None):
+            # Tahap baru dan kemajuan 100% selalu ditulis; selebihnya paling sering tiap progress_interval
+            now = time.monotonic()
+            if (message == last['message'] and now - last['time'] < self.progress_interval
+                    and (total is None or processed < total)):
+                return
+            fields = {'processed': int(processed)}
+            if message != last['message']:
+                fields['stage_started_at'] = time.time()
+            last.update(time=now, message=message)
+            if total is not None:
+                fields['total'] = int(total)
+            if message is not None:
+                fields['message'] = message
+            self._update(job_id, **fields)
+
+        try:
+            result = func(progress, **kwargs)
+            if not isinstance(result, str):
+                result = json.dumps(result)
+            self._update(job_id, state=JOB_DONE, finished_at=time.time(), result=result)
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, state=JOB_ERROR, finished_at=time.time(), message=str(e))
+
+    def get(self, job_id):
+        """Status job (tanpa hasil) sebagai dict, atau None jika tidak ada."""
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        job = dict(row)
+        job.pop('result')
+        if job['state'] in (JOB_QUEUED, JOB_RUNNING) and job['pid'] != os.getpid() and not _pid_alive(job['pid']):
+            message = 'Proses yang menjalankan job ini berhenti sebelum selesai.'
+            self._update(job_id, state=JOB_ERROR, finished_at=time.time(), message=message)
+            job.update(state=JOB_ERROR, message=message)
+        job['progress'] = None
+        job['eta_seconds'] = None
+        if job['total']:
+            job['progress'] = min(1.0, job['processed'] / job['total'])
+            # ETA dari laju tahap yang sedang berjalan (message), bukan sejak job mulai
+            if job['state'] == JOB_RUNNING and job['processed'] and job['stage_started_at']:
+                elapsed = time.time() - job['stage_started_at']
+                job['eta_seconds'] = round(elapsed / job['processed'] * (job['total'] - job['processed']), 1)
+        return job
+
+    def result_json(self, job_id):
+        """Hasil job yang sudah selesai sebagai teks JSON, atau None."""
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT result FROM jobs WHERE id = ? AND state = ?', (job_id, JOB_DONE)).fetchone()
+        finally:
+            conn.close()
+        return None if row is None else row['result']
+
+    def result(self, job_id):
+        """Hasil job yang sudah selesai (dict), atau None."""
+        text = self.result_json(job_id)
+        return None if text is None else json.loads(text)
@@ -0,0 +1,82 @@
+"""
+Import modul berat (pandas, NumPy, joblib/scikit-learn) secara malas.
+
+`np = lazy_module('numpy')` memberi objek pengganti yang baru mengimpor
+modul aslinya saat atribut pertama kali dipakai (`np.array`, `pd.read_csv`).
+Dengan begitu `import app` dan rute ringan (`/`, `/login`, `/api/leagues`)
+tidak ikut memuat stack data/ML; stack tersebut dimuat oleh thread warmup
+atau oleh request pertama yang membutuhkannya.
+
+Setelah dimuat, isi modul disalin ke objek pengganti sehingga akses atribut
+berikutnya secepat akses ke modul biasa. Lama import setiap modul dicatat
+di `import_timings()`.
+"""
+import importlib
+import sys
+import threading
+import time
+
+_timings = {}
+_lock = threading.Lock()
+
+
+def timed_import(name):
+    """Mengimpor `name` dan mencatat lamanya (hanya import pertama di proses ini yang dicatat)."""
+    # Modul yang sedang diimpor thread lain sudah ada di sys.modules tapi belum lengkap;
+    # import_module menunggu import tersebut selesai, jadi jangan ambil langsung dari sys.modules
+    recorded = name in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    if not recorded:
+        with _lock:
+            _timings.setdefault(name, time.perf_counter() - start)
+    return module
+
+
+def import_timings():
+    """{modul: detik} untuk modul yang diimpor lewat `timed_import`/`lazy_module`, urut sesuai waktu import."""
+    with _lock:
+        return dict(_timings)
+
+
+class LazyModule:
+    def __init__(self, name):
+        self.__dict__['_lazy_name'] = name
+        self.__dict__['_lazy_module'] = None
+        self.__dict__['_lazy_lock'] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            # Thread warmup dan request bisa memicu import bersamaan; isi modul disalin sekali, setelah lengkap
+            with self.__dict__['_lazy_lock']:
+                module = self.__dict__['_lazy_module']
+                if module is None:
+                    module = timed_import(self.__dict__['_lazy_name'])
+                    self.__dict__.update(module.__dict__)
+                    self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        # Hanya dipanggil untuk atribut yang belum ada di __dict__ (sebelum dimuat, atau atribut baru)
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+        self.__dict__[attr] = value
+
+    def __dir__(self):
+        return dir(self._load())
+
+    @property
+    def loaded(self):
+        return self.__dict__['_lazy_module'] is not None
+
+    def __repr__(self):
+        state = 'dimuat' if self.loaded else 'belum dimuat'
+        return f"<lazy module '{self.__dict__['_lazy_name']}' ({state})>"
+
+
+def lazy_module(name):
+    """Modul yang sudah diimpor dikembalikan apa adanya; selain itu pengganti yang mengimpor saat dipakai."""
+    return sys.modules.get(name) or LazyModule(name)
@@ -0,0 +1,135 @@
+"""
+Cache dataset liga di memori, berlaku untuk satu proses (worker).
+
+Setiap entri dikunci dengan path file dataset dan versinya (mtime_ns, ukuran),
+jadi file yang berubah di disk otomatis dibaca ulang. Jumlah entri dibatasi
+dan entri yang paling lama tidak dipakai akan dibuang (LRU).
+
+DataFrame yang dibagikan bersifat read-only: array di dalamnya dikunci
+(writeable=False) dan setiap pemanggil menerima salinan dangkal, sehingga
+mengganti kolom di sisi pemanggil tidak mengubah isi cache.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+
+def file_version(path):
+    """Versi file dataset: (mtime_ns, ukuran byte)."""
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def freeze_dataframe(df):
+    """
+    Membuat DataFrame dengan array kolom yang tidak bisa ditulis.
+    Kolom berbasis NumPy disalin sekali lalu dikunci, kecuali array yang
+    memang sudah read-only (misal mmap dari store kolumnar); kolom extension
+    (misal string berbasis Arrow) memang sudah immutable.
+    """
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, np.dtype):
+            values = series.to_numpy()
+            if values.flags.writeable:
+                values = values.copy()
+                values.flags.writeable = False
+            columns[col] = values
+        else:
+            columns[col] = series.array
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+class _Entry:
+    __slots__ = ('version', 'frame', 'derived')
+
+    def __init__(self, version, frame):
+        self.version = version
+        self.frame = frame
+        self.derived = {}
+
+
+class LeagueDatasetCache:
+    """
+    Cache LRU untuk DataFrame liga.
+
+    `loader(path)` dipanggil saat cache miss dan harus mengembalikan
+    DataFrame yang sudah diparse (misal kolom Date sudah datetime).
+    """
+
+    def __init__(self, loader, max_entries=8, version_func=file_version):
+        self.loader = loader
+        self.max_entries = max(1, int(max_entries))
+        self.version_func = version_func
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _entry(self, path):
+        version = self.version_func(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Parsing dilakukan di luar lock supaya liga lain tidak ikut menunggu
+        frame = freeze_dataframe(self.loader(path))
+        entry = _Entry(version, frame)
+        with self._lock:
+            self._entries[path] = entry
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def get(self, path):
+        """Mengembalikan salinan dangkal (read-only) dari dataset di `path`."""
+        return self._entry(path).frame.copy(deep=False)
+
+    def derived(self, path, name, builder):
+        """
+        Struktur turunan (indeks, roster, dll.) yang dibangun sekali per versi
+        dataset. `builder(df)` menerima DataFrame read-only; hasilnya disimpan
+        bersama entri cache dan ikut hilang saat dataset berubah.
+        """
+        entry = self._entry(path)
+        value = entry.derived.get(name)
+        if value is None:
+            value = builder(entry.frame.copy(deep=False))
+            entry.derived[name] = value
+        return value
+
+    def invalidate(self, path=None):
+        """Membuang entri `path` (atau seluruh cache jika None)."""
+        with self._lock:
+            if path is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+            elif self._entries.pop(path, None) is not None:
+                self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits / total) if total else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,170 @@
+"""
+Katalog liga: nama tampilan, path dataset, folder model dan metadata.
+
+Daftar dataset dipindai sekali lalu disimpan di memori; pencarian liga
+memakai dict dengan kunci yang dinormalisasi (huruf kecil, tanpa spasi dan
+garis bawah), sehingga 'La Liga', 'la_liga' dan 'laliga' menuju liga yang
+sama tanpa glob dan tanpa pencocokan substring. Katalog dipindai ulang jika
+mtime folder dataset berubah (file ditambah/dihapus/diganti, dicek paling
+sering tiap `check_interval` detik) atau setelah `invalidate()`, misal
+setelah dataset disimpan.
+
+Dipakai oleh app.py dan train.py agar penamaan liga dan folder
+`models/<liga>` berasal dari satu tempat.
+"""
+import os
+import threading
+import time
+
+from league_index import parse_match_dates
+from model_registry import league_folder_name
+from storage import list_datasets, read_dataset
+
+# Nama file dataset (tanpa 'dataset_' dan '_1', huruf kecil tanpa '_') -> nama tampilan
+SPECIAL_NAMES = {
+    'seriea': 'Serie A',
+    'laliga': 'La Liga',
+    'premierleague': 'Premier League',
+    'bundesliga': 'Bundesliga',
+    'ligue1': 'Ligue 1',
+}
+
+
+def pretty_league_name(file_name):
+    """
+    Mengubah nama file dataset menjadi nama liga yang rapi untuk tampilan.
+    Contoh: 'dataset_serieA_1' -> 'Serie A'
+    """
+    name = file_name.replace('dataset_', '').replace('.csv', '')
+    name = name.replace('_1', '')
+    key = name.lower().replace('_', '')
+    return SPECIAL_NAMES.get(key, name.replace('_', ' ').title())
+
+
+def lookup_key(name):
+    """Kunci pencarian: 'La Liga', 'la_liga' dan 'laliga' -> 'laliga'."""
+    return str(name).lower().replace(' ', '').replace('_', '')
+
+
+def league_metadata(df):
+    """Jumlah laga, tanggal laga terakhir (YYYY-MM-DD) dan jumlah tim dalam satu dataset."""
+    last_date = None
+    if 'Date' in df.columns and len(df):
+        latest = parse_match_dates(df['Date']).max()
+        last_date = None if latest != latest else latest.strftime('%Y-%m-%d')  # NaT != NaT
+    teams = set()
+    for col in ('HomeTeam', 'AwayTeam'):
+        if col in df.columns:
+            teams.update(df[col].dropna().unique().tolist())
+    return {'rows': int(len(df)), 'last_date': last_date, 'teams': len(teams)}
+
+
+class LeagueEntry:
+    """Satu liga di katalog."""
+
+    def __init__(self, dataset_path, model_root):
+        self.file_base = os.path.splitext(os.path.basename(dataset_path))[0]
+        self.name = pretty_league_name(self.file_base)
+        self.key = league_folder_name(self.name)
+        self.dataset_path = dataset_path
+        self.model_dir = os.path.join(model_root, self.key)
+
+    def info(self):
+        return {
+            'name': self.name,
+            'key': self.key,
+            'file_base': self.file_base,
+            'dataset_path': self.dataset_path,
+            'model_dir': self.model_dir,
+        }
+
+
+class LeagueCatalog:
+    """
+    `metadata_loader(path)` mengembalikan metadata satu dataset; default
+    membaca dataset dan memanggil `league_metadata`. app.py memakai cache
+    dataset agar metadata hanya dihitung sekali per versi dataset.
+    """
+
+    def __init__(self, dataset_dir, model_dir, check_interval=2.0, metadata_loader=None):
+        self.dataset_dir = dataset_dir
+        self.model_dir = model_dir
+        self.check_interval = check_interval
+        self.metadata_loader = metadata_loader or _read_metadata
+        self._entries = []
+        self._by_key = {}
+        self._by_path = {}
+        self._signature = None
+        self._stale = True
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self.scans = 0
+
+    def _dir_signature(self):
+        try:
+            return os.stat(self.dataset_dir).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self, force=False):
+        """Memindai ulang jika folder dataset berubah (atau `force`)."""
+        now = time.monotonic()
+        with self._lock:
+            if (not force and self._checked_at is not None
+                    and now - self._checked_at < self.check_interval):
+                return
+            self._checked_at = now
+            signature = self._dir_signature()
+            if not force and not self._stale and signature == self._signature:
+                return
+            entries, by_key = [], {}
+            for path in list_datasets(self.dataset_dir):
+                entry = LeagueEntry(path, self.model_dir)
+                if lookup_key(entry.name) in by_key:
+                    print(f"Dataset {path} diabaikan: liga '{entry.name}' sudah ada "
+                          f"({by_key[lookup_key(entry.name)].dataset_path})")
+                    continue
+                entries.append(entry)
+                for alias in (entry.name, entry.file_base):
+                    by_key.setdefault(lookup_key(alias), entry)
+            self._entries = entries
+            self._by_key = by_key
+            self._by_path = {os.path.normpath(entry.dataset_path): entry for entry in entries}
+            self._signature = signature
+            self._stale = False
+            self.scans += 1
+
+    def invalidate(self):
+        """Memaksa pemindaian ulang pada pemakaian berikutnya."""
+        with self._lock:
+            self._checked_at = None
+            self._stale = True
+
+    def entries(self):
+        self.refresh()
+        return list(self._entries)
+
+    def names(self):
+        self.refresh()
+        return [entry.name for entry in self._entries]
+
+    def get(self, name):
+        """LeagueEntry untuk nama tampilan/folder/file liga, atau None."""
+        if not name:
+            return None
+        self.refresh()
+        return self._by_key.get(lookup_key(name))
+
+    def by_path(self, path):
+        self.refresh()
+        return self._by_path.get(os.path.normpath(path))
+
+    def metadata(self, name):
+        entry = self.get(name)
+        if entry is None:
+            return None
+        return {**entry.info(), **self.metadata_loader(entry.dataset_path)}
+
+
+def _read_metadata(path):
+    return league_metadata(read_dataset(path))
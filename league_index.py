@@ -0,0 +1,309 @@
+"""
+Indeks per tim, per pasangan tim (head-to-head) dan per kunci laga untuk
+satu dataset liga.
+
+Dibangun sekali per versi dataset (lihat `LeagueDatasetCache.derived`), lalu
+dipakai untuk menjawab "statistik N laga terakhir", "Elo terakhir",
+"N pertemuan terakhir" dan "apakah laga ini sudah ada" tanpa memfilter dan
+mengurutkan seluruh tabel di setiap request.
+"""
+from array import array
+
+from lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+EMPTY_RECENT_STATS = {'AvgGoalsScored': 0, 'AvgGoalsConceded': 0, 'Wins': 0, 'Draws': 0, 'Losses': 0}
+EMPTY_H2H_STATS = {'HTH_HomeWins': 0, 'HTH_AwayWins': 0, 'HTH_Draws': 0,
+                   'HTH_AvgHomeGoals': 0, 'HTH_AvgAwayGoals': 0}
+
+
+def chronological_order(df):
+    """
+    Urutan baris dari yang paling lama ke yang paling baru.
+    Cerminan dari `sort_values('Date', ascending=False)`: tanggal NaT dianggap
+    paling lama, dan tanpa kolom Date baris teratas dianggap paling baru.
+    """
+    if 'Date' not in df.columns:
+        return np.arange(len(df))[::-1]
+    dates = df['Date'].to_numpy(dtype='datetime64[ns]')
+    is_nat = np.isnat(dates)
+    # Di urutan menurun, NaT berada paling belakang dengan urutan asli baris,
+    # jadi di urutan kronologis NaT ada di depan dengan urutan terbalik
+    valid = np.flatnonzero(~is_nat)
+    valid = valid[np.argsort(dates[valid], kind='stable')]
+    return np.concatenate([np.flatnonzero(is_nat)[::-1], valid])
+
+
+def summarize_results(scored, conceded):
+    """Rata-rata gol dan jumlah W/D/L dari array gol (sudut pandang satu tim)."""
+    if len(scored) == 0:
+        return dict(EMPTY_RECENT_STATS)
+    wins = int((scored > conceded).sum())
+    draws = int((scored == conceded).sum())
+    return {
+        'AvgGoalsScored': float(np.nanmean(scored)),
+        'AvgGoalsConceded': float(np.nanmean(conceded)),
+        'Wins': wins,
+        'Draws': draws,
+        'Losses': int(len(scored) - wins - draws),
+    }
+
+
+def summarize_h2h(home_goals, away_goals):
+    """Agregat head-to-head dari array gol, dilihat dari sisi tuan rumah laga yang diprediksi."""
+    if len(home_goals) == 0:
+        return dict(EMPTY_H2H_STATS)
+    home_wins = int((home_goals > away_goals).sum())
+    away_wins = int((home_goals < away_goals).sum())
+    return {
+        'HTH_HomeWins': home_wins,
+        'HTH_AwayWins': away_wins,
+        'HTH_Draws': int(len(home_goals) - home_wins - away_wins),
+        'HTH_AvgHomeGoals': float(np.mean(home_goals)),
+        'HTH_AvgAwayGoals': float(np.mean(away_goals)),
+    }
+
+
+class TeamHistory:
+    """Array kronologis satu tim: gol dicetak, gol kebobolan, dan Elo tim di laga itu."""
+    __slots__ = ('scored', 'conceded', 'elo')
+
+    def __init__(self, scored, conceded, elo):
+        self.scored = scored
+        self.conceded = conceded
+        self.elo = elo
+
+
+class TeamIndex:
+    """Peta tim -> TeamHistory. Semua query hanya menyentuh ekor array tim tersebut."""
+
+    def __init__(self, histories, has_elo):
+        self._histories = histories
+        self.has_elo = has_elo
+
+    @classmethod
+    def from_frame(cls, df):
+        order = chronological_order(df)
+        n = len(order)
+        has_elo = 'HomeTeamElo' in df.columns and 'AwayTeamElo' in df.columns
+
+        home = df['HomeTeam'].to_numpy(dtype=object)[order]
+        away = df['AwayTeam'].to_numpy(dtype=object)[order]
+        fthg = df['FTHG'].to_numpy(dtype=float)[order]
+        ftag = df['FTAG'].to_numpy(dtype=float)[order]
+        if has_elo:
+            home_elo = df['HomeTeamElo'].to_numpy(dtype=float)[order]
+            away_elo = df['AwayTeamElo'].to_numpy(dtype=float)[order]
+        else:
+            home_elo = away_elo = np.full(n, np.nan)
+
+        # Setiap laga muncul dua kali: sekali dari sisi tuan rumah, sekali dari sisi tamu
+        teams = np.concatenate([home, away])
+        scored = np.concatenate([fthg, ftag])
+        conceded = np.concatenate([ftag, fthg])
+        elo = np.concatenate([home_elo, away_elo])
+        position = np.concatenate([np.arange(n), np.arange(n)])
+
+        codes, names = pd.factorize(teams)
+        by_team = np.lexsort((position, codes))
+        codes = codes[by_team]
+        scored, conceded, elo = scored[by_team], conceded[by_team], elo[by_team]
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        starts = np.concatenate([[0], bounds])
+        ends = np.concatenate([bounds, [len(codes)]])
+
+        histories = {}
+        for start, end in zip(starts, ends):
+            if end > start and codes[start] >= 0:
+                histories[names[codes[start]]] = TeamHistory(
+                    scored[start:end], conceded[start:end], elo[start:end])
+        return cls(histories, has_elo)
+
+    def teams(self):
+        return sorted(self._histories)
+
+    def history(self, team):
+        """TeamHistory tim (array kronologis), atau None jika tim tidak ada."""
+        return self._histories.get(team)
+
+    def recent_stats(self, team, window=5):
+        history = self._histories.get(team)
+        if history is None:
+            return dict(EMPTY_RECENT_STATS)
+        return summarize_results(history.scored[-window:], history.conceded[-window:])
+
+    def last_elo(self, team):
+        """Elo tim pada laga terakhirnya, atau None jika tidak ada data Elo."""
+        history = self._histories.get(team)
+        if history is None or not self.has_elo:
+            return None
+        return history.elo[-1]
+
+
+def pair_key(team_a, team_b):
+    """Kunci pasangan tanpa urutan: (A, B) dan (B, A) menghasilkan kunci yang sama."""
+    return (team_a, team_b) if str(team_a) <= str(team_b) else (team_b, team_a)
+
+
+class PairIndex:
+    """
+    Peta pasangan tim -> pertemuan kronologis.
+
+    Untuk kunci (A, B) disimpan dua array: gol A dan gol B di setiap pertemuan,
+    apa pun status kandang/tandangnya. Bisa ditambah per laga lewat `append`.
+    """
+
+    def __init__(self, meetings=None):
+        self._meetings = meetings if meetings is not None else {}
+
+    @classmethod
+    def from_frame(cls, df):
+        order = chronological_order(df)
+        home = df['HomeTeam'].to_numpy(dtype=object)[order]
+        away = df['AwayTeam'].to_numpy(dtype=object)[order]
+        fthg = df['FTHG'].to_numpy(dtype=float)[order]
+        ftag = df['FTAG'].to_numpy(dtype=float)[order]
+
+        home_str, away_str = home.astype(str), away.astype(str)
+        swap = away_str < home_str
+        first = np.where(swap, away, home)
+        second = np.where(swap, home, away)
+        goals_first = np.where(swap, ftag, fthg)
+        goals_second = np.where(swap, fthg, ftag)
+
+        codes, _ = pd.factorize(np.where(swap, away_str, home_str).astype(object) + '\x00'
+                                + np.where(swap, home_str, away_str).astype(object))
+        by_pair = np.lexsort((np.arange(len(codes)), codes))
+        codes = codes[by_pair]
+        first, second = first[by_pair], second[by_pair]
+        goals_first, goals_second = goals_first[by_pair], goals_second[by_pair]
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        starts = np.concatenate([[0], bounds])
+        ends = np.concatenate([bounds, [len(codes)]])
+
+        meetings = {}
+        for start, end in zip(starts, ends):
+            if end > start:
+                meetings[(first[start], second[start])] = (
+                    array('d', goals_first[start:end]), array('d', goals_second[start:end]))
+        return cls(meetings)
+
+    def append(self, home, away, fthg, ftag, oldest=False):
+        """
+        Menambahkan satu laga. Laga dianggap paling baru, kecuali `oldest=True`
+        (misal tanggalnya NaT) sehingga ditaruh di awal.
+        """
+        key = pair_key(home, away)
+        goals = (fthg, ftag) if key[0] == home else (ftag, fthg)
+        first, second = self._meetings.setdefault(key, (array('d'), array('d')))
+        if oldest:
+            first.insert(0, goals[0])
+            second.insert(0, goals[1])
+        else:
+            first.append(goals[0])
+            second.append(goals[1])
+
+    def items(self):
+        """(kunci pasangan, gol tim pertama, gol tim kedua) untuk setiap pasangan, kronologis."""
+        return ((key, first, second) for key, (first, second) in self._meetings.items())
+
+    def h2h(self, home_team, away_team, window=5):
+        key = pair_key(home_team, away_team)
+        if key not in self._meetings:
+            return dict(EMPTY_H2H_STATS)
+        first, second = self._meetings[key]
+        first = np.array(first[-window:], dtype=float)
+        second = np.array(second[-window:], dtype=float)
+        if key[0] == home_team:
+            return summarize_h2h(first, second)
+        return summarize_h2h(second, first)
+
+
+def parse_match_dates(values):
+    """
+    Mengubah kolom Date menjadi datetime64. Format ISO (YYYY-MM-DD, dengan
+    atau tanpa jam) dibaca apa adanya; format lain seperti 15/08/2025 dari
+    CSV football-data dibaca hari-dulu. Nilai yang tidak terbaca menjadi NaT.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    text = values.astype(str).str.strip()
+    iso = text.str.match(r'^\d{4}-').to_numpy(dtype=bool)
+    parsed = np.full(len(text), np.datetime64('NaT'), dtype='datetime64[ns]')
+    if iso.any():
+        parsed[iso] = pd.to_datetime(text[iso], errors='coerce', format='ISO8601').to_numpy(dtype='datetime64[ns]')
+    if (~iso).any():
+        parsed[~iso] = pd.to_datetime(text[~iso], errors='coerce', dayfirst=True).to_numpy(dtype='datetime64[ns]')
+    return pd.Series(parsed, index=values.index, name=values.name)
+
+
+MATCH_NEW, MATCH_DUPLICATE, MATCH_CONFLICT, MATCH_INVALID = 'new', 'duplicate', 'conflict', 'invalid'
+
+
+def _match_keys(df):
+    dates = parse_match_dates(df['Date']).to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+    home = df['HomeTeam'].astype(str).str.strip().to_numpy(dtype=object)
+    away = df['AwayTeam'].astype(str).str.strip().to_numpy(dtype=object)
+    return pd.MultiIndex.from_arrays([dates, home, away]), ~np.isnat(dates)
+
+
+class MatchKeyIndex:
+    """
+    Peta kunci laga (tanggal tanpa jam, tuan rumah, tamu) -> skor akhir.
+
+    `classify` mencocokkan semua baris unggahan dengan satu hash join
+    (`MultiIndex.get_indexer`), bukan memindai dataset untuk setiap baris.
+    """
+
+    def __init__(self, keys, fthg, ftag):
+        self._keys = keys
+        self._fthg = fthg
+        self._ftag = ftag
+
+    @classmethod
+    def from_frame(cls, df):
+        keys, valid = _match_keys(df)
+        # Kunci ganda di dataset lama: yang dipakai adalah baris terakhir
+        keep = valid & ~keys.duplicated(keep='last')
+        return cls(keys[keep],
+                   df['FTHG'].to_numpy(dtype=float)[keep],
+                   df['FTAG'].to_numpy(dtype=float)[keep])
+
+    def __len__(self):
+        return len(self._keys)
+
+    def classify(self, df_new):
+        """
+        Status tiap baris `df_new`: MATCH_NEW, MATCH_DUPLICATE (kunci dan skor
+        sama, atau kunci sudah muncul lebih awal di unggahan yang sama),
+        MATCH_CONFLICT (kunci sama, skor berbeda) atau MATCH_INVALID (tanggal
+        tidak terbaca). Baris tanpa tanggal tidak punya kunci sehingga
+        duplikatnya tidak bisa dikenali; baris itu dilaporkan, bukan disimpan.
+        """
+        keys, valid = _match_keys(df_new)
+        status = np.full(len(keys), MATCH_NEW, dtype=object)
+        status[~valid] = MATCH_INVALID
+        pos = self._keys.get_indexer(keys) if len(self._keys) else np.full(len(keys), -1)
+        found = valid & (pos >= 0)
+        if found.any():
+            idx = pos[found]
+            same = ((df_new['FTHG'].to_numpy(dtype=float)[found] == self._fthg[idx])
+                    & (df_new['FTAG'].to_numpy(dtype=float)[found] == self._ftag[idx]))
+            status[np.flatnonzero(found)] = np.where(same, MATCH_DUPLICATE, MATCH_CONFLICT)
+        repeated = valid & keys.duplicated(keep='first') & (status == MATCH_NEW)
+        status[repeated] = MATCH_DUPLICATE
+        return status
+
+
+def summarize_match_status(status):
+    """Jumlah baris per status; `invalid_date` = baris yang dilewati karena tanggalnya tidak terbaca."""
+    return {
+        'total': int(len(status)),
+        'new': int((status == MATCH_NEW).sum()),
+        'duplicate': int((status == MATCH_DUPLICATE).sum()),
+        'conflict': int((status == MATCH_CONFLICT).sum()),
+        'invalid_date': int((status == MATCH_INVALID).sum()),
+    }
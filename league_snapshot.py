@@ -0,0 +1,373 @@
+"""
+Snapshot keadaan terkini satu liga untuk /api/features dan /api/team_stats.
+
+Yang dibutuhkan kedua endpoint hanyalah keadaan setiap tim saat ini: Elo
+terakhir, N laga terakhir (gol dicetak/kebobolan) dan N pertemuan terakhir
+setiap pasangan tim. Snapshot menyimpan tepat itu, sehingga menjawab request
+cukup lookup dict tanpa membaca dan mengindeks seluruh history.
+
+Snapshot disimpan di samping dataset sebagai `dataset/<nama>.snapshot.json`
+bersama versi dataset sumbernya (`dataset_version`). Setelah laga baru
+disimpan, snapshot diperbarui secara inkremental (hanya laga baru yang
+diputar di atas snapshot lama) selama semua laga baru bertanggal sama atau
+setelah laga terakhir. Jika tidak (misal mengunggah laga lama) atau versi
+dataset tidak cocok (dataset diubah di luar app), snapshot dibangun ulang
+dari dataset saat pertama dipakai.
+
+`LeagueSnapshot` punya antarmuka yang sama dengan TeamIndex/PairIndex
+(`has_elo`, `last_elo`, `recent_stats`, `h2h`), jadi bisa langsung dipakai
+`compute_features_from_dataset`.
+
+    python league_snapshot.py rebuild [path.csv ...]   # bangun ulang snapshot dari dataset
+    python league_snapshot.py check [path.csv ...]     # bandingkan snapshot dengan compute_features_from_dataset
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+from itertools import permutations
+
+from lazy_imports import lazy_module
+from league_index import (EMPTY_RECENT_STATS, PairIndex, TeamIndex, chronological_order, pair_key,
+                          parse_match_dates, summarize_h2h, summarize_results)
+from storage import dataset_version, list_datasets, read_dataset
+
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_SUFFIX = '.snapshot.json'
+
+
+def snapshot_path(path):
+    """'dataset/dataset_bundesliga_1.csv' -> 'dataset/dataset_bundesliga_1.snapshot.json'."""
+    return os.path.splitext(path)[0] + SNAPSHOT_SUFFIX
+
+
+def _float(value):
+    return float(value) if value is not None else float('nan')
+
+
+class LeagueSnapshot:
+    """
+    `teams`: tim -> {'elo': Elo di laga terakhir, 'scored'/'conceded': gol N laga terakhir (kronologis)}.
+    `pairs`: pasangan (A, B) menurut `pair_key` -> (gol A, gol B) di N pertemuan terakhir.
+    """
+
+    def __init__(self, window=5, has_elo=False, teams=None, pairs=None, rows=0, last_date=None, source=None):
+        self.window = window
+        self.has_elo = has_elo
+        self.teams = teams if teams is not None else {}
+        self.pairs = pairs if pairs is not None else {}
+        self.rows = rows
+        self.last_date = last_date
+        self.source = source
+
+    @classmethod
+    def from_frame(cls, df, window=5, source=None, team_index=None, pair_index=None):
+        """Snapshot dari seluruh dataset; indeks yang sudah di-cache bisa dikirim agar tidak dibangun ulang."""
+        team_index = team_index if team_index is not None else TeamIndex.from_frame(df)
+        pair_index = pair_index if pair_index is not None else PairIndex.from_frame(df)
+        teams = {}
+        for team in team_index.teams():
+            history = team_index.history(team)
+            teams[team] = {
+                'elo': float(history.elo[-1]),
+                'scored': [float(v) for v in history.scored[-window:]],
+                'conceded': [float(v) for v in history.conceded[-window:]],
+            }
+        pairs = {}
+        for key, first, second in pair_index.items():
+            if isinstance(key[0], str) and isinstance(key[1], str):
+                pairs[key] = (list(first[-window:]), list(second[-window:]))
+        last_date = None
+        if 'Date' in df.columns and len(df):
+            latest = pd.Series(df['Date']).max()
+            last_date = None if pd.isna(latest) else pd.Timestamp(latest).isoformat()
+        return cls(window, team_index.has_elo, teams, pairs, int(len(df)), last_date, source)
+
+    # --- Antarmuka yang sama dengan TeamIndex / PairIndex ---
+    def recent_stats(self, team, window=5):
+        state = self.teams.get(team)
+        if state is None:
+            return dict(EMPTY_RECENT_STATS)
+        return summarize_results(np.array(state['scored'][-window:], dtype=float),
+                                 np.array(state['conceded'][-window:], dtype=float))
+
+    def last_elo(self, team):
+        """Elo tim pada laga terakhirnya, atau None jika tidak ada data Elo."""
+        state = self.teams.get(team)
+        if state is None or not self.has_elo:
+            return None
+        return state['elo']
+
+    def h2h(self, home_team, away_team, window=5):
+        key = pair_key(home_team, away_team)
+        if key not in self.pairs:
+            return summarize_h2h(np.empty(0), np.empty(0))
+        first, second = self.pairs[key]
+        first = np.array(first[-window:], dtype=float)
+        second = np.array(second[-window:], dtype=float)
+        if key[0] == home_team:
+            return summarize_h2h(first, second)
+        return summarize_h2h(second, first)
+
+    # --- Pembaruan inkremental ---
+    def can_apply(self, df_new):
+        """True jika semua laga baru bertanggal valid dan tidak lebih lama dari laga terakhir snapshot."""
+        if df_new.empty:
+            return True
+        if 'Date' not in df_new.columns:
+            return False
+        dates = parse_match_dates(df_new['Date'])
+        if dates.isna().any():
+            return False
+        return self.last_date is None or dates.min() >= pd.Timestamp(self.last_date)
+
+    def apply(self, df_new):
+        """
+        Memutar laga baru (sudah lolos `can_apply`) di atas snapshot, urut
+        tanggal; laga bertanggal sama diproses sesuai urutan baris, sama
+        seperti urutan baris hasil append di dataset.
+        """
+        if df_new.empty:
+            return self
+        df_new = df_new.assign(Date=parse_match_dates(df_new['Date']))
+        order = chronological_order(df_new)
+        home = df_new['HomeTeam'].to_numpy(dtype=object)[order]
+        away = df_new['AwayTeam'].to_numpy(dtype=object)[order]
+        numeric = {}
+        for col in ('FTHG', 'FTAG', 'HomeTeamElo', 'AwayTeamElo'):
+            values = df_new[col] if col in df_new.columns else pd.Series(np.nan, index=df_new.index)
+            numeric[col] = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)[order]
+        window = self.window
+        for i in range(len(order)):
+            fthg, ftag = numeric['FTHG'][i], numeric['FTAG'][i]
+            for team, scored, conceded, elo in ((home[i], fthg, ftag, numeric['HomeTeamElo'][i]),
+                                                (away[i], ftag, fthg, numeric['AwayTeamElo'][i])):
+                if pd.isna(team):
+                    continue
+                state = self.teams.setdefault(team, {'elo': float('nan'), 'scored': [], 'conceded': []})
+                state['elo'] = float(elo)
+                state['scored'] = (state['scored'] + [float(scored)])[-window:]
+                state['conceded'] = (state['conceded'] + [float(conceded)])[-window:]
+            if isinstance(home[i], str) and isinstance(away[i], str):
+                key = pair_key(home[i], away[i])
+                goals = (fthg, ftag) if key[0] == home[i] else (ftag, fthg)
+                first, second = self.pairs.get(key, ([], []))
+                self.pairs[key] = ((first + [float(goals[0])])[-window:], (second + [float(goals[1])])[-window:])
+        self.rows += len(df_new)
+        latest = pd.Timestamp(df_new['Date'].max()).isoformat()
+        self.last_date = latest if self.last_date is None else max(self.last_date, latest)
+        return self
+
+    # --- Serialisasi ---
+    def to_dict(self):
+        return {
+            'format': SNAPSHOT_FORMAT_VERSION,
+            'source': list(self.source) if self.source is not None else None,
+            'window': self.window,
+            'has_elo': self.has_elo,
+            'rows': self.rows,
+            'last_date': self.last_date,
+            'teams': self.teams,
+            'pairs': [[a, b, first, second] for (a, b), (first, second) in self.pairs.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        teams = {team: {'elo': _float(state['elo']), 'scored': list(state['scored']),
+                        'conceded': list(state['conceded'])}
+                 for team, state in data['teams'].items()}
+        pairs = {(a, b): (list(first), list(second)) for a, b, first, second in data['pairs']}
+        source = tuple(data['source']) if data.get('source') is not None else None
+        return cls(data['window'], data['has_elo'], teams, pairs, data['rows'], data['last_date'], source)
+
+    def copy(self):
+        return LeagueSnapshot.from_dict(self.to_dict())
+
+
+def read_snapshot(path):
+    """Snapshot tersimpan untuk dataset `path`, atau None jika tidak ada/rusak/format lama."""
+    try:
+        with open(snapshot_path(path), encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('format') != SNAPSHOT_FORMAT_VERSION:
+            return None
+        return LeagueSnapshot.from_dict(data)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_snapshot(path, snapshot):
+    """Menulis snapshot secara atomik (file sementara lalu os.replace)."""
+    target = snapshot_path(path)
+    tmp_path = f'{target}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, target)
+
+
+class SnapshotStore:
+    """
+    Snapshot per dataset di memori, dicek terhadap versi dataset setiap
+    `get` (satu stat). `frame_loader(path)` membaca dataset saat snapshot
+    harus dibangun ulang; app.py memakai cache dataset.
+    """
+
+    def __init__(self, frame_loader=read_dataset, window=5, version_func=dataset_version):
+        self.frame_loader = frame_loader
+        self.window = window
+        self.version_func = version_func
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.builds = 0
+        self.applies = 0
+
+    def get(self, path):
+        """Snapshot untuk versi dataset saat ini: dari memori, dari file snapshot, atau dibangun ulang."""
+        key = os.path.normpath(path)
+        version = tuple(self.version_func(path))
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None and snapshot.source == version:
+                self.hits += 1
+                return snapshot
+        snapshot = read_snapshot(path)
+        if snapshot is not None and snapshot.source == version and snapshot.window == self.window:
+            with self._lock:
+                self.loads += 1
+                self._snapshots[key] = snapshot
+            return snapshot
+
+        snapshot = LeagueSnapshot.from_frame(self.frame_loader(path), self.window, source=version)
+        with self._lock:
+            self.builds += 1
+        # Dataset berubah selama dibaca: snapshot dipakai untuk request ini saja
+        if tuple(self.version_func(path)) != version:
+            return snapshot
+        try:
+            write_snapshot(path, snapshot)
+        except OSError as e:
+            print(f"Gagal menulis snapshot {snapshot_path(path)}: {e}")
+        with self._lock:
+            self._snapshots[key] = snapshot
+        return snapshot
+
+    def apply(self, path, previous, df_new):
+        """
+        Dipanggil di dalam `dataset_lock` setelah `append_dataset`: `previous`
+        adalah snapshot sebelum append, `df_new` baris yang baru disimpan.
+        Jika laga baru tidak bisa diputar di atas snapshot lama, snapshot
+        dibuang dan dibangun ulang saat `get` berikutnya.
+        """
+        key = os.path.normpath(path)
+        if not previous.can_apply(df_new):
+            self.invalidate(path)
+            return None
+        snapshot = previous.copy().apply(df_new)
+        snapshot.source = tuple(self.version_func(path))
+        write_snapshot(path, snapshot)
+        with self._lock:
+            self.applies += 1
+            self._snapshots[key] = snapshot
+        return snapshot
+
+    def invalidate(self, path):
+        with self._lock:
+            self._snapshots.pop(os.path.normpath(path), None)
+        try:
+            os.remove(snapshot_path(path))
+        except OSError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._snapshots), 'hits': self.hits, 'loads': self.loads,
+                    'builds': self.builds, 'applies': self.applies}
+
+
+# ==========================================================
+# PERINTAH: rebuild / check
+# ==========================================================
+def _same(a, b):
+    if isinstance(a, str) or isinstance(b, str) or a is None or b is None:
+        return a == b
+    return bool(np.isclose(float(a), float(b), rtol=1e-9, atol=1e-9, equal_nan=True))
+
+
+def check(path, compute_features, columns):
+    """
+    Membandingkan snapshot tersimpan dengan `compute_features` (fungsi
+    compute_features_from_dataset di app.py) untuk setiap pasangan tim, serta
+    statistik per tim. Mengembalikan list selisih (kosong jika konsisten).
+    """
+    df = read_dataset(path)
+    version = tuple(dataset_version(path))
+    snapshot = read_snapshot(path)
+    if snapshot is None or snapshot.source != version:
+        state = 'tidak ada' if snapshot is None else 'usang (dibangun ulang saat dipakai)'
+        print(f"{path}: snapshot {state}; dibandingkan dengan snapshot baru dari dataset")
+        snapshot = LeagueSnapshot.from_frame(df, source=version)
+    team_index, pair_index = TeamIndex.from_frame(df), PairIndex.from_frame(df)
+    teams = sorted(set(team_index.teams()) | set(snapshot.teams))
+    problems = []
+    if snapshot.rows != len(df):
+        problems.append(f"jumlah baris: snapshot {snapshot.rows}, dataset {len(df)}")
+    for team in teams:
+        expected = {**team_index.recent_stats(team), 'last_elo': team_index.last_elo(team)}
+        got = {**snapshot.recent_stats(team), 'last_elo': snapshot.last_elo(team)}
+        for name in expected:
+            if not _same(expected[name], got[name]):
+                problems.append(f"{team} {name}: dataset {expected[name]}, snapshot {got[name]}")
+    for home, away in permutations(teams, 2):
+        expected = compute_features(df, home, away, team_index=team_index, pair_index=pair_index)
+        got = compute_features(df, home, away, team_index=snapshot, pair_index=snapshot)
+        for name in columns:
+            if not _same(expected[name], got[name]):
+                problems.append(f"{home} vs {away} {name}: dataset {expected[name]}, snapshot {got[name]}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Snapshot keadaan terkini liga (Elo, form, H2H).')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_rebuild = sub.add_parser('rebuild', help='bangun ulang snapshot dari dataset')
+    p_rebuild.add_argument('paths', nargs='*')
+    p_check = sub.add_parser('check', help='bandingkan snapshot dengan compute_features_from_dataset')
+    p_check.add_argument('paths', nargs='*')
+    args = parser.parse_args()
+    paths = args.paths or list_datasets()
+
+    if args.command == 'rebuild':
+        for path in paths:
+            try:
+                snapshot = LeagueSnapshot.from_frame(read_dataset(path), source=tuple(dataset_version(path)))
+                write_snapshot(path, snapshot)
+                print(f"✅ {path} -> {snapshot_path(path)} ({len(snapshot.teams)} tim, {len(snapshot.pairs)} pasangan)")
+            except Exception as e:
+                print(f"🚨 ERROR {path}: {e}")
+        return
+
+    # compute_features_from_dataset ada di app.py; thread warmup tidak diperlukan untuk pengecekan
+    os.environ.setdefault('WARMUP', '0')
+    from app import FEATURE_COLUMNS, compute_features_from_dataset
+
+    failed = False
+    for path in paths:
+        problems = check(path, compute_features_from_dataset, FEATURE_COLUMNS)
+        if problems:
+            failed = True
+            print(f"🚨 {path}: {len(problems)} selisih")
+            for problem in problems[:20]:
+                print('   ', problem)
+        else:
+            print(f"✅ {path}: snapshot konsisten")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
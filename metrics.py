@@ -0,0 +1,248 @@
+"""
+Metrik ringan (format teks Prometheus) dan timer per tahap request.
+
+Counter dan histogram hanya menambah angka di memori saat dipanggil; teks
+Prometheus baru disusun saat `/metrics` di-scrape, termasuk gauge berbasis
+callback (statistik cache, model yang dimuat). Tanpa scrape, biayanya
+hanya beberapa penjumlahan per tahap.
+
+Setiap request (atau job latar belakang) punya `Trace` di thread-nya;
+`stage(nama, liga)` mencatat durasi tahap ke histogram
+`app_stage_duration_seconds{route,stage,league}` sekaligus ke trace,
+sehingga request lambat bisa dilog lengkap dengan rincian tahapnya.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Batas bucket histogram (detik): dari 0.5 ms untuk tahap cepat sampai 30 detik untuk unggahan besar
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [jumlah per bucket (non-kumulatif) + bucket +Inf, total, count]
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                le = _format_labels(self.labelnames, labels, [f'le="{_format_value(bound)}"'])
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+            lines.append(f'{self.name}_count{label_text} {count}')
+        return lines
+
+
+class GaugeCallback:
+    """
+    Metrik yang nilainya diambil dari `func()` saat scrape: list (dict label, nilai).
+    `kind='counter'` untuk angka kumulatif milik objek lain (misal hits cache).
+    """
+
+    def __init__(self, name, documentation, func, kind='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+        self.kind = kind
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for labels, value in self.func():
+            if value is None:
+                continue
+            lines.append(f'{self.name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, func, kind='gauge'):
+        return self._add(GaugeCallback(name, documentation, func, kind))
+
+    def render(self):
+        """Teks exposition format Prometheus 0.0.4."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:  # satu gauge yang gagal tidak boleh menggagalkan seluruh scrape
+                lines.append(f'# {metric.name} gagal: {_escape(e)}')
+        return '\n'.join(lines) + '\n'
+
+
+class LabelAllowlist:
+    """
+    Membatasi nilai label (misal nama liga dari input user) ke daftar yang
+    dikenal agar jumlah seri tidak meledak; nilai lain menjadi 'other'.
+    Daftar dimuat ulang paling sering tiap `refresh_seconds` saat ada nilai asing.
+    """
+
+    def __init__(self, loader, refresh_seconds=60):
+        self.loader = loader
+        self.refresh_seconds = refresh_seconds
+        self._values = frozenset()
+        self._loaded_at = None
+
+    def __call__(self, value):
+        if value is None or value == '':
+            return ''
+        if value in self._values:
+            return value
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at >= self.refresh_seconds:
+            self._loaded_at = now
+            try:
+                self._values = frozenset(self.loader())
+            except Exception:
+                pass
+        return value if value in self._values else 'other'
+
+
+class Trace:
+    """Tahap-tahap satu request/job: list (stage, liga, detik)."""
+
+    __slots__ = ('route', 'start', 'stages', 'league')
+
+    def __init__(self, route):
+        self.route = route
+        self.start = time.perf_counter()
+        self.stages = []
+        self.league = ''
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+class StageMetrics:
+    """
+    Histogram durasi per route/tahap/liga dan trace per thread.
+    `enabled=False` membuat `stage` dan `trace` tidak melakukan apa pun.
+    """
+
+    def __init__(self, registry, league_label=None, enabled=True):
+        self.enabled = enabled
+        self.league_label = league_label or (lambda value: value or '')
+        self.histogram = registry.histogram(
+            'app_stage_duration_seconds', 'Durasi tahap pemrosesan per route, tahap dan liga.',
+            ('route', 'stage', 'league'))
+        self._local = threading.local()
+
+    def current(self):
+        return getattr(self._local, 'trace', None)
+
+    def begin(self, route):
+        trace = Trace(route) if self.enabled else None
+        self._local.trace = trace
+        return trace
+
+    def end(self):
+        trace = self.current()
+        self._local.trace = None
+        return trace
+
+    @contextmanager
+    def trace(self, route):
+        """Trace untuk pekerjaan di luar request (misal job latar belakang)."""
+        previous = self.current()
+        trace = self.begin(route)
+        try:
+            yield trace
+        finally:
+            self._local.trace = previous
+
+    @contextmanager
+    def stage(self, name, league=None):
+        """Mencatat durasi blok `with`. Tanpa `league`, dipakai liga terakhir di trace ini."""
+        if not self.enabled:
+            yield
+            return
+        trace = self.current()
+        if league is not None:
+            league = self.league_label(league)
+            if trace is not None and league:
+                trace.league = league
+        elif trace is not None:
+            league = trace.league
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.histogram.observe(elapsed, trace.route if trace else 'background', name, league or '')
+            if trace is not None:
+                trace.stages.append((name, league or '', elapsed))
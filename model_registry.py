@@ -0,0 +1,275 @@
+"""
+Registry model per liga.
+
+Setiap liga punya satu bundle artefak (3 model, scaler, 3 label encoder) di
+`models/<liga>/`. Bundle dimuat sekali lalu disimpan di memori; versi bundle
+diambil dari mtime/ukuran file artefak sehingga hasil `train.py` yang baru
+otomatis dimuat ulang. Bundle baru dimuat penuh dulu baru menggantikan yang
+lama, jadi request yang sedang berjalan tidak pernah melihat bundle campuran.
+
+Jika `models/<liga>/compact/` ada (lihat compact_model.py), random forest dan
+scaler dimuat dari array mmap tersebut, bukan dari .pkl.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from compact_model import COMPACT_DIR, COMPACT_MANIFEST, COMPACT_SOURCES, ensure_compact, load_compact
+from lazy_imports import lazy_module
+
+# joblib (dan scikit-learn lewat unpickle) baru dimuat saat bundle pertama dimuat
+joblib = lazy_module('joblib')
+np = lazy_module('numpy')
+
+MODEL_FILES = {
+    'model_hda': 'model_hda.pkl',
+    'model_ou25': 'model_ou25.pkl',
+    'model_btts': 'model_btts.pkl',
+    'scaler': 'scaler.pkl',
+    'le_ftr': 'le_ftr.pkl',
+    'le_ou': 'le_ou.pkl',
+    'le_btts': 'le_btts.pkl',
+}
+
+# (kunci hasil, model, label encoder) untuk setiap target prediksi
+PREDICTION_TARGETS = [
+    ('HDA', 'model_hda', 'le_ftr'),
+    ('OU25', 'model_ou25', 'le_ou'),
+    ('BTTS', 'model_btts', 'le_btts'),
+]
+
+
+def league_folder_name(league_display):
+    """'La Liga' -> 'la_liga' (sama dengan penamaan folder di train.py)."""
+    return league_display.lower().replace(' ', '_')
+
+
+def artifact_version(league_dir):
+    """Versi bundle: tuple (nama file, mtime_ns, ukuran) untuk semua artefak (+ compact.json jika ada)."""
+    version = []
+    for fname in MODEL_FILES.values():
+        st = os.stat(os.path.join(league_dir, fname))
+        version.append((fname, st.st_mtime_ns, st.st_size))
+    try:
+        st = os.stat(os.path.join(league_dir, COMPACT_DIR, COMPACT_MANIFEST))
+        version.append((COMPACT_MANIFEST, st.st_mtime_ns, st.st_size))
+    except OSError:
+        pass
+    return tuple(version)
+
+
+class ModelBundle:
+    """Artefak satu liga yang sudah dimuat. Akses: bundle['model_hda']."""
+
+    def __init__(self, league, league_dir, version, artifacts, load_seconds, compact=()):
+        self.league = league
+        self.league_dir = league_dir
+        self.version = version
+        self.artifacts = artifacts
+        self.load_seconds = load_seconds
+        self.compact = sorted(compact)
+        # Artefak ringkas berupa halaman mmap yang dibagi antar worker, jadi tidak dihitung ke budget memori
+        compact_files = {COMPACT_SOURCES[name] for name in self.compact}
+        self.size_bytes = sum(size for fname, _, size in version if fname not in compact_files)
+        self.loaded_at = time.time()
+        self.checked_at = time.monotonic()
+
+    def __getitem__(self, name):
+        return self.artifacts[name]
+
+    def predict(self, features):
+        """
+        Prediksi HDA/OU25/BTTS untuk banyak laga sekaligus. `features` adalah
+        matriks/DataFrame dengan satu baris per laga (kolom sesuai training);
+        scaler dan setiap model hanya dipanggil sekali untuk semua baris.
+        Mengembalikan list {'HDA':{'label','probs'}, 'OU25':..., 'BTTS':...}.
+        """
+        X_scaled = self['scaler'].transform(features)
+        outputs = [(key, self[encoder].classes_, self[model].predict_proba(X_scaled))
+                   for key, model, encoder in PREDICTION_TARGETS]
+        results = []
+        for i in range(X_scaled.shape[0]):
+            result = {}
+            for key, classes, probs in outputs:
+                row = probs[i]
+                result[key] = {'label': classes[np.argmax(row)],
+                               'probs': {classes[j]: float(row[j]) for j in range(len(row))}}
+            results.append(result)
+        return results
+
+    def predict_proba(self, features, target='HDA'):
+        """(kelas, matriks probabilitas baris x kelas) satu target untuk banyak laga sekaligus."""
+        _, model, encoder = next(t for t in PREDICTION_TARGETS if t[0] == target)
+        X_scaled = self['scaler'].transform(features)
+        return list(self[encoder].classes_), self[model].predict_proba(X_scaled)
+
+    def info(self):
+        return {
+            'league_dir': self.league_dir,
+            'load_seconds': round(self.load_seconds, 4),
+            'compact': self.compact,
+            'size_bytes': self.size_bytes,
+            'loaded_at': self.loaded_at,
+        }
+
+
+class ModelRegistry:
+    """
+    Cache bundle model dengan batas jumlah entri dan/atau total ukuran (byte).
+    Bundle yang paling lama tidak dipakai dibuang lebih dulu (LRU).
+
+    `check_interval` (detik) membatasi seberapa sering file artefak dicek
+    ulang untuk mendeteksi hasil training baru. `compact=False` selalu
+    memuat .pkl walaupun bentuk ringkasnya tersedia.
+
+    `resolver(league)` mengembalikan (kunci, folder model) untuk sebuah nama
+    liga; app.py memakai katalog liga agar alias seperti 'bundesliga' atau
+    'BUNDESLIGA' menuju bundle yang sama dengan datasetnya. Tanpa resolver,
+    folder diturunkan dari nama tampilan lewat `league_folder_name`.
+    """
+
+    def __init__(self, model_dir, max_entries=None, max_bytes=None,
+                 check_interval=2.0, loader=None, compact=True, resolver=None):
+        self.model_dir = model_dir
+        self.resolver = resolver
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+        self.loader = loader or (lambda path: joblib.load(path))
+        self.compact = compact
+        self._bundles = OrderedDict()
+        self._lock = threading.Lock()
+        self._league_locks = {}
+        self.hits = 0
+        self.loads = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def resolve(self, league):
+        """(kunci cache, folder model) untuk nama liga."""
+        if self.resolver is not None:
+            return self.resolver(league)
+        key = league_folder_name(league)
+        return key, os.path.join(self.model_dir, key)
+
+    def league_dir(self, league):
+        return self.resolve(league)[1]
+
+    def _league_lock(self, key):
+        with self._lock:
+            return self._league_locks.setdefault(key, threading.Lock())
+
+    def _load(self, league, league_dir):
+        # Cek versi sebelum dan sesudah memuat; jika train.py sedang menulis
+        # artefak di tengah proses, muat ulang sampai versinya stabil.
+        for _ in range(3):
+            version = artifact_version(league_dir)
+            start = time.perf_counter()
+            compact = load_compact(league_dir) if self.compact else {}
+            artifacts = {name: compact[name] if name in compact else self.loader(os.path.join(league_dir, fname))
+                         for name, fname in MODEL_FILES.items()}
+            elapsed = time.perf_counter() - start
+            if artifact_version(league_dir) == version:
+                break
+        if self.compact and any(name not in compact for name in COMPACT_SOURCES):
+            compact, version = self._build_compact(league_dir, version, artifacts, compact)
+        return ModelBundle(league, league_dir, version, artifacts, elapsed, compact=compact)
+
+    def _build_compact(self, league_dir, version, artifacts, compact):
+        # Folder compact/ tidak ikut di git: buat dari .pkl yang baru dimuat, lalu pakai versi mmap-nya
+        missing = {name: artifacts[name] for name in COMPACT_SOURCES if name not in compact}
+        try:
+            ensure_compact(league_dir, missing, expected={fname: (mtime, size) for fname, mtime, size in version})
+            new_compact = load_compact(league_dir)
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Bentuk ringkas {league_dir} tidak bisa dibuat, memakai .pkl: {e}")
+            return compact, version
+        new_version = artifact_version(league_dir)
+        pkl_part = lambda v: [item for item in v if item[0] != COMPACT_MANIFEST]
+        if pkl_part(new_version) != pkl_part(version):
+            # train.py menulis artefak baru di tengah jalan; get() berikutnya memuat ulang
+            return compact, version
+        # Bisa juga diekspor worker lain; yang tidak terekspor tetap memakai objek dari .pkl
+        updated = {name: new_compact[name] for name in missing if name in new_compact}
+        artifacts.update(updated)
+        return {**compact, **updated}, new_version
+
+    def get(self, league):
+        key, league_dir = self.resolve(league)
+        with self._lock:
+            bundle = self._bundles.get(key)
+            if bundle is not None and time.monotonic() - bundle.checked_at < self.check_interval:
+                self._bundles.move_to_end(key)
+                self.hits += 1
+                return bundle
+
+        with self._league_lock(key):
+            # Request lain mungkin sudah memuat bundle ini selagi kita menunggu lock
+            with self._lock:
+                bundle = self._bundles.get(key)
+            if bundle is not None:
+                if artifact_version(league_dir) == bundle.version:
+                    bundle.checked_at = time.monotonic()
+                    with self._lock:
+                        if key in self._bundles:
+                            self._bundles.move_to_end(key)
+                        self.hits += 1
+                    return bundle
+                with self._lock:
+                    self.reloads += 1
+
+            new_bundle = self._load(league, league_dir)
+            with self._lock:
+                self._bundles[key] = new_bundle
+                self._bundles.move_to_end(key)
+                self.loads += 1
+                self._evict(keep=key)
+            return new_bundle
+
+    def _evict(self, keep):
+        def over_budget():
+            if self.max_entries and len(self._bundles) > self.max_entries:
+                return True
+            if self.max_bytes:
+                return sum(b.size_bytes for b in self._bundles.values()) > self.max_bytes
+            return False
+
+        while len(self._bundles) > 1 and over_budget():
+            oldest = next(iter(self._bundles))
+            if oldest == keep:
+                break
+            self._bundles.pop(oldest)
+            self.evictions += 1
+
+    def preload(self, leagues):
+        """Memuat bundle untuk semua liga sekarang. Mengembalikan {liga: error} untuk yang gagal."""
+        errors = {}
+        for league in leagues:
+            try:
+                self.get(league)
+            except Exception as e:
+                errors[league] = str(e)
+        return errors
+
+    def invalidate(self, league=None):
+        with self._lock:
+            if league is None:
+                self._bundles.clear()
+            else:
+                self._bundles.pop(self.resolve(league)[0], None)
+
+    def stats(self):
+        with self._lock:
+            bundles = {key: b.info() for key, b in self._bundles.items()}
+            return {
+                'entries': len(self._bundles),
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'total_bytes': sum(b['size_bytes'] for b in bundles.values()),
+                'hits': self.hits,
+                'loads': self.loads,
+                'reloads': self.reloads,
+                'evictions': self.evictions,
+                'bundles': bundles,
+            }
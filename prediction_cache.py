@@ -0,0 +1,123 @@
+"""
+Cache hasil prediksi per proses (TTL + LRU).
+
+Kunci cache: (liga, versi bundle model, vektor fitur kanonik). Versi bundle
+berasal dari `ModelRegistry` (mtime/ukuran artefak), jadi hasil training baru
+otomatis menghasilkan kunci baru; entri versi lama untuk liga tersebut
+dibuang saat versi baru pertama kali disimpan.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+def canonical_features(values):
+    """
+    Vektor fitur kanonik (tuple float) untuk kunci cache, atau None jika ada
+    nilai yang bukan angka. -0.0 disamakan dengan 0.0 dan nilai dibulatkan
+    agar selisih representasi float yang tidak berarti tidak memecah kunci.
+    """
+    try:
+        return tuple(round(float(v), 9) + 0.0 for v in values)
+    except (TypeError, ValueError):
+        return None
+
+
+class _Entry:
+    __slots__ = ('value', 'expires_at', 'compute_seconds')
+
+    def __init__(self, value, expires_at, compute_seconds):
+        self.value = value
+        self.expires_at = expires_at
+        self.compute_seconds = compute_seconds
+
+
+class PredictionCache:
+    """
+    Cache LRU dengan masa berlaku `ttl` detik dan maksimum `max_entries` entri.
+    Nilai yang disimpan dianggap read-only oleh pemanggil.
+    """
+
+    def __init__(self, max_entries=2048, ttl=3600, clock=time.monotonic):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, league, version, features):
+        if not self.enabled or features is None:
+            return None
+        key = (league, version, features)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if self.ttl and entry.expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry.compute_seconds
+            return entry.value
+
+    def put(self, league, version, features, value, compute_seconds=0.0):
+        if not self.enabled or features is None:
+            return
+        with self._lock:
+            if self._versions.get(league, version) != version:
+                self._drop_league(league)
+            self._versions[league] = version
+            key = (league, version, features)
+            self._entries[key] = _Entry(value, self.clock() + (self.ttl or 0), compute_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _drop_league(self, league):
+        stale = [key for key in self._entries if key[0] == league]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+
+    def invalidate(self, league=None):
+        """Membuang entri `league` (atau seluruh cache jika None)."""
+        with self._lock:
+            if league is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._versions.clear()
+            else:
+                self._drop_league(league)
+                self._versions.pop(league, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits / total) if total else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'saved_seconds': round(self.saved_seconds, 6),
+            }
@@ -0,0 +1,177 @@
+"""
+Proyeksi klasemen akhir musim dengan simulasi Monte Carlo.
+
+Klasemen sementara dihitung dari laga musim berjalan (musim dimulai setiap
+`start_month`, default Juli), lalu setiap fixture yang tersisa diundi
+menurut probabilitas H/D/A dari model. Semua simulasi dijalankan sebagai
+operasi NumPy atas matriks (simulasi x fixture): satu matriks bilangan acak
+per potongan, poin per tim lewat perkalian matriks one-hot, dan posisi lewat
+argsort per baris.
+
+Simulasi dibagi menjadi potongan `chunk_size`; setiap potongan punya
+generator sendiri dari `SeedSequence(seed).spawn`, sehingga hasil untuk seed
+yang sama identik berapa pun jumlah worker. Potongan bisa dijalankan di
+beberapa thread sekaligus karena NumPy melepas GIL saat membangkitkan
+bilangan acak, mengalikan matriks dan mengurutkan.
+
+Yang disimulasikan hanya hasil H/D/A, bukan skor: jika poin sama, urutan
+ditentukan selisih gol lalu jumlah gol klasemen sementara, lalu nama tim.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+
+def season_start(last_date, start_month=7):
+    """Tanggal mulai musim yang memuat `last_date`: 1 `start_month` terakhir sebelum/pada tanggal itu."""
+    last_date = pd.Timestamp(last_date)
+    year = last_date.year if last_date.month >= start_month else last_date.year - 1
+    return pd.Timestamp(year=year, month=start_month, day=1)
+
+
+def current_season(df, start_month=7):
+    """(tanggal mulai musim, baris laga musim berjalan). Dataset kosong/tanpa tanggal -> (None, frame kosong)."""
+    dates = pd.Series(df['Date']) if 'Date' in df.columns else pd.Series(dtype='datetime64[ns]')
+    latest = dates.max()
+    if pd.isna(latest):
+        return None, df.iloc[0:0]
+    start = season_start(latest, start_month)
+    return start, df[(dates >= start).to_numpy()]
+
+
+def season_table(df_season):
+    """Klasemen sementara: {tim: {'played','won','drawn','lost','goals_for','goals_against','points'}}."""
+    table = {}
+    home = df_season['HomeTeam'].to_numpy(dtype=object)
+    away = df_season['AwayTeam'].to_numpy(dtype=object)
+    fthg = pd.to_numeric(df_season['FTHG'], errors='coerce').to_numpy(dtype=float)
+    ftag = pd.to_numeric(df_season['FTAG'], errors='coerce').to_numpy(dtype=float)
+    for i in range(len(home)):
+        if pd.isna(home[i]) or pd.isna(away[i]) or np.isnan(fthg[i]) or np.isnan(ftag[i]):
+            continue
+        for team, scored, conceded in ((home[i], fthg[i], ftag[i]), (away[i], ftag[i], fthg[i])):
+            row = table.setdefault(team, {'played': 0, 'won': 0, 'drawn': 0, 'lost': 0,
+                                          'goals_for': 0, 'goals_against': 0, 'points': 0})
+            row['played'] += 1
+            row['goals_for'] += int(scored)
+            row['goals_against'] += int(conceded)
+            if scored > conceded:
+                row['won'] += 1
+                row['points'] += 3
+            elif scored == conceded:
+                row['drawn'] += 1
+                row['points'] += 1
+            else:
+                row['lost'] += 1
+    return table
+
+
+def remaining_fixtures(df_season, teams):
+    """
+    Fixture yang belum dimainkan dengan asumsi kompetisi penuh kandang-tandang:
+    setiap pasangan (tuan rumah, tamu) dari `teams` yang belum ada di musim ini.
+    """
+    played = set(zip(df_season['HomeTeam'], df_season['AwayTeam']))
+    return [(home, away) for home in teams for away in teams
+            if home != away and (home, away) not in played]
+
+
+def tiebreak_scores(table, teams):
+    """Nilai unik di [0, 1) per tim (urutan `teams`): makin besar makin unggul saat poin sama."""
+    gd = np.array([table[t]['goals_for'] - table[t]['goals_against'] for t in teams], dtype=float)
+    gf = np.array([table[t]['goals_for'] for t in teams], dtype=float)
+    # Nama dibandingkan terbalik: pada selisih dan jumlah gol yang sama, nama yang lebih awal unggul
+    by_name = -np.arange(len(teams))
+    ranks = np.empty(len(teams))
+    ranks[np.lexsort((by_name, gf, gd))] = np.arange(len(teams))
+    return ranks / max(len(teams), 1)
+
+
+class SimulationResult:
+    """
+    `position_counts[t, k]`: berapa kali tim t finis di posisi k+1.
+    `points_sum[t]`: jumlah poin akhir tim t di semua simulasi.
+    """
+
+    def __init__(self, position_counts, points_sum, simulations, seed, seconds, chunks, workers):
+        self.position_counts = position_counts
+        self.points_sum = points_sum
+        self.simulations = simulations
+        self.seed = seed
+        self.seconds = seconds
+        self.chunks = chunks
+        self.workers = workers
+
+    @property
+    def position_probs(self):
+        return self.position_counts / self.simulations
+
+    @property
+    def expected_points(self):
+        return self.points_sum / self.simulations
+
+    @property
+    def sims_per_second(self):
+        return self.simulations / self.seconds if self.seconds > 0 else None
+
+
+def simulate_positions(probs, home, away, base_points, tiebreak, simulations,
+                       seed=None, chunk_size=2000, workers=1):
+    """
+    `probs`: matriks (fixture x 3) probabilitas menang kandang/seri/menang tandang.
+    `home`/`away`: indeks tim (0..T-1) per fixture. `base_points`/`tiebreak`:
+    poin klasemen sementara dan nilai tiebreak per tim. `seed=None` memakai
+    entropi acak; seed yang dipakai dikembalikan di hasil agar bisa diulang.
+    """
+    probs = np.asarray(probs, dtype=float)
+    home = np.asarray(home, dtype=np.intp)
+    away = np.asarray(away, dtype=np.intp)
+    base_points = np.asarray(base_points, dtype=float)
+    tiebreak = np.asarray(tiebreak, dtype=float)
+    n_teams, n_fixtures = len(base_points), len(probs)
+
+    seed_seq = np.random.SeedSequence(seed)
+    n_chunks = -(-simulations // chunk_size)
+    sizes = [min(chunk_size, simulations - i * chunk_size) for i in range(n_chunks)]
+    children = seed_seq.spawn(n_chunks)
+
+    # Batas kumulatif per fixture: u < p_home -> H, u < p_home + p_draw -> D, selain itu A
+    cum = np.cumsum(probs[:, :2], axis=1)
+    home_onehot = np.zeros((n_fixtures, n_teams))
+    home_onehot[np.arange(n_fixtures), home] = 1.0
+    away_onehot = np.zeros((n_fixtures, n_teams))
+    away_onehot[np.arange(n_fixtures), away] = 1.0
+    # Tiebreak < 1 tidak pernah mengalahkan selisih satu poin
+    base_key = base_points + tiebreak
+    slots = np.arange(n_teams)
+
+    def run_chunk(i):
+        rng = np.random.default_rng(children[i])
+        u = rng.random((sizes[i], n_fixtures))
+        home_win = u < cum[:, 0]
+        draw = (u < cum[:, 1]) & ~home_win
+        away_win = ~home_win & ~draw
+        gained = (3.0 * home_win + draw) @ home_onehot + (3.0 * away_win + draw) @ away_onehot
+        # order[s, k]: tim di posisi k+1 pada simulasi s
+        order = np.argsort(-(base_key + gained), axis=1, kind='stable')
+        counts = np.bincount((order * n_teams + slots).ravel(), minlength=n_teams * n_teams)
+        return counts.reshape(n_teams, n_teams), gained.sum(axis=0)
+
+    start = time.perf_counter()
+    if workers > 1 and n_chunks > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, n_chunks), thread_name_prefix='season-sim') as pool:
+            parts = list(pool.map(run_chunk, range(n_chunks)))
+    else:
+        parts = [run_chunk(i) for i in range(n_chunks)]
+    position_counts = np.zeros((n_teams, n_teams), dtype=np.int64)
+    points_sum = base_points * simulations
+    for counts, gained in parts:
+        position_counts += counts
+        points_sum = points_sum + gained
+    seconds = time.perf_counter() - start
+    return SimulationResult(position_counts, points_sum, simulations, seed_seq.entropy, seconds,
+                            n_chunks, min(workers, n_chunks))
@@ -69,6 +69,33 @@ document.addEventListener('DOMContentLoaded', async () => {
         newMatches = [];
     });
 
+    // Ringkasan dedup dari backend: jumlah baris baru, duplikat dan konflik skor
+    function describeSummary(summary) {
+        if (!summary) return '';
+        let text = `\n\nTotal baris: ${summary.total}\nBaru: ${summary.new}\nDuplikat: ${summary.duplicate}\nKonflik skor: ${summary.conflict}`;
+        if (summary.invalid_date) text += `\nTanggal tidak valid (dilewati): ${summary.invalid_date}`;
+        return text;
+    }
+
+    // Unggahan diproses sebagai job di server: polling status sampai selesai, lalu ambil hasilnya
+    async function waitForJob(job) {
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const res = await fetch(job.status_url);
+            const data = await res.json();
+            if (data.status !== 'ok') return data;
+            const info = data.job;
+            if (info.state === 'done' || info.state === 'error') break;
+
+            let text = info.message || 'Menunggu antrian...';
+            if (info.total) text += ` ${info.processed}/${info.total} baris`;
+            if (info.eta_seconds !== null && info.eta_seconds !== undefined) text += ` (sisa ±${Math.ceil(info.eta_seconds)} detik)`;
+            dataTableBody.innerHTML = `<tr><td colspan="30" class="text-center py-4">${text}</td></tr>`;
+        }
+        const res = await fetch(job.result_url);
+        return res.json();
+    }
+
     // 2. Proses CSV (Mengirim file langsung ke backend)
     csvFileInput.addEventListener('change', async (e) => {
         if (!selectedLeague) {
@@ -97,7 +124,8 @@ document.addEventListener('DOMContentLoaded', async () => {
                 body: formData // Kirim file
             });
 
-            const data = await res.json();
+            let data = await res.json();
+            if (data.status === 'ok' && data.job_id) data = await waitForJob(data);
             
             // Bersihkan tampilan loading
             dataTableBody.innerHTML = '';
@@ -108,7 +136,7 @@ document.addEventListener('DOMContentLoaded', async () => {
                 
                 if (newMatches.length === 0) {
                     // Gunakan elemen UI daripada alert/prompt
-                    alert(data.message || 'Tidak ada pertandingan baru yang ditemukan.'); 
+                    alert((data.message || 'Tidak ada pertandingan baru yang ditemukan.') + describeSummary(data.summary)); 
                     dataTableBody.innerHTML = '<tr><td colspan="30" class="text-center py-4">Tidak ada pertandingan baru yang ditemukan.</td></tr>';
                 }
                 
@@ -177,7 +205,7 @@ document.addEventListener('DOMContentLoaded', async () => {
                 });
                 
                 if (newMatches.length > 0) {
-                    alert(`Ditemukan ${newMatches.length} pertandingan baru siap disimpan.`);
+                    alert(`Ditemukan ${newMatches.length} pertandingan baru siap disimpan.` + describeSummary(data.summary));
                     autoScrollTable();
                 }
 
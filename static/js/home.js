@@ -24,44 +24,61 @@ document.addEventListener('DOMContentLoaded', () => {
     const historyList = document.getElementById('history-list');
     const clearBtn = document.getElementById('clear-history');
 
-    async function renderHistory() {
+    const moreBtn = document.getElementById('history-more');
+    let nextCursor = null;
+
+    function renderHistoryItem(item) {
+        const el = document.createElement('div');
+        el.className = 'hist-item';
+        
+        const timestamp = item.timestamp 
+            ? new Date(item.timestamp).toLocaleString() 
+            : '(Waktu tidak tersimpan)';
+
+        // --- [PERUBAHAN TAMPILAN DI SINI] ---
+        // Menambahkan item.home_team dan item.away_team
+        el.innerHTML = `
+            <strong>${item.league}</strong>
+            <span class="hist-match">${item.home_team || 'Tim Home'} vs ${item.away_team || 'Tim Away'}</span>
+            <small>${timestamp}</small>
+            <span class="hist-preds">
+                HDA: ${item.prediction.HDA?.label || '-'} | 
+                OU: ${item.prediction.OU25?.label || '-'} | 
+                BTTS: ${item.prediction.BTTS?.label || '-'}
+            </span>
+        `;
+        // --- [AKHIR PERUBAHAN] ---
+        
+        historyList.appendChild(el);
+    }
+
+    // append=true: halaman berikutnya (lebih lama) ditambahkan di bawah daftar
+    async function renderHistory(append = false) {
         if (!historyList) return;
-        const res = await fetch('/api/history');
+        const url = append && nextCursor
+            ? `/api/history?cursor=${encodeURIComponent(nextCursor)}`
+            : '/api/history';
+        const res = await fetch(url);
         const data = await res.json();
         if (data.status !== 'ok') {
-            historyList.textContent = '(Belum ada riwayat)';
+            if (!append) historyList.textContent = '(Belum ada riwayat)';
             return;
         }
         const h = data.history;
-        if (!h.length) {
-            historyList.textContent = '(Belum ada riwayat)';
-            return;
+        nextCursor = data.next_cursor || null;
+        if (moreBtn) moreBtn.hidden = !nextCursor;
+        if (!append) {
+            if (!h.length) {
+                historyList.textContent = '(Belum ada riwayat)';
+                return;
+            }
+            historyList.innerHTML = '';
         }
-        historyList.innerHTML = '';
-        h.slice().reverse().forEach(item => {
-            const el = document.createElement('div');
-            el.className = 'hist-item';
-            
-            const timestamp = item.timestamp 
-                ? new Date(item.timestamp).toLocaleString() 
-                : '(Waktu tidak tersimpan)';
+        h.slice().reverse().forEach(renderHistoryItem);
+    }
 
-            // --- [PERUBAHAN TAMPILAN DI SINI] ---
-            // Menambahkan item.home_team dan item.away_team
-            el.innerHTML = `
-                <strong>${item.league}</strong>
-                <span class="hist-match">${item.home_team || 'Tim Home'} vs ${item.away_team || 'Tim Away'}</span>
-                <small>${timestamp}</small>
-                <span class="hist-preds">
-                    HDA: ${item.prediction.HDA?.label || '-'} | 
-                    OU: ${item.prediction.OU25?.label || '-'} | 
-                    BTTS: ${item.prediction.BTTS?.label || '-'}
-                </span>
-            `;
-            // --- [AKHIR PERUBAHAN] ---
-            
-            historyList.appendChild(el);
-        });
+    if (moreBtn) {
+        moreBtn.addEventListener('click', () => renderHistory(true));
     }
 
     if (clearBtn) {
@@ -0,0 +1,460 @@
+"""
+Penyimpanan dataset liga (satu antarmuka untuk app.py, train.py dan add.py).
+
+Setiap dataset dikenali lewat path CSV-nya di folder dataset/, misal
+`dataset/dataset_bundesliga_1.csv`. Dataset yang sudah dimigrasi disimpan
+kolumnar di `dataset/<nama>.store/`:
+
+    manifest.json        daftar kolom dan segmen (jumlah baris, tipe, kategori teks)
+    g<gen>_c<i>.npy      satu file NumPy per kolom per segmen, dibaca dengan mmap
+
+Kolom tanggal disimpan sebagai datetime64 (tidak perlu parse ulang), kolom
+angka dengan tipe aslinya, dan kolom teks sebagai kode int32 + daftar
+kategori di manifest. Jika store ada, store yang menjadi sumber data dan
+semua penulisan masuk ke store; CSV tetap bisa dibuat ulang untuk
+pertukaran data dengan perintah export. Tanpa store, CSV dibaca dan ditulis
+seperti biasa.
+
+Penambahan laga (`append_dataset`) bersifat append-only: di CSV baris
+ditambahkan di akhir file, di store ditulis sebagai segmen baru. Semua
+penulisan memegang file lock `dataset/<nama>.lock`, sehingga aman dipakai
+beberapa worker sekaligus. Segmen store digabung (compaction) otomatis
+setelah STORE_MAX_SEGMENTS segmen, atau manual dengan perintah compact.
+
+    python storage.py migrate [path.csv ...]   # CSV -> store
+    python storage.py export [path.csv ...]    # store -> CSV
+    python storage.py compact [path.csv ...]   # gabungkan segmen store
+    python storage.py info
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: hanya lock antar-thread di dalam satu proses
+    fcntl = None
+
+from lazy_imports import lazy_module
+from league_cache import file_version
+from league_index import parse_match_dates
+
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+DATASET_DIR = 'dataset'
+MANIFEST_NAME = 'manifest.json'
+STORE_FORMAT_VERSION = 2
+# Jumlah segmen store maksimum sebelum digabung otomatis saat append
+STORE_MAX_SEGMENTS = int(os.environ.get('STORE_MAX_SEGMENTS', 8))
+
+# Skema dataset liga (urutan kolom yang dipakai saat training dan prediksi)
+REQUIRED_COLUMNS = [
+    'Date','HomeTeam','AwayTeam','FTHG','FTAG','FTR','AvgH','AvgD','AvgA','Avg>2.5','Avg<2.5','HomeTeamElo','AwayTeamElo','EloDifference','Home_AvgGoalsScored','Home_AvgGoalsConceded','Home_Wins','Home_Draws','Home_Losses','Away_AvgGoalsScored','Away_AvgGoalsConceded','Away_Wins','Away_Draws','Away_Losses','HTH_HomeWins','HTH_AwayWins','HTH_Draws','HTH_AvgHomeGoals','HTH_AvgAwayGoals'
+]
+
+
+def store_dir(path):
+    """'dataset/dataset_bundesliga_1.csv' -> 'dataset/dataset_bundesliga_1.store'."""
+    return os.path.splitext(path)[0] + '.store'
+
+
+def has_store(path):
+    return os.path.isfile(os.path.join(store_dir(path), MANIFEST_NAME))
+
+
+def list_datasets(dataset_dir=DATASET_DIR):
+    """Path logis (.csv) semua dataset: file CSV, ditambah store yang CSV-nya sudah tidak ada."""
+    paths = glob.glob(os.path.join(dataset_dir, '*.csv'))
+    known = set(paths)
+    for manifest in sorted(glob.glob(os.path.join(dataset_dir, '*.store', MANIFEST_NAME))):
+        path = os.path.splitext(os.path.dirname(manifest))[0] + '.csv'
+        if path not in known:
+            paths.append(path)
+    return paths
+
+
+def dataset_version(path):
+    """Versi dataset untuk cache: stat manifest jika ada store, selain itu stat file CSV."""
+    if has_store(path):
+        return file_version(os.path.join(store_dir(path), MANIFEST_NAME))
+    return file_version(path)
+
+
+# ==========================================================
+# LOCK
+# ==========================================================
+class _PathLock:
+    __slots__ = ('rlock', 'owner', 'depth', 'handle')
+
+    def __init__(self):
+        self.rlock = threading.RLock()
+        self.owner = None
+        self.depth = 0
+        self.handle = None
+
+
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+
+def lock_file(path):
+    """'dataset/dataset_bundesliga_1.csv' -> 'dataset/dataset_bundesliga_1.lock' (sama untuk CSV dan store)."""
+    return os.path.splitext(path)[0] + '.lock'
+
+
+def _path_lock(path):
+    key = os.path.abspath(path)
+    with _path_locks_guard:
+        return _path_locks.setdefault(key, _PathLock())
+
+
+@contextmanager
+def dataset_lock(path):
+    """
+    Lock eksklusif untuk menulis dataset `path`: RLock antar-thread plus
+    flock antar-proses (worker gunicorn lain). Reentrant di thread yang sama,
+    jadi pemegang lock tetap bisa membaca/menulis dataset yang sama.
+    """
+    state = _path_lock(path)
+    with state.rlock:
+        if state.depth == 0 and fcntl is not None:
+            state.handle = open(lock_file(path), 'a+')
+            fcntl.flock(state.handle.fileno(), fcntl.LOCK_EX)
+        state.depth += 1
+        state.owner = threading.get_ident()
+        try:
+            yield
+        finally:
+            state.depth -= 1
+            if state.depth == 0:
+                state.owner = None
+                if state.handle is not None:
+                    fcntl.flock(state.handle.fileno(), fcntl.LOCK_UN)
+                    state.handle.close()
+                    state.handle = None
+
+
+@contextmanager
+def _shared_lock(path):
+    # Pembaca CSV menunggu append yang sedang berjalan selesai; thread yang
+    # sedang memegang lock eksklusif untuk path ini tidak perlu lock lagi
+    if fcntl is None or _path_lock(path).owner == threading.get_ident() or not os.path.exists(path):
+        yield
+        return
+    with open(lock_file(path), 'a+') as handle:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+# ==========================================================
+# BACA / TULIS
+# ==========================================================
+def read_csv_dataset(path):
+    with _shared_lock(path):
+        df = pd.read_csv(path)
+    if 'Date' in df.columns:
+        # Baris lama dan baris hasil append bisa berbeda format ISO (dengan/tanpa jam)
+        df['Date'] = parse_match_dates(df['Date'])
+    return df
+
+
+def read_dataset(path):
+    """DataFrame dataset di `path`, dari store jika ada, selain itu dari CSV."""
+    if has_store(path):
+        return _read_store(store_dir(path))
+    return read_csv_dataset(path)
+
+
+def write_dataset(path, df):
+    """Menulis ulang seluruh dataset ke store (jika sudah dimigrasi) atau ke CSV."""
+    with dataset_lock(path):
+        if has_store(path):
+            _write_store(store_dir(path), df)
+        else:
+            tmp_path = path + '.tmp'
+            df.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, path)
+
+
+def append_dataset(path, df_new):
+    """
+    Menambahkan baris `df_new` tanpa menulis ulang data lama. Kolom yang
+    tidak ada di `df_new` diisi kosong. Jika `df_new` membawa kolom yang
+    belum ada di dataset, header diperluas dan dataset ditulis ulang sekali
+    (baris lama berisi kosong di kolom baru), sehingga tidak ada kolom yang
+    hilang. Mengembalikan jumlah baris.
+    """
+    if df_new.empty:
+        return 0
+    with dataset_lock(path):
+        if has_store(path):
+            _append_store(store_dir(path), df_new)
+        elif not os.path.exists(path):
+            df_new.to_csv(path, index=False)
+        else:
+            _append_csv(path, df_new)
+    return len(df_new)
+
+
+def compact(path):
+    """Menggabungkan semua segmen store `path` menjadi satu. Mengembalikan jumlah segmen sebelumnya."""
+    with dataset_lock(path):
+        if not has_store(path):
+            return 0
+        directory = store_dir(path)
+        segments = len(_load_manifest(directory)['segments'])
+        if segments > 1:
+            _write_store(directory, _read_store(directory))
+        return segments
+
+
+def _new_columns(header, df_new):
+    known = set(header)
+    return [str(c) for c in df_new.columns if str(c) not in known]
+
+
+def _append_csv(path, df_new):
+    header = list(pd.read_csv(path, nrows=0).columns)
+    extra = _new_columns(header, df_new)
+    if extra:
+        print(f"{path}: kolom baru {', '.join(extra)}; dataset ditulis ulang dengan header diperluas")
+        with _shared_lock(path):
+            df_existing = pd.read_csv(path)
+        tmp_path = path + '.tmp'
+        pd.concat([df_existing, df_new], ignore_index=True).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        return
+    text = df_new.reindex(columns=header).to_csv(index=False, header=False)
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        needs_newline = False
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) not in (b'\n', b'\r')
+    # Satu kali write dengan mode append; pembaca CSV memegang shared lock sehingga tidak melihat baris setengah jadi
+    with open(path, 'a', newline='', encoding='utf-8') as f:
+        f.write(('\n' if needs_newline else '') + text)
+
+
+# ==========================================================
+# FORMAT STORE
+# ==========================================================
+def _load_manifest(directory):
+    with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format', 1) == 1:
+        # Format 1: satu blok kolom tanpa segmen
+        manifest = {'format': STORE_FORMAT_VERSION, 'generation': manifest['generation'],
+                    'rows': manifest['rows'], 'columns': [meta['name'] for meta in manifest['columns']],
+                    'segments': [{'rows': manifest['rows'],
+                                  'columns': [{k: v for k, v in meta.items() if k != 'name'}
+                                              for meta in manifest['columns']]}]}
+    return manifest
+
+
+def _save_manifest(directory, manifest):
+    # Manifest diganti secara atomik: pembaca melihat manifest lama atau baru secara utuh
+    tmp_path = os.path.join(directory, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_NAME))
+
+
+def _normalize_column(name, series, kind=None):
+    """
+    Menyamakan tipe kolom dengan hasil baca ulang CSV: baris dari unggahan
+    biasanya berupa teks ('2.2', '' untuk odds kosong) yang di CSV akan
+    terbaca sebagai angka/NaN, dan kolom Date campuran teks/datetime. Teks
+    kosong selalu menjadi NaN, termasuk kolom yang seluruhnya kosong.
+    `kind` (jenis kolom di manifest) memaksa segmen baru memakai jenis yang
+    sama dengan segmen sebelumnya.
+    """
+    if name == 'Date' or kind == 'datetime':
+        return parse_match_dates(series)
+    if kind != 'category' and (pd.api.types.is_numeric_dtype(series)
+                               or pd.api.types.is_datetime64_any_dtype(series)):
+        return series
+    blank = series.isna() | (series.astype(str).str.strip() == '')
+    values = series.astype(object).where(~blank, np.nan)
+    if kind == 'category':
+        return values
+    numeric = pd.to_numeric(values, errors='coerce')
+    if kind == 'numeric' or numeric[~blank].notna().all():
+        floats = numeric.to_numpy(dtype=float)
+        if (~blank).any() and not blank.any() and np.all(np.mod(floats, 1) == 0):
+            return pd.Series(floats.astype(np.int64), index=series.index)
+        return pd.Series(floats, index=series.index)
+    return values
+
+
+def _encode_column(series):
+    """(array yang disimpan, metadata kolom) untuk satu kolom."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.to_numpy(dtype='datetime64[ns]'), {'kind': 'datetime'}
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        values = series.to_numpy()
+        return values, {'kind': 'numeric', 'dtype': values.dtype.str}
+    codes, categories = pd.factorize(series.astype(object), use_na_sentinel=True)
+    return codes.astype(np.int32), {'kind': 'category', 'categories': [str(c) for c in categories]}
+
+
+def _decode_column(values, meta):
+    if meta['kind'] != 'category':
+        return values
+    categories = np.array(meta['categories'], dtype=object)
+    decoded = np.full(len(values), np.nan, dtype=object)
+    present = values >= 0
+    decoded[present] = categories[values[present]]
+    return decoded
+
+
+def _write_segment(directory, df, generation, kinds=None):
+    columns = []
+    for i, name in enumerate(df.columns):
+        values, meta = _encode_column(_normalize_column(name, df[name], kinds[i] if kinds else None))
+        meta = {'file': f'g{generation}_c{i}.npy', **meta}
+        np.save(os.path.join(directory, meta['file']), np.ascontiguousarray(values), allow_pickle=False)
+        columns.append(meta)
+    return {'rows': int(len(df)), 'columns': columns}
+
+
+def _read_store(directory, attempts=3):
+    # Compaction bisa menghapus file segmen lama tepat setelah manifest dibaca;
+    # jika itu terjadi, baca ulang dari manifest terbaru
+    for attempt in range(attempts):
+        manifest = _load_manifest(directory)
+        try:
+            data = {}
+            for i, name in enumerate(manifest['columns']):
+                parts = []
+                for segment in manifest['segments']:
+                    meta = segment['columns'][i]
+                    # view(np.ndarray): tetap dibaca lewat mmap, tapi tanpa subclass np.memmap di hasil operasi
+                    values = np.load(os.path.join(directory, meta['file']), mmap_mode='r',
+                                     allow_pickle=False).view(np.ndarray)
+                    parts.append(_decode_column(values, meta))
+                data[name] = parts[0] if len(parts) == 1 else np.concatenate(parts)
+            return pd.DataFrame(data, columns=manifest['columns'], copy=False)
+        except FileNotFoundError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.05)
+
+
+def _segment_files(manifest):
+    return [meta['file'] for segment in manifest['segments'] for meta in segment['columns']]
+
+
+def _write_store(directory, df):
+    """
+    Menulis ulang store menjadi satu segmen. File generasi baru ditulis
+    dulu, lalu manifest diganti secara atomik; file lama dihapus setelahnya.
+    """
+    os.makedirs(directory, exist_ok=True)
+    old_files = []
+    generation = 1
+    if os.path.isfile(os.path.join(directory, MANIFEST_NAME)):
+        old = _load_manifest(directory)
+        generation = old['generation'] + 1
+        old_files = _segment_files(old)
+
+    segment = _write_segment(directory, df, generation)
+    _save_manifest(directory, {'format': STORE_FORMAT_VERSION, 'generation': generation,
+                               'rows': segment['rows'], 'columns': [str(c) for c in df.columns],
+                               'segments': [segment]})
+    for fname in old_files:
+        try:
+            os.remove(os.path.join(directory, fname))
+        except OSError:
+            pass
+
+
+def _append_store(directory, df_new):
+    manifest = _load_manifest(directory)
+    extra = _new_columns(manifest['columns'], df_new)
+    if extra:
+        print(f"{directory}: kolom baru {', '.join(extra)}; store ditulis ulang dengan kolom diperluas")
+        _write_store(directory, pd.concat([_read_store(directory), df_new], ignore_index=True))
+        return
+    generation = manifest['generation'] + 1
+    kinds = [meta['kind'] for meta in manifest['segments'][0]['columns']] if manifest['segments'] else None
+    segment = _write_segment(directory, df_new.reindex(columns=manifest['columns']), generation, kinds)
+    manifest['generation'] = generation
+    manifest['rows'] += segment['rows']
+    manifest['segments'].append(segment)
+    _save_manifest(directory, manifest)
+    if len(manifest['segments']) > STORE_MAX_SEGMENTS:
+        _write_store(directory, _read_store(directory))
+
+
+# ==========================================================
+# MIGRASI / EXPORT
+# ==========================================================
+def migrate(path):
+    """Membuat (atau menimpa) store dari file CSV `path`. CSV tidak dihapus."""
+    with dataset_lock(path):
+        df = read_csv_dataset(path)
+        _write_store(store_dir(path), df)
+    return len(df)
+
+
+def export(path, output_path=None):
+    """Menulis isi dataset (store atau CSV) ke CSV `output_path` (default: `path`)."""
+    with dataset_lock(path):
+        df = read_dataset(path)
+        df.to_csv(output_path or path, index=False)
+    return len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrasi dataset liga antara CSV dan store kolumnar.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_migrate = sub.add_parser('migrate', help='CSV -> store kolumnar')
+    p_migrate.add_argument('paths', nargs='*')
+    p_export = sub.add_parser('export', help='store -> CSV')
+    p_export.add_argument('paths', nargs='*')
+    p_export.add_argument('--out-dir', help='folder tujuan CSV (default: menimpa CSV di dataset/)')
+    p_compact = sub.add_parser('compact', help='gabungkan segmen store menjadi satu')
+    p_compact.add_argument('paths', nargs='*')
+    sub.add_parser('info', help='status penyimpanan setiap dataset')
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        for path in list_datasets():
+            if has_store(path):
+                manifest = _load_manifest(store_dir(path))
+                print(f"{path}: store (generasi {manifest['generation']}, {manifest['rows']} baris, "
+                      f"{len(manifest['columns'])} kolom, {len(manifest['segments'])} segmen)")
+            else:
+                print(f"{path}: csv")
+        return
+
+    paths = args.paths or [p for p in list_datasets() if args.command != 'migrate' or os.path.isfile(p)]
+    for path in paths:
+        try:
+            if args.command == 'migrate':
+                rows = migrate(path)
+                print(f"✅ {path} -> {store_dir(path)} ({rows} baris)")
+            elif args.command == 'compact':
+                segments = compact(path)
+                print(f"✅ {path}: {segments} segmen digabung" if segments > 1 else f"{path}: tidak ada yang perlu digabung")
+            else:
+                output_path = os.path.join(args.out_dir, os.path.basename(path)) if args.out_dir else path
+                if args.out_dir:
+                    os.makedirs(args.out_dir, exist_ok=True)
+                rows = export(path, output_path)
+                print(f"✅ {path} -> {output_path} ({rows} baris)")
+        except Exception as e:
+            print(f"🚨 ERROR {path}: {e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+import os
+import sys
+
+# Modul aplikasi berada di root repo (tanpa paket)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """Modul app.py dengan konfigurasi uji: DB dan antrian job di folder sementara, tanpa warmup."""
+    tmp = tmp_path_factory.mktemp('app')
+    for name in ('FLASK_SECRET_KEY', 'GOOGLE_CLIENT_ID', 'GOOGLE_CLIENT_SECRET'):
+        os.environ.setdefault(name, 'test')
+    os.environ.setdefault('ADMIN_EMAIL', 'admin@example.com')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + str(tmp / 'test.db')
+    os.environ['JOB_DB_PATH'] = str(tmp / 'jobs.sqlite3')
+    os.environ['USER_CACHE_VERSION_FILE'] = str(tmp / 'user_cache.version')
+    os.environ['WARMUP'] = '0'
+    import app
+    return app
@@ -0,0 +1,46 @@
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from compact_model import export_compact, load_compact
+from model_registry import ModelRegistry
+
+
+def _train(tmp_path):
+    import joblib
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 6))
+    y = np.where(X[:, 0] + rng.normal(scale=0.5, size=300) > 0.3, 'H', np.where(X[:, 1] > 0, 'D', 'A'))
+    scaler = StandardScaler().fit(X)
+    forest = RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0).fit(scaler.transform(X), y)
+    joblib.dump(forest, tmp_path / 'model_hda.pkl')
+    joblib.dump(scaler, tmp_path / 'scaler.pkl')
+    return forest, scaler, rng.normal(size=(400, 6))
+
+
+def test_compact_forest_matches_predict_proba(tmp_path):
+    forest, scaler, X = _train(tmp_path)
+    X[::7, 2] = np.nan  # NaN mengikuti missing_go_to_left seperti scikit-learn
+    export_compact(str(tmp_path), {'model_hda': forest, 'scaler': scaler})
+    compact = load_compact(str(tmp_path))
+    assert sorted(compact) == ['model_hda', 'scaler']
+    assert np.array_equal(compact['scaler'].transform(X), scaler.transform(X), equal_nan=True)
+    scaled = scaler.transform(X)
+    assert np.array_equal(compact['model_hda'].predict_proba(scaled), forest.predict_proba(scaled))
+    assert compact['model_hda'].predict(scaled).tolist() == forest.predict(scaled).tolist()
+
+
+def test_registry_builds_missing_compact_arrays(tmp_path):
+    import joblib
+    league_dir = tmp_path / 'bundesliga'
+    league_dir.mkdir()
+    forest, scaler, X = _train(league_dir)
+    for name in ('model_ou25', 'model_btts', 'le_ftr', 'le_ou', 'le_btts'):
+        joblib.dump(forest if name.startswith('model') else None, league_dir / f'{name}.pkl')
+    bundle = ModelRegistry(str(tmp_path)).get('Bundesliga')
+    assert bundle.compact == ['model_hda', 'model_ou25', 'scaler']
+    assert (league_dir / 'compact' / 'compact.json').exists()
+    scaled = scaler.transform(X)
+    assert np.array_equal(bundle.artifacts['model_hda'].predict_proba(scaled), forest.predict_proba(scaled))
+    # Worker berikutnya langsung memakai array yang sudah dibuat
+    assert ModelRegistry(str(tmp_path)).get('Bundesliga').version == bundle.version
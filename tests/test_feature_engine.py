@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+from feature_engine import FeatureEngine, run_engine
+
+FEATURE_COLUMNS = [
+    'EloDifference', 'Home_AvgGoalsScored', 'Home_AvgGoalsConceded', 'Home_Wins', 'Home_Draws', 'Home_Losses',
+    'Away_AvgGoalsScored', 'Away_AvgGoalsConceded', 'Away_Wins', 'Away_Draws', 'Away_Losses',
+    'HTH_HomeWins', 'HTH_AwayWins', 'HTH_Draws', 'HTH_AvgHomeGoals', 'HTH_AvgAwayGoals',
+]
+TEAMS = ['Bayern Munich', 'Dortmund', 'RB Leipzig', 'Leverkusen', 'Stuttgart', 'Mainz']
+
+
+def _matches(rng, start, count, teams):
+    pairs = [(h, a) for h in teams for a in teams if h != a]
+    picks = rng.integers(0, len(pairs), count)
+    return pd.DataFrame({
+        # Satu laga per hari: urutan tidak bergantung pada cara sort memecah tanggal yang sama
+        'Date': pd.date_range(start, periods=count, freq='D'),
+        'HomeTeam': [pairs[i][0] for i in picks],
+        'AwayTeam': [pairs[i][1] for i in picks],
+        'FTHG': rng.integers(0, 5, count),
+        'FTAG': rng.integers(0, 4, count),
+    })
+
+
+def _reference_features(df_existing, df_new, window=5, K=30, initial_elo=1500):
+    """Logika lama update_elo_and_features: Elo berurutan, form dan H2H dari tabel laga sebelumnya."""
+    combined = pd.concat([df_existing, df_new], ignore_index=True).sort_values('Date').reset_index(drop=True)
+    elo = {}
+    latest = df_existing.sort_values('Date', ascending=False)
+    for team in set(latest['HomeTeam']) | set(latest['AwayTeam']):
+        row = latest[(latest['HomeTeam'] == team) | (latest['AwayTeam'] == team)].iloc[0]
+        elo[team] = row['HomeTeamElo'] if row['HomeTeam'] == team else row['AwayTeamElo']
+
+    def recent(past, team):
+        games = past[(past['HomeTeam'] == team) | (past['AwayTeam'] == team)].sort_values('Date', ascending=False).head(window)
+        if games.empty:
+            return {'AvgGoalsScored': 0, 'AvgGoalsConceded': 0, 'Wins': 0, 'Draws': 0, 'Losses': 0}
+        scored = np.where(games['HomeTeam'] == team, games['FTHG'], games['FTAG'])
+        conceded = np.where(games['HomeTeam'] == team, games['FTAG'], games['FTHG'])
+        return {'AvgGoalsScored': scored.mean(), 'AvgGoalsConceded': conceded.mean(),
+                'Wins': int((scored > conceded).sum()), 'Draws': int((scored == conceded).sum()),
+                'Losses': int((scored < conceded).sum())}
+
+    def h2h(past, home, away):
+        games = past[((past['HomeTeam'] == home) & (past['AwayTeam'] == away))
+                     | ((past['HomeTeam'] == away) & (past['AwayTeam'] == home))].sort_values('Date', ascending=False).head(window)
+        home_goals = np.where(games['HomeTeam'] == home, games['FTHG'], games['FTAG'])
+        away_goals = np.where(games['HomeTeam'] == home, games['FTAG'], games['FTHG'])
+        return {'HTH_HomeWins': int((home_goals > away_goals).sum()), 'HTH_AwayWins': int((home_goals < away_goals).sum()),
+                'HTH_Draws': int((home_goals == away_goals).sum()),
+                'HTH_AvgHomeGoals': home_goals.mean() if len(games) else 0,
+                'HTH_AvgAwayGoals': away_goals.mean() if len(games) else 0}
+
+    rows = []
+    for idx, row in combined.iterrows():
+        home, away = row['HomeTeam'], row['AwayTeam']
+        h_pre, a_pre = elo.get(home, initial_elo), elo.get(away, initial_elo)
+        e_h = 1 / (1 + 10 ** ((a_pre - h_pre) / 400))
+        s_h = 1 if row['FTHG'] > row['FTAG'] else 0 if row['FTHG'] < row['FTAG'] else 0.5
+        elo[home], elo[away] = h_pre + K * (s_h - e_h), a_pre + K * ((1 - s_h) - (1 - e_h))
+        if idx >= len(df_existing):
+            past = combined.iloc[:idx]
+            home_stats, away_stats = recent(past, home), recent(past, away)
+            rows.append({
+                'HomeTeamElo': elo[home], 'AwayTeamElo': elo[away], 'EloDifference': elo[home] - elo[away],
+                **{'Home_' + k: v for k, v in home_stats.items()}, **{'Away_' + k: v for k, v in away_stats.items()},
+                **h2h(past, home, away),
+            })
+    return rows
+
+
+def _frames(seed=0):
+    rng = np.random.default_rng(seed)
+    existing = _matches(rng, '2024-08-01', 150, TEAMS)
+    existing['HomeTeamElo'] = rng.uniform(1400, 1600, len(existing))
+    existing['AwayTeamElo'] = rng.uniform(1400, 1600, len(existing))
+    # Seperti dataset asli, kolom fitur lain sudah ada (update_elo_and_features hanya mengisi kolom yang ada)
+    for column in FEATURE_COLUMNS:
+        if column not in existing.columns:
+            existing[column] = 0.0
+    # Tim baru (Elo awal default) ikut di laga-laga yang diunggah
+    new = _matches(rng, '2025-02-01', 60, TEAMS + ['St Pauli'])
+    return existing, new
+
+
+def _assert_features(actual, expected):
+    assert len(actual) == len(expected)
+    for got, want in zip(actual, expected):
+        for key, value in want.items():
+            assert np.isclose(float(got[key]), float(value), rtol=0, atol=1e-9), key
+
+
+def test_run_engine_matches_reference():
+    existing, new = _frames()
+    expected = _reference_features(existing, new)
+    _, positions, features = run_engine(existing, new)
+    assert positions.tolist() == list(range(len(existing), len(existing) + len(new)))
+    _assert_features(features, expected)
+    # Jalur append-only: state setelah dataset lama, hanya baris baru yang diproses
+    _, _, features = run_engine(existing, new, engine=FeatureEngine.from_history(existing))
+    _assert_features(features, expected)
+
+
+def test_update_elo_and_features_matches_reference(app_module):
+    existing, new = _frames(seed=1)
+    expected = _reference_features(existing, new)
+    result = app_module.update_elo_and_features(existing.copy(), new.copy())
+    _assert_features(result.to_dict('records'), expected)
+    assert result['HomeTeam'].tolist() == new['HomeTeam'].tolist()
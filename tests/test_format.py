@@ -0,0 +1,18 @@
+import numpy as np
+import pandas as pd
+
+
+def test_format_float_series_matches_format_float_clean(app_module):
+    rng = np.random.default_rng(0)
+    values = np.concatenate([
+        rng.uniform(-50, 50, 2000),
+        np.round(rng.uniform(0, 20, 500), 3),
+        # Tepat/hampir di tengah pembulatan, nol bertanda, nilai besar dan non-finite
+        [0.005, 0.015, 0.125, 2.675, 1.005, -0.001, -0.0, 0.0, 3.0, 2.2, 9999.995, 12345.678,
+         1e16, -1e-9, np.inf, -np.inf, np.nan],
+    ])
+    expected = [app_module.format_float_clean(v) for v in values]
+    assert app_module.format_float_series(values).tolist() == expected
+    # Kolom dengan NaN/None dari pandas
+    column = pd.Series([1.5, None, 2.333, np.nan], dtype=float)
+    assert app_module.format_float_series(column).tolist() == ['1.5', '', '2.33', '']
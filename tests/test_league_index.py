@@ -0,0 +1,33 @@
+import pandas as pd
+
+from league_index import (MATCH_CONFLICT, MATCH_DUPLICATE, MATCH_INVALID, MATCH_NEW, MatchKeyIndex,
+                          summarize_match_status)
+
+EXISTING = pd.DataFrame({
+    'Date': pd.to_datetime(['2025-08-15', '2025-08-16']),
+    'HomeTeam': ['Bayern Munich', 'Dortmund'],
+    'AwayTeam': ['RB Leipzig', 'St Pauli'],
+    'FTHG': [6, 3],
+    'FTAG': [0, 3],
+})
+
+
+def test_classify_statuses():
+    upload = pd.DataFrame({
+        'Date': ['15/08/2025', '16/08/2025', '23/08/2025', '23/08/2025', 'bukan tanggal', ''],
+        'HomeTeam': ['Bayern Munich', 'Dortmund', 'Wolfsburg', 'Wolfsburg', 'Mainz', 'Mainz'],
+        'AwayTeam': ['RB Leipzig', 'St Pauli', 'Heidenheim', 'Heidenheim', 'FC Koln', 'FC Koln'],
+        'FTHG': [6, 1, 3, 3, 0, 0],
+        'FTAG': [0, 1, 1, 1, 1, 1],
+    })
+    status = MatchKeyIndex.from_frame(EXISTING).classify(upload)
+    assert status.tolist() == [MATCH_DUPLICATE, MATCH_CONFLICT, MATCH_NEW, MATCH_DUPLICATE,
+                               MATCH_INVALID, MATCH_INVALID]
+    assert summarize_match_status(status) == {'total': 6, 'new': 1, 'duplicate': 2, 'conflict': 1,
+                                              'invalid_date': 2}
+
+
+def test_rows_without_date_are_never_new():
+    # Diunggah ulang berkali-kali tetap tidak pernah ikut disimpan
+    upload = pd.DataFrame({'Date': [None], 'HomeTeam': ['Mainz'], 'AwayTeam': ['FC Koln'], 'FTHG': [0], 'FTAG': [1]})
+    assert MatchKeyIndex.from_frame(EXISTING).classify(upload).tolist() == [MATCH_INVALID]
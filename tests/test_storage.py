@@ -0,0 +1,84 @@
+import os
+import shutil
+
+import pandas as pd
+import pandas.testing as pdt
+
+import storage
+
+BASE = pd.DataFrame({
+    'Date': ['2025-08-15', '2025-08-16', '2025-08-16'],
+    'HomeTeam': ['Bayern Munich', 'Dortmund', 'Mainz'],
+    'AwayTeam': ['RB Leipzig', 'St Pauli', 'FC Koln'],
+    'FTHG': [6, 3, 0],
+    'FTAG': [0, 3, 1],
+    'FTR': ['H', 'D', 'A'],
+    'AvgH': [1.27, 1.39, 2.27],
+    'AvgD': [6.2, 5.1, 3.4],
+    'AvgA': [9.1, 7.2, 3.2],
+})
+
+# Baris dari /api/save_new_matches: semua nilai berupa teks, odds kosong ''
+BLANK_ODDS = pd.DataFrame([
+    {'Date': '2025-08-23 00:00:00', 'HomeTeam': 'Wolfsburg', 'AwayTeam': 'Heidenheim', 'FTHG': '3', 'FTAG': '1',
+     'FTR': 'H', 'AvgH': '', 'AvgD': '', 'AvgA': ''},
+    {'Date': '2025-08-23 00:00:00', 'HomeTeam': 'Freiburg', 'AwayTeam': 'Augsburg', 'FTHG': '1', 'FTAG': '3',
+     'FTR': 'A', 'AvgH': '', 'AvgD': '', 'AvgA': ''},
+])
+
+
+def _datasets(tmp_path):
+    csv_path = str(tmp_path / 'csv' / 'dataset_test_1.csv')
+    store_path = str(tmp_path / 'store' / 'dataset_test_1.csv')
+    os.makedirs(os.path.dirname(csv_path))
+    os.makedirs(os.path.dirname(store_path))
+    BASE.to_csv(csv_path, index=False)
+    shutil.copy(csv_path, store_path)
+    storage.migrate(store_path)
+    os.remove(store_path)
+    assert storage.has_store(store_path)
+    return csv_path, store_path
+
+
+def _assert_same(csv_df, store_df):
+    # CSV bisa membaca teks sebagai dtype string pandas, store sebagai object: bandingkan nilai dan jenis angka
+    pdt.assert_frame_equal(csv_df, store_df, check_dtype=False)
+    for col in csv_df.columns:
+        assert (pd.api.types.is_numeric_dtype(csv_df[col])
+                == pd.api.types.is_numeric_dtype(store_df[col])), col
+
+
+def test_blank_odds_round_trip_matches_csv(tmp_path):
+    csv_path, store_path = _datasets(tmp_path)
+    for path in (csv_path, store_path):
+        assert storage.append_dataset(path, BLANK_ODDS) == len(BLANK_ODDS)
+
+    csv_df, store_df = storage.read_dataset(csv_path), storage.read_dataset(store_path)
+    _assert_same(csv_df, store_df)
+    assert store_df['AvgH'].dtype == float
+    assert store_df['AvgH'].isna().sum() == len(BLANK_ODDS)
+    # Bisa dihitung seperti di train.py
+    store_df[['AvgH', 'AvgD', 'AvgA']].fillna(store_df[['AvgH', 'AvgD', 'AvgA']].mean())
+
+
+def test_blank_odds_segment_keeps_kind_after_compaction(tmp_path):
+    csv_path, store_path = _datasets(tmp_path)
+    for path in (csv_path, store_path):
+        storage.append_dataset(path, BLANK_ODDS)
+        storage.append_dataset(path, BASE.assign(Date='2025-08-30'))
+    storage.compact(store_path)
+    _assert_same(storage.read_dataset(csv_path), storage.read_dataset(store_path))
+
+
+def test_append_with_new_column_keeps_it(tmp_path):
+    csv_path, store_path = _datasets(tmp_path)
+    batch = BLANK_ODDS.assign(Referee=['D Siebert', 'F Willenborg'])
+    for path in (csv_path, store_path):
+        storage.append_dataset(path, batch)
+        storage.append_dataset(path, BASE.assign(Date='2025-08-30'))
+
+    csv_df, store_df = storage.read_dataset(csv_path), storage.read_dataset(store_path)
+    assert list(csv_df.columns) == list(BASE.columns) + ['Referee']
+    assert csv_df['Referee'].tolist()[3:5] == ['D Siebert', 'F Willenborg']
+    assert csv_df['Referee'].isna().sum() == len(csv_df) - 2
+    _assert_same(csv_df, store_df)
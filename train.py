@@ -1,9 +1,16 @@
 import pandas as pd
 import numpy as np
+import argparse
+import glob
+import hashlib
+import json
 import warnings
 import os
+import time
 import joblib
-import glob
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from sklearn.base import clone
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.model_selection import GridSearchCV, train_test_split
 from sklearn.metrics import accuracy_score
@@ -12,11 +19,28 @@ from sklearn.metrics import accuracy_score
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.svm import SVC
 
+from threadpoolctl import threadpool_limits
+
+from storage import read_dataset
+from league_catalog import LeagueCatalog, LeagueEntry
+from compact_model import COMPACT_SOURCES, export_compact
+
 # ==============================================================================
 # KONFIGURASI
 # ==============================================================================
 DATASET_DIR = 'dataset'
 MODEL_DIR = 'models' 
+RANDOM_STATE = 42
+WINDOW = 5
+RF_PARAMS = dict(n_estimators=300, min_samples_split=5, min_samples_leaf=4, max_features='log2', max_depth=20, criterion='gini')
+SVM_PARAM_GRID = {'C': [0.1, 1, 10], 'gamma': ['scale', 'auto']}
+
+# Manifest training per folder models/<liga>/ (fingerprint dataset + konfigurasi)
+MANIFEST_NAME = 'manifest.json'
+ARTIFACT_FILES = ['model_hda.pkl', 'model_btts.pkl', 'model_ou25.pkl', 'scaler.pkl', 'le_ftr.pkl', 'le_ou.pkl', 'le_btts.pkl']
+# --warm-start: jumlah pohon yang ditambahkan ke setiap RF; di atas batas pohon, RF dilatih ulang penuh
+WARM_START_TREES = 50
+WARM_START_MAX_TREES = 600
 
 warnings.filterwarnings('ignore')
 
@@ -33,165 +57,455 @@ FEATURE_COLUMNS = [
 # ==============================================================================
 # UTILITAS (Tambahkan/Salin bagian ini)
 # ==============================================================================
-def pretty_league_name(file_name):
+def save_artifacts(league_model_dir, artifacts):
     """
-    Mengubah nama file dataset menjadi nama liga yang rapi untuk tampilan.
-    Logika ini disalin dari app.py untuk memastikan konsistensi.
-    Contoh: 'dataset_serieA_1' -> 'Serie A'
+    Menyimpan artefak model secara atomik.
+    Semua file ditulis dulu ke nama sementara, baru kemudian di-rename
+    bersamaan, sehingga app (model registry) tidak pernah memuat bundle
+    yang setengah tertulis. Setelah itu RF dan scaler diekspor ke bentuk
+    ringkas (compact/) yang dibaca app lewat mmap.
     """
-    name = file_name.replace('dataset_', '').replace('.csv', '')
-    name = name.replace('_1', '')
-
-    special_cases = {
-        'seriea': 'Serie A',
-        'laliga': 'La Liga',
-        'premierleague': 'Premier League',
-        'bundesliga': 'Bundesliga',
-        'ligue1': 'Ligue 1'
-    }
-
-    key = name.lower().replace('_', '')
-    if key in special_cases:
-        return special_cases[key]
-    
-    return name.replace('_', ' ').title()
+    tmp_paths = {}
+    for fname, obj in artifacts.items():
+        tmp_path = os.path.join(league_model_dir, f'.{fname}.tmp')
+        joblib.dump(obj, tmp_path)
+        tmp_paths[fname] = tmp_path
+    for fname, tmp_path in tmp_paths.items():
+        os.replace(tmp_path, os.path.join(league_model_dir, fname))
+    export_compact(league_model_dir, {name: artifacts.get(fname) for name, fname in COMPACT_SOURCES.items()})
+
+def export_compact_models():
+    """Mengekspor bentuk ringkas untuk model yang sudah ada di models/, tanpa training ulang."""
+    for league_model_dir in sorted(glob.glob(os.path.join(MODEL_DIR, '*'))):
+        artifacts = {name: joblib.load(os.path.join(league_model_dir, fname))
+                     for name, fname in COMPACT_SOURCES.items()
+                     if os.path.isfile(os.path.join(league_model_dir, fname))}
+        if not artifacts:
+            continue
+        manifest = export_compact(league_model_dir, artifacts)
+        print(f"✅ {league_model_dir}: " + ', '.join(
+            f"{name} ({meta.get('n_nodes', meta['n_features'])} {'node' if 'n_nodes' in meta else 'fitur'})"
+            for name, meta in manifest['models'].items()))
+
+def dataset_fingerprint(data):
+    """Jumlah baris, tanggal terakhir dan hash isi dataset (tidak bergantung pada format CSV/store)."""
+    content_hash = hashlib.sha256(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes()).hexdigest()
+    last_date = None
+    if 'Date' in data.columns and data['Date'].notna().any():
+        last_date = str(pd.to_datetime(data['Date'], errors='coerce').max())
+    return {'rows': int(len(data)), 'last_date': last_date, 'content_hash': content_hash}
+
+# Kolom yang menentukan baris latih: identitas laga, hasil dan fitur
+PREFIX_HASH_COLUMNS = ['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR'] + FEATURE_COLUMNS
+
+def rows_hash(data, n_rows):
+    """
+    Hash isi `n_rows` baris pertama pada PREFIX_HASH_COLUMNS. Kolom angka
+    dibandingkan sebagai float, sehingga hash prefix tidak berubah hanya
+    karena baris baru (misal berisi NaN) mengubah dtype kolomnya.
+    """
+    prefix = data[[col for col in PREFIX_HASH_COLUMNS if col in data.columns]].iloc[:n_rows]
+    normalized = pd.DataFrame({
+        col: (pd.to_datetime(prefix[col], errors='coerce') if col == 'Date'
+              else prefix[col].astype(str) if col in ('HomeTeam', 'AwayTeam', 'FTR')
+              else pd.to_numeric(prefix[col], errors='coerce').astype('float64'))
+        for col in prefix.columns
+    })
+    return hashlib.sha256(pd.util.hash_pandas_object(normalized, index=False).to_numpy().tobytes()).hexdigest()
+
+def training_config(seed):
+    """Fitur dan hyperparameter yang menentukan hasil training (dibandingkan dengan manifest)."""
+    config = {'features': FEATURE_COLUMNS, 'window': WINDOW, 'seed': seed,
+              'random_forest': RF_PARAMS, 'svm_param_grid': SVM_PARAM_GRID}
+    return json.loads(json.dumps(config))
+
+def load_manifest(league_model_dir):
+    try:
+        with open(os.path.join(league_model_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_manifest(league_model_dir, manifest):
+    tmp_path = os.path.join(league_model_dir, f'.{MANIFEST_NAME}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(league_model_dir, MANIFEST_NAME))
+
+def artifacts_exist(league_model_dir):
+    return all(os.path.isfile(os.path.join(league_model_dir, fname)) for fname in ARTIFACT_FILES)
+
+# ==============================================================================
+# TRAINING SATU LIGA
+# ==============================================================================
+def split_core_budget(cores, n_leagues):
+    """
+    Membagi anggaran core: `outer` liga dilatih bersamaan (proses), masing-
+    masing mendapat `inner` core untuk model di dalamnya, outer * inner <= cores.
+    """
+    cores = max(1, int(cores))
+    outer = max(1, min(cores, n_leagues))
+    inner = max(1, cores // outer)
+    return outer, inner
+
+def _train_forest(label, X_train, y_train, X_test, y_test, X_full, y_full, n_jobs, seed):
+    """Evaluasi RF di data latih/uji, lalu model final di seluruh data."""
+    start = time.perf_counter()
+    model = RandomForestClassifier(**RF_PARAMS, random_state=seed, n_jobs=n_jobs)
+    model.fit(X_train, y_train)
+    acc = accuracy_score(y_test, model.predict(X_test))
+    print(f"   - Akurasi {label} (Random Forest): {acc:.2%}")
+    final_model = clone(model).fit(X_full, y_full)
+    return acc, final_model, time.perf_counter() - start
+
+def _train_svm(label, X_train, y_train, X_test, y_test, X_full, y_full, n_jobs, seed):
+    """GridSearchCV SVM di data latih/uji, lalu estimator terbaik dilatih ulang di seluruh data."""
+    start = time.perf_counter()
+    search = GridSearchCV(SVC(random_state=seed, probability=True), SVM_PARAM_GRID, cv=3, n_jobs=n_jobs)
+    search.fit(X_train, y_train)
+    acc = accuracy_score(y_test, search.best_estimator_.predict(X_test))
+    print(f"   - Akurasi {label} (SVM): {acc:.2%}")
+    final_model = clone(search.best_estimator_).fit(X_full, y_full)
+    return acc, final_model, time.perf_counter() - start
+
+def _warm_start_league(league_model_dir, X, y_ftr, y_ou, y_btts, n_new, n_jobs, warm_trees):
+    """
+    Memperbarui model yang sudah ada tanpa melatih ulang dari nol: setiap RF
+    mendapat `warm_trees` pohon baru (warm_start) dan SVM dilatih ulang
+    dengan parameter terbaik yang sudah ada (tanpa grid search). Scaler dan
+    label encoder lama tetap dipakai agar pohon lama dan baru konsisten.
+
+    Pohon baru dan SVM dilatih di SELURUH dataset (laga lama + baru), bukan
+    hanya di laga baru: laga baru biasanya hanya segelintir, dan pohon yang
+    dilatih dari sampel sekecil itu akan overfit padahal ikut memberi suara
+    setara dengan pohon lama. SVM tidak punya warm start, jadi dilatih ulang
+    di seluruh data dengan parameter lama.
+
+    `X` dll. harus berisi baris lama yang tidak berubah diikuti `n_new` baris
+    baru (dicek lewat `rows_hash` di train_league).
+    Mengembalikan None jika warm start tidak bisa dipakai (misal label baru).
+    """
+    artifacts = {fname: joblib.load(os.path.join(league_model_dir, fname)) for fname in ARTIFACT_FILES}
+    model_hda, model_ou25 = artifacts['model_hda.pkl'], artifacts['model_ou25.pkl']
+    if max(model_hda.n_estimators, model_ou25.n_estimators) + warm_trees > WARM_START_MAX_TREES:
+        print(f"   - Jumlah pohon akan melebihi {WARM_START_MAX_TREES}, model dilatih ulang penuh.")
+        return None
+    try:
+        y_ftr_enc = artifacts['le_ftr.pkl'].transform(y_ftr)
+        y_ou_enc = artifacts['le_ou.pkl'].transform(y_ou)
+        y_btts_enc = artifacts['le_btts.pkl'].transform(y_btts)
+    except ValueError:
+        print("   - Ada label baru yang belum dikenal model, model dilatih ulang penuh.")
+        return None
+    X_scaled = artifacts['scaler.pkl'].transform(X)
+
+    # Akurasi model LAMA pada laga baru (belum pernah dilihat model) sebelum diperbarui
+    accuracy = {}
+    if n_new > 0:
+        X_new = X_scaled[-n_new:]
+        accuracy = {
+            'H/D/A (RF)': accuracy_score(y_ftr_enc[-n_new:], model_hda.predict(X_new)),
+            'BTTS (SVM)': accuracy_score(y_btts_enc[-n_new:], artifacts['model_btts.pkl'].predict(X_new)),
+            'O/U 2.5 (RF)': accuracy_score(y_ou_enc[-n_new:], model_ou25.predict(X_new)),
+        }
+        print(f"   - Akurasi model lama pada {n_new} laga baru: "
+              + ', '.join(f"{k} {v:.2%}" for k, v in accuracy.items()))
+
+    timings = {}
+    for label, model, y_enc in (('H/D/A', model_hda, y_ftr_enc), ('O/U 2.5', model_ou25, y_ou_enc)):
+        start = time.perf_counter()
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + warm_trees, n_jobs=n_jobs)
+        model.fit(X_scaled, y_enc)
+        model.set_params(warm_start=False)
+        timings[label] = time.perf_counter() - start
+        print(f"   - {label}: +{warm_trees} pohon (total {model.n_estimators})")
+    start = time.perf_counter()
+    artifacts['model_btts.pkl'] = clone(artifacts['model_btts.pkl']).fit(X_scaled, y_btts_enc)
+    timings['BTTS'] = time.perf_counter() - start
+    return artifacts, accuracy, timings
+
+def train_league(path, n_jobs=-1, model_workers=1, seed=RANDOM_STATE, force=False,
+                 warm_start=False, warm_trees=WARM_START_TREES):
+    """
+    Melatih, mengevaluasi dan menyimpan model satu liga.
+
+    `n_jobs` dipakai oleh setiap RF/GridSearchCV, `model_workers` adalah
+    jumlah model (H/D/A, BTTS, O/U 2.5) yang dilatih bersamaan di liga ini.
+    Liga yang dataset dan konfigurasinya sama dengan manifest dilewati
+    (kecuali `force`); dengan `warm_start`, liga yang hanya bertambah baris
+    diperbarui lewat `_warm_start_league`.
+    Error tidak dilempar tetapi dicatat di hasil, supaya liga lain tetap jalan.
+    """
+    started = time.perf_counter()
+    filename_with_ext = os.path.basename(path)
+
+    # Nama liga dan folder models/<liga> dari katalog liga (sama dengan app.py),
+    # e.g. 'dataset_laliga_1.csv' -> 'La Liga' -> 'models/la_liga'
+    entry = LeagueEntry(path, MODEL_DIR)
+    pretty_name = entry.name
+
+    result = {'Liga': pretty_name.upper(), 'status': 'error', 'error': None, 'timings': {}}
+    timings = result['timings']
+    try:
+        print(f"\n{'='*20} PROCESSING LEAGUE: {pretty_name.upper()} {'='*20}")
+
+        league_model_dir = entry.model_dir
+        os.makedirs(league_model_dir, exist_ok=True)
+
+        stage = time.perf_counter()
+        data = read_dataset(path)
+        print(f"✅ Berhasil memuat file: {filename_with_ext}")
+
+        fingerprint = dataset_fingerprint(data)
+        prefix_hash = rows_hash(data, len(data))
+        config = training_config(seed)
+        manifest = load_manifest(league_model_dir)
+        if (not force and manifest and manifest.get('fingerprint') == fingerprint
+                and manifest.get('config') == config and artifacts_exist(league_model_dir)):
+            print(f"⏭️  Dataset dan konfigurasi tidak berubah sejak training terakhir ({manifest.get('trained_at')}). Dilewati.")
+            result['status'] = 'unchanged'
+            return result
+
+        data['TotalGoals'] = data['FTHG'] + data['FTAG']
+        data['OverUnder2.5'] = np.where(data['TotalGoals'] > 2.5, 'Over', 'Under')
+        data['BTTS'] = np.where((data['FTHG'] > 0) & (data['FTAG'] > 0), 'Yes', 'No')
+
+        if not all(col in data.columns for col in FEATURE_COLUMNS):
+            print(f"⚠️  WARNING: Tidak semua fitur ditemukan di {filename_with_ext}. Melewati liga ini.")
+            result['status'] = 'skipped'
+            return result
+
+        X = data[FEATURE_COLUMNS]
+        y_ftr = data['FTR']
+        y_ou = data['OverUnder2.5']
+        y_btts = data['BTTS']
+
+        if X.isnull().sum().sum() > 0:
+            X = X.fillna(X.mean())
+
+        X = X.iloc[WINDOW:]
+        y_ftr = y_ftr.iloc[WINDOW:]
+        y_ou = y_ou.iloc[WINDOW:]
+        y_btts = y_btts.iloc[WINDOW:]
+
+        # Warm start hanya jika konfigurasi sama, dataset bertambah baris sejak training terakhir,
+        # dan baris lama tidak berubah (diedit/dihapus/diberi tanggal lain di luar app)
+        old_rows = manifest.get('fingerprint', {}).get('rows', fingerprint['rows']) if manifest else fingerprint['rows']
+        can_warm_start = (warm_start and not force and manifest and manifest.get('config') == config
+                          and artifacts_exist(league_model_dir) and fingerprint['rows'] > old_rows)
+        if can_warm_start and rows_hash(data, old_rows) != manifest.get('rows_hash'):
+            print(f"   - {old_rows} baris lama berubah sejak training terakhir, model dilatih ulang penuh.")
+            can_warm_start = False
+        if can_warm_start:
+            timings['load'] = time.perf_counter() - stage
+            print("\n--- Warm start: memperbarui model yang sudah ada ---")
+            stage = time.perf_counter()
+            n_new = min(len(X), fingerprint['rows'] - old_rows)
+            warm = _warm_start_league(league_model_dir, X, y_ftr, y_ou, y_btts, n_new, n_jobs, warm_trees)
+            if warm is not None:
+                artifacts, accuracy, model_timings = warm
+                timings.update(model_timings)
+                timings['models'] = time.perf_counter() - stage
+                result.update(accuracy)
+                result['evaluation'] = f'{n_new} laga baru'
+                stage = time.perf_counter()
+                save_artifacts(league_model_dir, artifacts)
+                save_manifest(league_model_dir, {
+                    **manifest,
+                    'fingerprint': fingerprint,
+                    'rows_hash': prefix_hash,
+                    'mode': 'warm_start',
+                    'trained_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                    'trees': {'model_hda': artifacts['model_hda.pkl'].n_estimators,
+                              'model_ou25': artifacts['model_ou25.pkl'].n_estimators},
+                })
+                timings['save'] = time.perf_counter() - stage
+                result['status'] = 'warm_start'
+                print(f"✨ Model untuk {pretty_name.upper()} diperbarui (warm start) di '{league_model_dir}'.")
+                return result
+            stage = time.perf_counter()
+
+        X_train, X_test, y_ftr_train, y_ftr_test = train_test_split(X, y_ftr, test_size=0.2, shuffle=False)
+        _, _, y_ou_train, y_ou_test = train_test_split(X, y_ou, test_size=0.2, shuffle=False)
+        _, _, y_btts_train, y_btts_test = train_test_split(X, y_btts, test_size=0.2, shuffle=False)
+        print("✅ Data berhasil dipisah menjadi data latih (80%) dan uji (20%).")
+
+        scaler_eval = StandardScaler()
+        X_train_scaled = scaler_eval.fit_transform(X_train)
+        X_test_scaled = scaler_eval.transform(X_test)
+
+        le_ftr_eval, le_ou_eval, le_btts_eval = LabelEncoder(), LabelEncoder(), LabelEncoder()
+        y_ftr_train_encoded = le_ftr_eval.fit_transform(y_ftr_train)
+        y_ou_train_encoded = le_ou_eval.fit_transform(y_ou_train)
+        y_btts_train_encoded = le_btts_eval.fit_transform(y_btts_train)
+
+        # Data final (seluruh data) disiapkan di awal: model evaluasi dan model final saling independen
+        scaler_final = StandardScaler()
+        X_scaled_final = scaler_final.fit_transform(X)
+
+        le_ftr_final, le_ou_final, le_btts_final = LabelEncoder(), LabelEncoder(), LabelEncoder()
+        y_ftr_encoded_final = le_ftr_final.fit_transform(y_ftr)
+        y_ou_encoded_final = le_ou_final.fit_transform(y_ou)
+        y_btts_encoded_final = le_btts_final.fit_transform(y_btts)
+        timings['load'] = time.perf_counter() - stage
+
+        print("\n--- Mengevaluasi dan Melatih Model (data uji, lalu keseluruhan data) ---")
+        stage = time.perf_counter()
+        # Model H/D/A -> Random Forest, BTTS -> Support Vector Machine, O/U 2.5 -> Random Forest
+        tasks = {
+            'H/D/A': (_train_forest, X_train_scaled, y_ftr_train_encoded, X_test_scaled, le_ftr_eval.transform(y_ftr_test), X_scaled_final, y_ftr_encoded_final),
+            'BTTS': (_train_svm, X_train_scaled, y_btts_train_encoded, X_test_scaled, le_btts_eval.transform(y_btts_test), X_scaled_final, y_btts_encoded_final),
+            'O/U 2.5': (_train_forest, X_train_scaled, y_ou_train_encoded, X_test_scaled, le_ou_eval.transform(y_ou_test), X_scaled_final, y_ou_encoded_final),
+        }
+        with ThreadPoolExecutor(max_workers=max(1, model_workers)) as pool:
+            futures = {label: pool.submit(fn, label, *args, n_jobs=n_jobs, seed=seed) for label, (fn, *args) in tasks.items()}
+            trained = {label: future.result() for label, future in futures.items()}
+        acc_hda, model_hda, timings['H/D/A'] = trained['H/D/A']
+        acc_btts, model_btts, timings['BTTS'] = trained['BTTS']
+        acc_ou25, model_ou25, timings['O/U 2.5'] = trained['O/U 2.5']
+        timings['models'] = time.perf_counter() - stage
+        print("✅ Model final berhasil dilatih ulang.")
+
+        result.update({'H/D/A (RF)': acc_hda, 'BTTS (SVM)': acc_btts, 'O/U 2.5 (RF)': acc_ou25,
+                       'evaluation': 'uji 20%'})
+
+        stage = time.perf_counter()
+        save_artifacts(league_model_dir, {
+            'model_hda.pkl': model_hda,
+            'model_btts.pkl': model_btts,
+            'model_ou25.pkl': model_ou25,
+            'scaler.pkl': scaler_final,
+            'le_ftr.pkl': le_ftr_final,
+            'le_ou.pkl': le_ou_final,
+            'le_btts.pkl': le_btts_final,
+        })
+        save_manifest(league_model_dir, {
+            'dataset': filename_with_ext,
+            'fingerprint': fingerprint,
+            'rows_hash': prefix_hash,
+            'config': config,
+            'svm_params': {k: model_btts.get_params()[k] for k in SVM_PARAM_GRID},
+            'accuracy': {'H/D/A (RF)': acc_hda, 'BTTS (SVM)': acc_btts, 'O/U 2.5 (RF)': acc_ou25},
+            'mode': 'full',
+            'trained_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'trees': {'model_hda': model_hda.n_estimators, 'model_ou25': model_ou25.n_estimators},
+        })
+        timings['save'] = time.perf_counter() - stage
+        result['status'] = 'ok'
+
+        print(f"✨ Model final untuk {pretty_name.upper()} telah disimpan di '{league_model_dir}'.")
+
+    except Exception as e:
+        print(f"❌ GAGAL memproses {filename_with_ext}. Error: {e}")
+        result['error'] = str(e)
+    finally:
+        timings['total'] = time.perf_counter() - started
+    return result
+
+def _train_league_worker(path, inner_cores, seed, **options):
+    # Dijalankan di proses pool: thread BLAS/OpenMP juga dibatasi ke jatah core liga ini
+    model_workers = min(3, inner_cores)
+    n_jobs = max(1, inner_cores // model_workers)
+    with threadpool_limits(limits=n_jobs):
+        return train_league(path, n_jobs=n_jobs, model_workers=model_workers, seed=seed, **options)
 
 # ==============================================================================
 # FUNGSI UTAMA UNTUK MELATIH DAN MENGGEVALUASI SEMUA LIGA
 # ==============================================================================
-# GANTI FUNGSI LAMA ANDA DENGAN YANG INI
-def train_and_evaluate_all_leagues():
+def train_and_evaluate_all_leagues(parallel=False, cores=None, seed=RANDOM_STATE, force=False,
+                                   warm_start=False, warm_trees=WARM_START_TREES, leagues=None):
+    """
+    Melatih semua liga. Default: berurutan, setiap model memakai semua core.
+    `parallel=True`: liga dibagi ke process pool sesuai `split_core_budget(cores)`,
+    dan model di dalam satu liga dilatih bersamaan dengan sisa jatah core.
+    Liga yang tidak berubah sejak training terakhir dilewati kecuali `force=True`.
+    `leagues`: daftar nama liga (misal ['La Liga']) jika hanya sebagian yang dilatih.
+    """
     print("🚀 Memulai proses training dan evaluasi untuk semua liga...")
+    wall_start = time.perf_counter()
     
-    dataset_paths = glob.glob(os.path.join(DATASET_DIR, '*.csv'))
-    all_results = []
+    catalog = LeagueCatalog(DATASET_DIR, MODEL_DIR)
+    entries = catalog.entries()
+    if leagues:
+        unknown = [name for name in leagues if catalog.get(name) is None]
+        if unknown:
+            print(f"❌ ERROR: Liga tidak dikenal: {', '.join(unknown)}. Tersedia: {', '.join(catalog.names())}")
+            return
+        entries = list(dict.fromkeys(catalog.get(name) for name in leagues))
+    dataset_paths = [entry.dataset_path for entry in entries]
+    league_names = {entry.dataset_path: entry.name.upper() for entry in entries}
 
     if not dataset_paths:
         print(f"❌ ERROR: Tidak ada file dataset .csv yang ditemukan di folder '{DATASET_DIR}'.")
         return
 
     os.makedirs(MODEL_DIR, exist_ok=True)
-
-    for path in dataset_paths:
-        try:
-            filename_with_ext = os.path.basename(path)
-            
-            # --- LOGIKA BARU UNTUK NAMA FOLDER YANG KONSISTEN ---
-            filename_base = os.path.splitext(filename_with_ext)[0] # e.g., 'dataset_laliga_1'
-            pretty_name = pretty_league_name(filename_base)       # e.g., 'La Liga'
-            league_folder_name = pretty_name.lower().replace(' ', '_') # e.g., 'la_liga'
-            # --- AKHIR LOGIKA BARU ---
-            
-            print(f"\n{'='*20} PROCESSING LEAGUE: {pretty_name.upper()} {'='*20}")
-
-            league_model_dir = os.path.join(MODEL_DIR, league_folder_name)
-            os.makedirs(league_model_dir, exist_ok=True)
-
-            data = pd.read_csv(path)
-            print(f"✅ Berhasil memuat file: {filename_with_ext}")
-
-            data['TotalGoals'] = data['FTHG'] + data['FTAG']
-            data['OverUnder2.5'] = np.where(data['TotalGoals'] > 2.5, 'Over', 'Under')
-            data['BTTS'] = np.where((data['FTHG'] > 0) & (data['FTAG'] > 0), 'Yes', 'No')
-
-            if not all(col in data.columns for col in FEATURE_COLUMNS):
-                print(f"⚠️  WARNING: Tidak semua fitur ditemukan di {filename_with_ext}. Melewati liga ini.")
-                continue
-
-            X = data[FEATURE_COLUMNS]
-            y_ftr = data['FTR']
-            y_ou = data['OverUnder2.5']
-            y_btts = data['BTTS']
-
-            if X.isnull().sum().sum() > 0:
-                X = X.fillna(X.mean())
-
-            WINDOW = 5
-            X = X.iloc[WINDOW:]
-            y_ftr = y_ftr.iloc[WINDOW:]
-            y_ou = y_ou.iloc[WINDOW:]
-            y_btts = y_btts.iloc[WINDOW:]
-            
-            X_train, X_test, y_ftr_train, y_ftr_test = train_test_split(X, y_ftr, test_size=0.2, shuffle=False)
-            _, _, y_ou_train, y_ou_test = train_test_split(X, y_ou, test_size=0.2, shuffle=False)
-            _, _, y_btts_train, y_btts_test = train_test_split(X, y_btts, test_size=0.2, shuffle=False)
-            print("✅ Data berhasil dipisah menjadi data latih (80%) dan uji (20%).")
-
-            scaler_eval = StandardScaler()
-            X_train_scaled = scaler_eval.fit_transform(X_train)
-            X_test_scaled = scaler_eval.transform(X_test)
-
-            le_ftr_eval, le_ou_eval, le_btts_eval = LabelEncoder(), LabelEncoder(), LabelEncoder()
-            y_ftr_train_encoded = le_ftr_eval.fit_transform(y_ftr_train)
-            y_ou_train_encoded = le_ou_eval.fit_transform(y_ou_train)
-            y_btts_train_encoded = le_btts_eval.fit_transform(y_btts_train)
-
-            print("\n--- Mengevaluasi Model pada Data Uji ---")
-            
-            # Model H/D/A -> Random Forest
-            model_hda = RandomForestClassifier(n_estimators=300, min_samples_split=5, min_samples_leaf=4, max_features='log2', max_depth=20, criterion='gini', random_state=42, n_jobs=-1)
-            model_hda.fit(X_train_scaled, y_ftr_train_encoded)
-            y_pred_hda = model_hda.predict(X_test_scaled)
-            acc_hda = accuracy_score(le_ftr_eval.transform(y_ftr_test), y_pred_hda)
-            print(f"   - Akurasi H/D/A (Random Forest): {acc_hda:.2%}")
-            
-            # Model BTTS -> Support Vector Machine
-            param_grid_svm = {'C': [0.1, 1, 10], 'gamma': ['scale', 'auto']}
-            search_btts = GridSearchCV(SVC(random_state=42, probability=True), param_grid_svm, cv=3, n_jobs=-1)
-            search_btts.fit(X_train_scaled, y_btts_train_encoded)
-            model_btts = search_btts.best_estimator_
-            y_pred_btts = model_btts.predict(X_test_scaled)
-            acc_btts = accuracy_score(le_btts_eval.transform(y_btts_test), y_pred_btts)
-            print(f"   - Akurasi BTTS (SVM): {acc_btts:.2%}")
-
-            # Model O/U 2.5 -> Random Forest
-            model_ou25 = RandomForestClassifier(n_estimators=300, min_samples_split=5, min_samples_leaf=4, max_features='log2', max_depth=20, criterion='gini', random_state=42, n_jobs=-1)
-            model_ou25.fit(X_train_scaled, y_ou_train_encoded)
-            y_pred_ou25 = model_ou25.predict(X_test_scaled)
-            acc_ou25 = accuracy_score(le_ou_eval.transform(y_ou_test), y_pred_ou25)
-            print(f"   - Akurasi O/U 2.5 (Random Forest): {acc_ou25:.2%}")
-
-            all_results.append({'Liga': pretty_name.upper(), 'H/D/A (RF)': acc_hda, 'BTTS (SVM)': acc_btts, 'O/U 2.5 (RF)': acc_ou25})
-
-            print("\n--- Melatih Ulang Model pada Keseluruhan Data ---")
-            scaler_final = StandardScaler()
-            X_scaled_final = scaler_final.fit_transform(X)
-
-            le_ftr_final, le_ou_final, le_btts_final = LabelEncoder(), LabelEncoder(), LabelEncoder()
-            y_ftr_encoded_final = le_ftr_final.fit_transform(y_ftr)
-            y_ou_encoded_final = le_ou_final.fit_transform(y_ou)
-            y_btts_encoded_final = le_btts_final.fit_transform(y_btts)
-
-            model_hda.fit(X_scaled_final, y_ftr_encoded_final)
-            search_btts.best_estimator_.fit(X_scaled_final, y_btts_encoded_final) 
-            model_ou25.fit(X_scaled_final, y_ou_encoded_final)
-            print("✅ Model final berhasil dilatih ulang.")
-
-            joblib.dump(model_hda, os.path.join(league_model_dir, 'model_hda.pkl'))
-            joblib.dump(search_btts.best_estimator_, os.path.join(league_model_dir, 'model_btts.pkl'))
-            joblib.dump(model_ou25, os.path.join(league_model_dir, 'model_ou25.pkl'))
-            joblib.dump(scaler_final, os.path.join(league_model_dir, 'scaler.pkl'))
-            joblib.dump(le_ftr_final, os.path.join(league_model_dir, 'le_ftr.pkl'))
-            joblib.dump(le_ou_final, os.path.join(league_model_dir, 'le_ou.pkl'))
-            joblib.dump(le_btts_final, os.path.join(league_model_dir, 'le_btts.pkl'))
-
-            print(f"✨ Model final untuk {pretty_name.upper()} telah disimpan di '{league_model_dir}'.")
-
-        except Exception as e:
-            print(f"❌ GAGAL memproses {filename_with_ext}. Error: {e}")
-            continue
-
+    options = {'force': force, 'warm_start': warm_start, 'warm_trees': warm_trees}
+
+    if not parallel:
+        results = [train_league(path, seed=seed, **options) for path in dataset_paths]
+    else:
+        cores = cores or os.cpu_count() or 1
+        outer, inner = split_core_budget(cores, len(dataset_paths))
+        print(f"⚙️  Mode paralel: {cores} core -> {outer} liga bersamaan x {inner} core per liga")
+        results = []
+        with ProcessPoolExecutor(max_workers=outer) as pool:
+            futures = {pool.submit(_train_league_worker, path, inner, seed, **options): path for path in dataset_paths}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    # Proses worker mati (misal kehabisan memori): liga lain tetap dilaporkan
+                    name = league_names[path]
+                    print(f"❌ GAGAL memproses {os.path.basename(path)}. Error: {e}")
+                    results.append({'Liga': name, 'status': 'error', 'error': str(e), 'timings': {}})
+        order = {league_names[p]: i for i, p in enumerate(dataset_paths)}
+        results.sort(key=lambda r: order.get(r['Liga'], len(order)))
+
+    acc_cols = ['Liga', 'H/D/A (RF)', 'BTTS (SVM)', 'O/U 2.5 (RF)']
+    all_results = [{k: r.get(k, np.nan) for k in acc_cols + ['evaluation']} for r in results if r['status'] in ('ok', 'warm_start')]
     if all_results:
         print(f"\n\n{'='*25} PERBANDINGAN AKURASI AKHIR {'='*25}")
         results_df = pd.DataFrame(all_results).set_index('Liga')
+        # Kolom 'Evaluasi' hanya muncul jika ada liga warm start (akurasi diukur di laga baru, bukan data uji 20%)
+        if (results_df['evaluation'] == 'uji 20%').all():
+            results_df = results_df.drop(columns='evaluation')
+        else:
+            results_df = results_df.rename(columns={'evaluation': 'Evaluasi'})
         print(results_df.to_string(formatters={
             'H/D/A (RF)': '{:.2%}'.format,
             'BTTS (SVM)': '{:.2%}'.format,
             'O/U 2.5 (RF)': '{:.2%}'.format
-        }))
+        }, na_rep='-'))
+
+    print(f"\n{'='*25} WAKTU TRAINING (detik) {'='*25}")
+    timing_cols = ['load', 'H/D/A', 'BTTS', 'O/U 2.5', 'save', 'total']
+    timing_df = pd.DataFrame([{'Liga': r['Liga'], 'Status': r['status'], **{c: r['timings'].get(c, np.nan) for c in timing_cols}}
+                              for r in results]).set_index('Liga')
+    print(timing_df.to_string(float_format='{:.2f}'.format, na_rep='-'))
+    print(f"Total wall-clock: {time.perf_counter() - wall_start:.2f} detik")
+
+    failed = [r for r in results if r['status'] == 'error']
+    if failed:
+        print(f"\n⚠️  {len(failed)} liga gagal: " + ', '.join(f"{r['Liga']} ({r['error']})" for r in failed))
 
     print(f"\n\n✨✨✨ Proses Selesai! Semua model telah dievaluasi, dilatih ulang, dan disimpan.")
 
 
 if __name__ == '__main__':
-    train_and_evaluate_all_leagues()
+    parser = argparse.ArgumentParser(description='Training model prediksi untuk semua liga.')
+    parser.add_argument('--parallel', action='store_true', help='latih beberapa liga sekaligus (process pool)')
+    parser.add_argument('--cores', type=int, default=None, help='total core untuk mode paralel (default: semua core)')
+    parser.add_argument('--seed', type=int, default=RANDOM_STATE, help='random_state untuk semua model')
+    parser.add_argument('--force', action='store_true', help='latih ulang semua liga walaupun dataset tidak berubah')
+    parser.add_argument('--warm-start', action='store_true', help='tambahkan pohon ke RF yang ada untuk liga yang hanya bertambah baris')
+    parser.add_argument('--warm-trees', type=int, default=WARM_START_TREES, help='jumlah pohon baru per RF saat warm start')
+    parser.add_argument('--league', action='append', default=None, help="latih liga ini saja (boleh diulang), misal --league 'La Liga'")
+    parser.add_argument('--export-compact', action='store_true', help='hanya ekspor bentuk ringkas (mmap) model yang sudah ada, tanpa training')
+    args = parser.parse_args()
+    if args.export_compact:
+        export_compact_models()
+        raise SystemExit(0)
+    train_and_evaluate_all_leagues(parallel=args.parallel, cores=args.cores, seed=args.seed, force=args.force,
+                                   warm_start=args.warm_start, warm_trees=args.warm_trees, leagues=args.league)